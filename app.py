@@ -1,21 +1,68 @@
 # General
+import gzip
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
 import dash
 import dash_bootstrap_components as dbc
 import dash_daq as daq
 
 # For Map Visualization
 import dash_leaflet as dl
-import dash_leaflet.express as dlx
-from dash import Dash, Input, Output, State, callback_context, ctx, dcc
-from dash.dependencies import ClientsideFunction, Input, Output
+from dash import Dash, DiskcacheManager, Input, Output, State, callback_context, dcc
+from dash.dependencies import ClientsideFunction
 from dash_extensions.javascript import assign
+from urllib.parse import quote
+
+import diskcache
+from flask import Response, abort, jsonify, request
+from flask_caching import Cache
 
 # From files 
 from helpfile import *
-
-# Read data
-data_windfarms = pd.read_csv("data/wf_data_final.csv")#.iloc[1:5000]
-data_windturbines = pd.read_csv("data/wt_data_final.csv")
+from windfarms import AggregationCube, ClusterIndex, FigureCache, FilterEngine, FilterResultCache, encode_columns, load_table, load_tiles, load_views, points_to_geobuf
+from windfarms.filtering import CATEGORICAL_FILTERS, RANGE_FILTERS
+from windfarms.indexes import GridIndex, OffsetIndex
+from windfarms.store import IN_FARM
+
+# Read data from the memory-mapped column stores (built from the CSV files on first use, 
+# or ahead of time with `python -m windfarms.store`)
+# Rows are sorted by WFid, so the turbines of a wind farm are one slice of the table. The frames have 
+# category dtypes, downcast numeric columns and the in-farm flag IN_FARM (`python -m benchmarks.bench_store` 
+# reports their memory per column)
+store_windfarms = load_table("data/wf_data_final.csv", sort_by="WFid")
+store_windturbines = load_table("data/wt_data_final.csv", sort_by="WFid")
+data_windfarms = store_windfarms.to_frame()
+data_windturbines = store_windturbines.to_frame()
+wfid_offsets = OffsetIndex(store_windturbines["WFid"])
+# Grid of the turbine coordinates for the surrounding turbines of the wind farm plots
+turbine_grid = GridIndex(store_windturbines["lon"], store_windturbines["lat"])
+# Viewports and grids of the wind farm plots, precomputed on first use or ahead of time with 
+# `python -m windfarms.views`, and the most recently drawn grids
+farm_views = load_views(store_windturbines, cache_size=int(os.environ.get("WF_GRID_CACHE_SIZE", 256)))
+# Threads drawing the poster's wind farms (helpfile.poster_farm), started by each poster job, 
+# with a single worker they are drawn in the job itself
+POSTER_WORKERS = int(os.environ.get("WF_POSTER_WORKERS", os.cpu_count() or 1))
+
+# Filters are evaluated on the server by default. With WF_FILTER_MODE=clientside both tables 
+# are shipped to the browser and filtered there (assets/script.js)
+FILTER_MODE = os.environ.get("WF_FILTER_MODE", "server")
+filter_windfarms = FilterEngine(store_windfarms, exclude_wfids=[-1], name="wf")
+filter_windturbines = FilterEngine(store_windturbines, name="wt")
+# Row counts per combination of the filter dimensions, the Frequency tab is computed from the cells of a filter result
+cube_windfarms = AggregationCube(store_windfarms, exclude_wfids=[-1])
+cube_windturbines = AggregationCube(store_windturbines)
+# Value histograms of the numeric columns per wind farm cell, merged into the statistics tables
+for name in cube_windfarms.numeric:
+    cube_windfarms.histogram(name)
+
+# Vector tile pyramid of the turbines for the Wind Turbines map layer, built on first use 
+# or ahead of time with `python -m windfarms.tiles`
+tilesets = {"wt": load_tiles(store_windturbines)}
+tile_filters = {"wt": filter_windturbines}
 
 # Create dropdown menu contents
 landcover_options = [{'label': i, 'value': i} for i in sorted(data_windfarms["Land Cover"].unique())]
@@ -32,6 +79,9 @@ country_defaults = [o["value"] for o in country_options]
 continent_defaults = [o["value"] for o in continent_options]
 landform_defaults = [o["value"] for o in landform_options]
 shape_defaults = [o["value"] for o in shape_options]
+turbines_defaults = [1, 4086]
+elevation_defaults = [-46, 4684]
+distance_defaults = [10, 13155]
 x_axis_options_default = [o["value"] for o in x_axis_options]
 
 # Map layers for leaflet in Map View 
@@ -66,16 +116,111 @@ tab_selected_style = {
 }
 
 # Create data overlays windfarms/windturbines for Map View 
-point_to_layer = assign("function(feature, latlng, context) {mmarker = L.circleMarker(latlng, {radius:5, fillOpacity: 0.5}).bindPopup(\"Displayed\"); return mmarker.openPopup() ;}")
+# Points are clustered on the server (windfarms.clustering), the layers only receive the clusters 
+# and points within the current map bounds. Clusters are drawn like the leaflet.markercluster icons
+point_to_layer = assign("""function(feature, latlng, context) {
+    if (feature.properties.cluster) {
+        const count = feature.properties.point_count;
+        const size = count < 100 ? "small" : (count < 1000 ? "medium" : "large");
+        const icon = L.divIcon({html: "<div><span>" + feature.properties.point_count_abbreviated + "</span></div>",
+                                className: "marker-cluster marker-cluster-" + size, iconSize: L.point(40, 40)});
+        return L.marker(latlng, {icon: icon});
+    }
+    mmarker = L.circleMarker(latlng, {radius:5, fillOpacity: 0.5}).bindPopup("Displayed"); return mmarker.openPopup() ;}""")
 # geojson = dl.GeoJSON(data=data, options=dict(pointToLayer=point_to_layer))
-cluster_wf = dl.GeoJSON( id="geojson", options=dict(pointToLayer=point_to_layer),  format = "geobuf",cluster=True, zoomToBoundsOnClick=True, superClusterOptions={"radius": 100, "maxZoom":11})#,children=[dl.Popup("Displayed Windfarm")]
-cluster_wt = dl.GeoJSON(id="geojson_wt", options=dict(pointToLayer=point_to_layer),   format = "geobuf", cluster=True, zoomToBoundsOnClick=True, superClusterOptions={"radius": 100, "maxZoom":11})#,children=[dl.Popup("Displayed Windfarm")]
-#format="geobuf",
+cluster_wf = dl.GeoJSON( id="geojson", options=dict(pointToLayer=point_to_layer), format="geobuf")#,children=[dl.Popup("Displayed Windfarm")]
+cluster_options = {"radius": 100, "max_zoom": 11}
+
+# Filter columns for the clientside filter as typed arrays, not needed when filtering on the server
+if FILTER_MODE == "clientside":
+    filter_columns = ["WFid"] + CATEGORICAL_FILTERS + RANGE_FILTERS
+    data_stores = [
+        dcc.Store(data = encode_columns(store_windfarms, filter_columns), id='store_all_wf_data', storage_type="memory"), 
+        dcc.Store(data = encode_columns(store_windturbines, filter_columns), id='store_all_wt_data', storage_type = "memory"),
+    ]
+else:
+    data_stores = []
+
+# Background callbacks (the poster) run as jobs in their own processes, with their progress and results 
+# kept in a local disk cache
+background_callback_manager = DiskcacheManager(diskcache.Cache(os.environ.get("WF_JOB_CACHE", "data/jobs")))
 
 # Initiate app
-app = Dash(__name__, external_stylesheets=[dbc.themes.SIMPLEX])
+app = Dash(__name__, external_stylesheets=[dbc.themes.SIMPLEX], background_callback_manager=background_callback_manager)
 server = app.server
 
+# Filter results (row bitsets and the frames derived from them) shared by all callbacks, keyed by the 
+# normalized filter state and evicted least recently used first beyond WF_FILTER_CACHE_SIZE results or 
+# WF_FILTER_CACHE_MB of estimated memory per worker
+filter_cache = FilterResultCache(Cache(server, config={
+    "CACHE_TYPE": "windfarms.cache.LRUCache",
+    "CACHE_THRESHOLD": int(os.environ.get("WF_FILTER_CACHE_SIZE", 32)),
+    "CACHE_MAX_BYTES": int(float(os.environ.get("WF_FILTER_CACHE_MB", 256)) * 2**20),
+}))
+
+# Serialized single wind farm plots by WFid, evicted least recently used first beyond WF_FIGURE_CACHE_MB. 
+# The plots of the WF_FIGURE_WARM largest wind farms are built in the background once the server starts (start_warmup)
+figure_cache = FigureCache(
+    lambda wfid: plot_single_windfarm_mapbox(data_windturbines, wfid, offsets=wfid_offsets, spatial_index=turbine_grid, views=farm_views),
+    max_bytes=int(float(os.environ.get("WF_FIGURE_CACHE_MB", 64)) * 2**20),
+)
+largest_wfids = data_windfarms.loc[data_windfarms[IN_FARM]].nlargest(int(os.environ.get("WF_FIGURE_WARM", 50)), "Number of turbines")["WFid"]
+
+@server.route("/cache-stats")
+def cache_stats():
+    return jsonify(filter=filter_cache.stats(), grids=farm_views.stats(), figures=figure_cache.stats())
+
+# Vector tiles of a pyramid version, optionally restricted to the rows of a filter state (?filter=<normalized 
+# state as JSON>, see FilterEngine.state). A worker that does not hold the filter result recomputes it from the 
+# state. Clientside filter results have no state and are only found in the cache of a worker, by the key 
+# FilterResultCache.from_payload derives from their bits (?key=<key>). 
+# Tiles only change with the pyramid or the filter, both are part of the URL and the ETag. They are stored gzipped 
+# and decompressed for clients that do not accept gzip
+@server.route("/tiles/<layer>/<version>/<int:z>/<int:x>/<int:y>.pbf")
+def serve_tile(layer, version, z, x, y):
+    if layer not in tilesets or version != tilesets[layer].version:
+        abort(404)
+    tileset, engine = tilesets[layer], tile_filters[layer]
+    key = request.args.get("key")
+    state = request.args.get("filter")
+    if state is not None:
+        try:
+            state = json.loads(state)
+        except ValueError:
+            abort(400)
+        if not isinstance(state, dict):
+            abort(400)
+        key = engine.state_key(state)
+    gzipped = request.accept_encodings["gzip"] > 0
+    etag = f"{tileset.version}-{key or 'all'}" + ("" if gzipped else "-identity")
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        mask = None
+        if state is not None:
+            try:
+                result = filter_cache.get_or_compute(key, lambda: engine.state_bits(state), engine.rows, state)
+            except ValueError:
+                abort(400)
+            mask = result.mask
+        elif key:
+            result = filter_cache.get(key) if key.startswith(f"{engine.name}:bits:") else None
+            if result is None:
+                abort(404)
+            mask = result.mask
+        data = tileset.tile(z, x, y, mask)
+        if data is None:
+            response = Response(status=204)
+        elif gzipped:
+            response = Response(data, mimetype="application/vnd.mapbox-vector-tile", headers={"Content-Encoding": "gzip"})
+        else:
+            response = Response(gzip.decompress(data), mimetype="application/vnd.mapbox-vector-tile")
+    response.set_etag(etag)
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.max_age = 86400
+    return response
+
 ### LAYOUT
 app.layout = html.Div([
     
@@ -245,18 +390,18 @@ app.layout = html.Div([
 
                 html.Div(children=[
                     html.H6('Number of Turbines'),
-                    dcc.RangeSlider(1, 3296, 1, value=[1, 4086],marks=None, id='sd_turbines', tooltip={"placement": "bottom", "always_visible": True})
+                    dcc.RangeSlider(1, 3296, 1, value=turbines_defaults,marks=None, id='sd_turbines', tooltip={"placement": "bottom", "always_visible": True})
                 ],  className = "sliderBox"),
 
 
                 html.Div(children=[
                     html.H6('Elevation Level (m)'),
-                    dcc.RangeSlider(-46, 4684, 1, value=[-46, 4684],marks=None, id='sd_elevation', tooltip={"placement": "bottom", "always_visible": True})
+                    dcc.RangeSlider(-46, 4684, 1, value=elevation_defaults,marks=None, id='sd_elevation', tooltip={"placement": "bottom", "always_visible": True})
                 ],  className ="sliderBox"),
 
                 html.Div(children=[
                     html.H6('Turbine Spacing (m)'),
-                    dcc.RangeSlider(10, 13155, 10, value=[10, 13155],marks=None, id='sd_distance', tooltip={"placement": "bottom", "always_visible": True})
+                    dcc.RangeSlider(10, 13155, 10, value=distance_defaults,marks=None, id='sd_distance', tooltip={"placement": "bottom", "always_visible": True})
                 ], className="sliderBox"),
 
             ], className="sliders_class"), 
@@ -336,7 +481,7 @@ app.layout = html.Div([
                     html.Div(dl.Map([#dl.TileLayer(),        
                                 dl.LayersControl(collapsed=False,
                                     children=[dl.BaseLayer(dl.LayerGroup(cluster_wf), name="Wind Farms", checked=True), 
-                                    dl.BaseLayer(dl.LayerGroup(cluster_wt), name="Wind Turbines", checked=False)], id = "MapLeafletLayersControl"), 
+                                    dl.BaseLayer(dl.LayerGroup(id="tiles_wt"), name="Wind Turbines", checked=False)], id = "MapLeafletLayersControl"), 
                                 dl.LayersControl(
                                     [dl.BaseLayer(dl.TileLayer(url=mapbox_url.format(id="light-v9", access_token=mapbox_token, noWrap= True)),
                                                 name="Light", checked=True),
@@ -354,6 +499,7 @@ app.layout = html.Div([
                                 
 
                             ], 
+                    id="map",
                     center=(33.256890, -3.810381), 
                     zoom=2, 
                     preferCanvas=True,
@@ -431,9 +577,9 @@ app.layout = html.Div([
             # html.Div(
             dbc.Container(children = [
                 dbc.Label("Random Wind Farms"),
-                dbc.Spinner(children=[
-                    html.Div(children=[dcc.Graph(id = "poster_graph", style={'height': '90%'})])
-                ], size="lg", color="secondary", type="border", fullscreen=False, spinnerClassName = "loadingSpinner"),
+                # The poster fills in row by row, with its progress shown while it is drawn
+                html.Div(children=[dbc.Spinner(size="sm", color="secondary", type="border"), html.Span(id = "poster_progress")], id = "poster_running", style={'display': 'none'}),
+                html.Div(children=[dcc.Graph(id = "poster_graph", style={'height': '90%'})]),
             ], className = "posterGraph")
             # ]), className = "posterGraph")
         ], style=tab_style, selected_style=tab_selected_style),
@@ -442,10 +588,11 @@ app.layout = html.Div([
   
 
     # Clientside stores for data and filtering results
-    dcc.Store(data = data_windfarms.to_dict('list'), id='store_all_wf_data', storage_type="memory"), 
-    dcc.Store(data =  data_windturbines.to_dict('list'),id='store_all_wt_data', storage_type = "memory"),
+    *data_stores,
     dcc.Store(id='filtered_wt_intermediate', storage_type="memory"), 
     dcc.Store(id='filtered_wf_intermediate', storage_type="memory"),
+    dcc.Store(id='tile_url_wt', storage_type="memory"),
+    dcc.Store(id='tile_layer_wt', storage_type="memory"),
 
 ],className = "allPage")
 
@@ -481,20 +628,12 @@ app.clientside_callback(
     [Input('my-toggle-switch', 'value')]
 )
 
-# Filter clientside-callback
-app.clientside_callback(
-   ClientsideFunction(
-        namespace='clientside',
-        function_name='filter_function'
-    ),
-    Output(component_id="filtered_wt_intermediate", component_property="data"),
-    Output(component_id="filtered_wf_intermediate", component_property="data"),
-    Output( "filter_application", "children"), 
-    Output( "filter_application_wts", "children"), 
-
-    Input('submit-button-state', 'n_clicks'),
-    State('store_all_wt_data', 'data'), 
-    State('store_all_wf_data', 'data'), 
+# Count with "." as thousands separator, as shown in the header cards
+def format_count(n):
+    return f"{n:,}".replace(",", ".")
+
+# Filter inputs shared by the clientside and the server side filter
+filter_states = [
     State(component_id="dd_landcover", component_property="value"),
     State(component_id="dd_country", component_property="value"),
     State(component_id="dd_continent", component_property="value"),
@@ -503,7 +642,94 @@ app.clientside_callback(
     State(component_id="sd_distance", component_property="value"), 
     State(component_id="sd_elevation", component_property="value"), 
     State(component_id="dd_shape", component_property="value")
-)
+]
+
+# Turbine and wind farm filter results of the values of the filter_states, cached by their normalized filter state
+def filter_results(value_lc, value_ctr, value_cont, value_turb_slider, value_lf, value_dist_slider, value_elev_slider, value_shape):
+    selections = {"Country": value_ctr, "Continent": value_cont, "Land Cover": value_lc, "Landform": value_lf, "Shape": value_shape}
+    ranges = {"Number of turbines": value_turb_slider, "Turbine Spacing": value_dist_slider, "Elevation": value_elev_slider}
+    wt_state, wf_state = filter_windturbines.state(selections, ranges), filter_windfarms.state(selections, ranges)
+    wt_result = filter_cache.get_or_compute(filter_windturbines.state_key(wt_state), lambda: filter_windturbines.bits(selections, ranges), store_windturbines.rows, wt_state)
+    wf_result = filter_cache.get_or_compute(filter_windfarms.state_key(wf_state), lambda: filter_windfarms.bits(selections, ranges), store_windfarms.rows, wf_state)
+    return wt_result, wf_result
+
+# Filter clientside-callback
+if FILTER_MODE == "clientside":
+    app.clientside_callback(
+        ClientsideFunction(
+            namespace='clientside',
+            function_name='filter_function'
+        ),
+        Output(component_id="filtered_wt_intermediate", component_property="data"),
+        Output(component_id="filtered_wf_intermediate", component_property="data"),
+        Output( "filter_application", "children"), 
+        Output( "filter_application_wts", "children"), 
+
+        Input('submit-button-state', 'n_clicks'),
+        State('store_all_wt_data', 'data'), 
+        State('store_all_wf_data', 'data'), 
+        *filter_states
+    )
+
+# Filter server-side callback: only the bitsets of the matching rows are sent to the browser
+else:
+    @app.callback(
+        Output(component_id="filtered_wt_intermediate", component_property="data"),
+        Output(component_id="filtered_wf_intermediate", component_property="data"),
+        Output( "filter_application", "children"), 
+        Output( "filter_application_wts", "children"), 
+
+        Input('submit-button-state', 'n_clicks'),
+        *filter_states
+    )
+    def apply_filter(nc, *filter_values):
+        wt_result, wf_result = filter_results(*filter_values)
+        return wt_result.payload(), wf_result.payload(), format_count(wf_result.count), format_count(wt_result.count)
+
+# Filter result of a payload sent back by the browser, checked against the table of the engine 
+# (FilterResultCache.from_payload). Callbacks leave their outputs unchanged for invalid payloads
+def payload_result(payload, engine):
+    try:
+        return filter_cache.from_payload(payload, engine)
+    except ValueError:
+        raise dash.exceptions.PreventUpdate
+
+# Filtered frames of a filter result, computed once per result and shared by the tabs
+def filtered_windturbines(payload):
+    result = payload_result(payload, filter_windturbines)
+    return result.derive("frame", lambda: data_windturbines[result.mask])
+
+def filtered_windfarms(payload):
+    result = payload_result(payload, filter_windfarms)
+    return result.derive("frame", lambda: data_windfarms[result.mask])
+
+# Cells of the aggregation cube that pass the filter of a result (AggregationCube.frame), computed once per result
+def filtered_cells(result, cube):
+    return result.derive("cells", lambda: cube.frame(cube.cell_mask(result.bits)))
+
+# Outputs of the Frequency tab per y-axis, each memoized on the filter result it depends on: the wind farm 
+# chart and the statistics table on the wind farms, the turbine chart on the turbines (and the wind farms, 
+# its categories follow the wind farm chart). Missing outputs are drawn together by one plot_wf_histograms call
+def frequency_outputs(wt_result, wf_result, y_axis):
+    entries = [
+        (wf_result, f"frequency:{y_axis}:wf_chart"),
+        (wf_result, f"frequency:{y_axis}:wf_table"),
+        (wt_result, f"frequency:{y_axis}:{wf_result.key}:wt_chart"),
+    ]
+    histogram_plots = []
+    def draw(i):
+        if not histogram_plots:
+            histogram_plots.extend(plot_wf_histograms(
+                filtered_cells(wt_result, cube_windturbines), filtered_cells(wf_result, cube_windfarms), y_axis = y_axis, cells = True, wf_cube = cube_windfarms))
+        return histogram_plots[i]
+    return tuple(result.derive(name, lambda i=i: draw(i)) for i, (result, name) in enumerate(entries))
+
+# Cluster index of the filtered points, built once per filter result
+def clusters(payload, engine, properties):
+    result, store = payload_result(payload, engine), engine.store
+    mask = result.mask
+    return result.derive("clusters", lambda: ClusterIndex(
+        store["lon"][mask], store["lat"][mask], {name: store[name][mask] for name in properties}, **cluster_options))
 
 # Checklist synchronisation Country
 @app.callback(
@@ -591,17 +817,13 @@ def sync_checklists(selected_filter_var, all_selected):
     Output("singleWF", "children"),
 
     Input("geojson", "click_feature"),
-    Input("geojson_wt", "click_feature"),
     prevent_initial_call=True
 )
-def update_tooltip(feature1, feature2):
-    triggered_id = ctx.triggered_id
-    if (triggered_id == 'geojson'):
-         return draw_wf_graph(feature1)
-    # elif triggered_id == 'geojson_wt':
-    #      return draw_wf_graph(feature2)
-    else: 
-        dash.exceptions.PreventUpdate
+def update_tooltip(feature1):
+    # Clicks on clusters zoom into them (zoom_to_cluster) and keep the current wind farm
+    if feature1 is not None and feature1["properties"].get("cluster"):
+        raise dash.exceptions.PreventUpdate
+    return draw_wf_graph(feature1)
 
 def draw_wf_graph(feature):
     if feature is not None: 
@@ -609,8 +831,7 @@ def draw_wf_graph(feature):
             wfid = int(str(feature['properties']["WFid"]))
             if (wfid == -1):
                 return "Turbines that do not belong to a wind farm cannot be plotted!"
-            fig = plot_single_windfarm_mapbox(data_windturbines, wfid)
-            return dcc.Graph(figure=fig)
+            return dcc.Graph(figure=figure_cache.get(wfid))
         else: 
             return "   Click on a marker to plot the related windfarm."
     else: 
@@ -621,24 +842,57 @@ def draw_wf_graph(feature):
 # Map View 
 @app.callback(
     Output(component_id="geojson", component_property='data'),
-    Output(component_id="geojson_wt", component_property='data'), 
     # Output(component_id="loader_stoer", component_property='data'), 
-    Input(component_id="filtered_wt_intermediate", component_property="data"),
     Input(component_id="filtered_wf_intermediate", component_property="data"),    
+    Input(component_id="map", component_property="bounds"),
+    Input(component_id="map", component_property="zoom"),
+    Input(component_id="MapLeafletLayersControl", component_property="baseLayer"),
+)
+
+def update_tab1(filtered_wf_data_json, bounds, zoom, base_layer):
+    # Only the visible layer gets features, wind turbines are drawn from vector tiles
+    if base_layer == "Wind Turbines":
+        return points_to_geobuf([], [])
+    # Bounds are unknown until the map is ready, then [[south, west], [north, east]]
+    bbox = [-180, -90, 180, 90] if bounds is None else [bounds[0][1], bounds[0][0], bounds[1][1], bounds[1][0]]
+    zoom = 2 if zoom is None else zoom
+    # Encoded straight from the cluster arrays, without a dict per feature
+    return points_to_geobuf(*clusters(filtered_wf_data_json, filter_windfarms, ["WFid"]).get_cluster_columns(bbox, zoom))
+
+# Tile URL of the Wind Turbines layer for the current filter result
+@app.callback(
+    Output("tile_url_wt", "data"),
+    Input("filtered_wt_intermediate", "data"),
+)
+def update_tile_url(filtered_wt_data_json):
+    url = f"/tiles/wt/{tilesets['wt'].version}/{{z}}/{{x}}/{{y}}.pbf"
+    result = payload_result(filtered_wt_data_json, filter_windturbines)
+    if result.count == result.rows:
+        return url
+    if result.state is not None:
+        return f"{url}?filter={quote(json.dumps(result.state, sort_keys=True, separators=(',', ':')), safe='')}"
+    return f"{url}?key={quote(result.key, safe='')}"
+
+# Show the vector tiles while the Wind Turbines layer is selected (assets/script.js)
+app.clientside_callback(
+    ClientsideFunction(namespace='clientside', function_name='tile_layer'),
+    Output("tile_layer_wt", "data"),
+    Input("tile_url_wt", "data"),
+    Input("MapLeafletLayersControl", "baseLayer"),
+    State("map", "id"),
 )
 
-def update_tab1(filtered_wt_data_json, filtered_wf_data_json):
-    filtered_wt_data_idx = pd.read_json(filtered_wt_data_json).iloc[:, 0].tolist()
-    filtered_wf_data_idx = pd.read_json(filtered_wf_data_json).iloc[:, 0].tolist()
-    filtered_wt_data = data_windturbines[data_windturbines.id.isin(filtered_wt_data_idx)][["lon", "lat"]]
-    filtered_wf_data = data_windfarms[data_windfarms.WFid.isin(filtered_wf_data_idx)][["lon", "lat", "WFid"]]
-    # Tab 1
-    # geojson = 
-    # geojson_wt = 
-    dicts = dlx.geojson_to_geobuf(dlx.dicts_to_geojson(filtered_wf_data.to_dict('records'), lon="lon"))
-    dicts_wt = dlx.geojson_to_geobuf(dlx.dicts_to_geojson(filtered_wt_data.to_dict('records'), lon="lon"))
-    # print(fil)
-    return dicts, dicts_wt#, [""]
+# Zoom into a cluster on click
+@app.callback(
+    Output("map", "viewport"),
+    Input("geojson", "click_feature"),
+    prevent_initial_call=True
+)
+def zoom_to_cluster(feature):
+    if feature is None or not feature["properties"].get("cluster"):
+        raise dash.exceptions.PreventUpdate
+    lon, lat = feature["geometry"]["coordinates"]
+    return {"center": [lat, lon], "zoom": feature["properties"]["expansion_zoom"]}
     
 # Frequency View
 @app.callback(
@@ -654,18 +908,36 @@ def update_tab1(filtered_wt_data_json, filtered_wf_data_json):
 
 )
 def update_tab2( value_xaxis,  filtered_wt_data_json, filtered_wf_data_json,):
-    #Read data
-    filtered_wt_data_idx = pd.read_json(filtered_wt_data_json).iloc[:, 0].tolist()
-    filtered_wf_data_idx = pd.read_json(filtered_wf_data_json).iloc[:, 0].tolist()
-    filtered_wt_data = data_windturbines[data_windturbines.id.isin(filtered_wt_data_idx)]
-    filtered_wf_data = data_windfarms[data_windfarms.WFid.isin(filtered_wf_data_idx)]
-
-    histogram_plots  = plot_wf_histograms(filtered_wt_data, filtered_wf_data, y_axis = value_xaxis )
-
-    return histogram_plots[0], histogram_plots[1], histogram_plots[2]#, poster_figure
-
-
-# Random Wind Farms View 
+    #Read the filter results, the outputs are drawn once per filter result and y-axis
+    wt_result = payload_result(filtered_wt_data_json, filter_windturbines)
+    wf_result = payload_result(filtered_wf_data_json, filter_windfarms)
+    return frequency_outputs(wt_result, wf_result, value_xaxis)
+
+# Draw the Frequency tab for the default filter state and every y-axis in the background at startup. 
+# Clientside filter results are keyed by their bits instead of the filter state and are not warmed
+def warm_frequency_tab():
+    wt_result, wf_result = filter_results(landcover_defaults, country_defaults, continent_defaults, turbines_defaults, 
+        landform_defaults, distance_defaults, elevation_defaults, shape_defaults)
+    for y_axis in column_names:
+        frequency_outputs(wt_result, wf_result, y_axis)
+
+# Background threads filling the figure cache and the Frequency tab, started once per server process: 
+# by `python app.py` or by gunicorn in each worker (post_worker_init in gunicorn.conf.py), not on import. 
+# WF_WARMUP=0 switches them off. Returns the threads started
+warmup_threads = []
+def start_warmup():
+    if warmup_threads or os.environ.get("WF_WARMUP", "1") == "0":
+        return []
+    warmup_threads.append(threading.Thread(target=figure_cache.warm, args=(largest_wfids.astype(int).tolist(),), name="warm_figure_cache", daemon=True))
+    if FILTER_MODE != "clientside":
+        warmup_threads.append(threading.Thread(target=warm_frequency_tab, name="warm_frequency_tab", daemon=True))
+    for thread in warmup_threads:
+        thread.start()
+    return list(warmup_threads)
+
+
+# Random Wind Farms View, drawn in a background job that streams the poster after each row. 
+# Changing the inputs while a poster is drawn cancels its job (Dash terminates superseded jobs of a callback)
 @app.callback(
     Output(component_id="poster_graph", component_property='figure'),
     
@@ -676,14 +948,25 @@ def update_tab2( value_xaxis,  filtered_wt_data_json, filtered_wf_data_json,):
     # Input(component_id="filtered_wt_intermediate", component_property="data"),
     Input(component_id="filtered_wf_intermediate", component_property="data"),    
 
+    background=True,
+    progress=[
+        Output(component_id="poster_graph", component_property='figure'),
+        Output(component_id="poster_progress", component_property='children'),
+    ],
+    running=[
+        (Output(component_id="poster_running", component_property='style'), {'display': 'block'}, {'display': 'none'}),
+    ],
 )
-def update_tab3(value_seed, value_pr, value_pc,value_sort,  filtered_wf_data_json):
-    # filtered_wt_data_idx = pd.read_json(filtered_wt_data_json).iloc[:, 0].tolist()
-    filtered_wf_data_idx = pd.read_json(filtered_wf_data_json).iloc[:, 0].tolist()
-    # filtered_wt_data = data_windturbines[data_windturbines.id.isin(filtered_wt_data_idx)]
-    filtered_wf_data = data_windfarms[data_windfarms.WFid.isin(filtered_wf_data_idx)]
-
-    poster_figure =  plot_wf_poster(data_windturbines, filtered_wf_data,  seed = value_seed, plot_col= value_pc, plot_rows =value_pr, sorting_condition= value_sort)
+def update_tab3(set_progress, value_seed, value_pr, value_pc,value_sort,  filtered_wf_data_json):
+    filtered_wf_data = filtered_windfarms(filtered_wf_data_json)
+
+    # The pool belongs to the job, so cancelling the job stops its workers too
+    with (ThreadPoolExecutor(POSTER_WORKERS) if POSTER_WORKERS > 1 else nullcontext()) as poster_executor:
+        posters = iter_wf_poster(data_windturbines, filtered_wf_data,  seed = value_seed, plot_col= value_pc, plot_rows =value_pr, sorting_condition= value_sort, offsets=wfid_offsets, spatial_index=turbine_grid, views=farm_views, executor=poster_executor)
+        poster_figure = next(posters)
+        for row, next_figure in enumerate(posters, start=1):
+            set_progress((poster_figure, f" Drawing row {row + 1} of {value_pr}"))
+            poster_figure = next_figure
     # poster_figure.show()
     return  poster_figure
 
@@ -708,5 +991,6 @@ def update_error(input_string_wt, input_string_wf, pr, pc, tabvalues):
 
 
 if __name__ == '__main__':
+    start_warmup()
     app.run_server(debug = False)
     # application.run(port=8080, debug = True)
\ No newline at end of file
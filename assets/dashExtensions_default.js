@@ -1,6 +1,18 @@
 window.dashExtensions = Object.assign({}, window.dashExtensions, {
     default: {
         function0: function(feature, latlng, context) {
+            if (feature.properties.cluster) {
+                const count = feature.properties.point_count;
+                const size = count < 100 ? "small" : (count < 1000 ? "medium" : "large");
+                const icon = L.divIcon({
+                    html: "<div><span>" + feature.properties.point_count_abbreviated + "</span></div>",
+                    className: "marker-cluster marker-cluster-" + size,
+                    iconSize: L.point(40, 40)
+                });
+                return L.marker(latlng, {
+                    icon: icon
+                });
+            }
             mmarker = L.circleMarker(latlng, {
                 radius: 5,
                 fillOpacity: 0.5
@@ -1,67 +1,235 @@
-// Function that filters data
-window.dash_clientside = Object.assign({}, window.dash_clientside, {
-    clientside: {
-        filter_function: function (nc, data_wt, data_wf, value_lc, value_ctr, value_cont, value_turb_slider, value_lf, value_dist_slider, value_elev_slider, value_shape) {
+// Encodes the positions of the rows passing a filter as a base64 bitset (see windfarms/encoding.py)
+function encode_bits(passes, n_rows) {
+    var bytes = new Uint8Array(Math.ceil(n_rows / 8));
+    var count = 0;
+    for (let row = 0; row < n_rows; row++) {
+        if (passes[row]) {
+            bytes[row >> 3] |= 1 << (row & 7);
+            count++;
+        }
+    }
+    var binary = "";
+    for (let i = 0; i < bytes.length; i += 0x8000) {
+        binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+    }
+    return { 'rows': n_rows, 'count': count, 'encoding': 'raw', 'bits': btoa(binary) };
+}
 
-            // Create json data for farms and turbines 
-            // turbines 
-            const keys = Object.keys(data_wt)
-            var data_wt_json = [];
-            for (let row = 0; row < 359947; row++) {
-                templist = []
-                for (const key of keys) {
-                    templist[key] = data_wt[key][row];
-                }
-                data_wt_json.push(templist)
+// Decodes the columns shipped by windfarms.encoding.encode_columns into typed arrays,
+// once per store content
+var decoded_tables = new WeakMap();
+function decode_table(table) {
+    if (!decoded_tables.has(table)) {
+        var columns = {};
+        for (const [name, column] of Object.entries(table.columns)) {
+            const binary = atob(column.data);
+            const bytes = new Uint8Array(binary.length);
+            for (let i = 0; i < binary.length; i++) {
+                bytes[i] = binary.charCodeAt(i);
             }
-            // farms 
-            const keys_wf = Object.keys(data_wf)
-            var data_wf_json = [];
-            for (let row = 0; row < 359947; row++) {
-                templist = {};
-                for (const key_wf of keys_wf) {
-                    templist[key_wf] = data_wf[key_wf][row];
+            columns[name] = { 'values': new window[column.type](bytes.buffer), 'categories': column.categories };
+        }
+        decoded_tables.set(table, { 'rows': table.rows, 'columns': columns });
+    }
+    return decoded_tables.get(table);
+}
 
-                }
-                data_wf_json.push(templist)
-            }
-            var id_array = [];
-
-            // Filter turbines 
-            var filtered_data = data_wt_json.filter(d => value_ctr.includes(d["Country"]) && value_lc.includes(d["Land Cover"]) && value_cont.includes(d["Continent"]) &&
-                value_lf.includes(d["Landform"]) && value_shape.includes(d["Shape"]) && (value_turb_slider[0] <= d["Number of turbines"]) &&
-                (value_turb_slider[1] >= d["Number of turbines"]) && (value_dist_slider[0] <= d["Turbine Spacing"]) &&
-                (value_dist_slider[1] >= d["Turbine Spacing"]) && (value_elev_slider[0] <= d["Elevation"]) &&
-                (value_elev_slider[1] >= d["Elevation"]));
-            filtered_data.forEach((arr) => { id_array.push(arr.id) });
-            var wt_data = [{
-                'id': id_array,
-            }]
-
-
-            var wfid_array_2 = [];
-
-            // filter wind farms 
-            var filtered_data_2 = data_wf_json.filter(d => (d["WFid"] != -1) && value_ctr.includes(d["Country"]) && value_lc.includes(d["Land Cover"]) && value_cont.includes(d["Continent"]) &&
-                value_lf.includes(d["Landform"]) && value_shape.includes(d["Shape"]) && (value_turb_slider[0] <= d["Number of turbines"]) &&
-                (value_turb_slider[1] >= d["Number of turbines"]) && (value_dist_slider[0] <= d["Turbine Spacing"]) &&
-                (value_dist_slider[1] >= d["Turbine Spacing"]) && (value_elev_slider[0] <= d["Elevation"]) &&
-                (value_elev_slider[1] >= d["Elevation"]));
-            filtered_data_2.forEach((arr) => { wfid_array_2.push(arr.WFid) })
-            var wf_data = [{
-                'WFid': wfid_array_2,
-            }]
-
-            // only return indexes as json, return number of resulting filtered values for each 
-            return [JSON.stringify(wt_data[0]), JSON.stringify(wf_data[0]), filtered_data_2.length.toLocaleString('en').replace(",", "."), filtered_data.length.toLocaleString('en').replace(",", "."),];
+// Filters a decoded table one column at a time, returns one pass flag per row
+function filter_table(table, selections, ranges, exclude_wfid) {
+    const n_rows = table.rows;
+    var passes = new Uint8Array(n_rows).fill(1);
+
+    // Categorical columns: lookup table of allowed codes, missing values (-1) never pass
+    for (const [name, selected] of Object.entries(selections)) {
+        const column = table.columns[name];
+        const allowed = new Uint8Array(column.categories.length);
+        const chosen = new Set(selected);
+        column.categories.forEach((category, code) => { allowed[code] = chosen.has(category) ? 1 : 0 });
+        const codes = column.values;
+        for (let row = 0; row < n_rows; row++) {
+            passes[row] &= codes[row] >= 0 ? allowed[codes[row]] : 0;
         }
     }
+
+    // Numeric columns: closed range
+    for (const [name, range] of Object.entries(ranges)) {
+        const values = table.columns[name].values;
+        const low = range[0], high = range[1];
+        for (let row = 0; row < n_rows; row++) {
+            passes[row] &= (values[row] >= low) & (values[row] <= high);
+        }
+    }
+
+    if (exclude_wfid !== undefined) {
+        const wfids = table.columns["WFid"].values;
+        for (let row = 0; row < n_rows; row++) {
+            passes[row] &= wfids[row] != exclude_wfid;
+        }
+    }
+    return passes;
+}
+
+// Reads a protobuf varint at state.pos (values above 2^53 lose precision)
+function read_varint(bytes, state) {
+    var value = 0, factor = 1, byte;
+    do {
+        byte = bytes[state.pos++];
+        value += (byte & 0x7f) * factor;
+        factor *= 128;
+    } while (byte >= 0x80);
+    return value;
+}
+
+// Calls on_field(field, value) for the fields of a message, value is a number for varints
+// and the [start, end) byte range for length-delimited fields
+function read_message(bytes, start, end, on_field) {
+    var state = { 'pos': start };
+    while (state.pos < end) {
+        const key = read_varint(bytes, state);
+        if ((key & 7) == 0) {
+            on_field(key >> 3, read_varint(bytes, state));
+        } else if ((key & 7) == 2) {
+            const length = read_varint(bytes, state);
+            on_field(key >> 3, [state.pos, state.pos + length]);
+            state.pos += length;
+        } else {
+            throw new Error("Unsupported wire type " + (key & 7));
+        }
+    }
+}
+
+function read_packed(bytes, range) {
+    var values = [], state = { 'pos': range[0] };
+    while (state.pos < range[1]) {
+        values.push(read_varint(bytes, state));
+    }
+    return values;
+}
+
+// Decodes the point features of a vector tile made by windfarms/tiles.py
+function decode_point_tile(bytes) {
+    var points = [];
+    read_message(bytes, 0, bytes.length, (field, layer) => {
+        if (field != 3) return;
+        var keys = [], values = [], features = [], extent = 4096;
+        read_message(bytes, layer[0], layer[1], (field, value) => {
+            if (field == 2) features.push(value);
+            else if (field == 3) keys.push(new TextDecoder().decode(bytes.subarray(value[0], value[1])));
+            else if (field == 5) extent = value;
+            else if (field == 4) read_message(bytes, value[0], value[1], (type, v) => {
+                // uint_value or sint_value
+                values.push(type == 6 ? (v % 2 ? -(v + 1) / 2 : v / 2) : v);
+            });
+        });
+        for (const range of features) {
+            var point = { 'properties': {} };
+            read_message(bytes, range[0], range[1], (field, value) => {
+                if (field == 2) {
+                    const tags = read_packed(bytes, value);
+                    for (let i = 0; i < tags.length; i += 2) point.properties[keys[tags[i]]] = values[tags[i + 1]];
+                } else if (field == 4) {
+                    const geometry = read_packed(bytes, value);
+                    const zigzag = (v) => (v % 2 ? -(v + 1) / 2 : v / 2);
+                    point.x = zigzag(geometry[1]) / extent;
+                    point.y = zigzag(geometry[2]) / extent;
+                }
+            });
+            points.push(point);
+        }
+    });
+    return points;
+}
+
+// Leaflet maps by container id, so that clientside callbacks can add layers
+var leaflet_maps = {};
+var pending_tile_layers = {};
+if (window.L) {
+    L.Map.addInitHook(function () {
+        const id = this.getContainer().id;
+        leaflet_maps[id] = this;
+        if (pending_tile_layers[id]) {
+            set_tile_layer(id, ...pending_tile_layers[id]);
+        }
+    });
+
+    // Canvas layer drawing the point tiles served from /tiles, a circle per occupied cell
+    // growing with the number of points in it
+    var PointTileLayer = L.GridLayer.extend({
+        createTile: function (coords, done) {
+            var tile = L.DomUtil.create('canvas', 'leaflet-tile');
+            const size = this.getTileSize();
+            tile.width = size.x;
+            tile.height = size.y;
+            fetch(L.Util.template(this.options.url, coords))
+                .then(response => response.status == 200 ? response.arrayBuffer() : null)
+                .then(buffer => {
+                    if (buffer) {
+                        var context = tile.getContext('2d');
+                        context.fillStyle = 'rgba(51, 136, 255, 0.5)';
+                        context.strokeStyle = '#3388ff';
+                        for (const point of decode_point_tile(new Uint8Array(buffer))) {
+                            const count = point.properties.point_count;
+                            const radius = count > 1 ? Math.min(3 + 2 * Math.log10(count), 12) : 3;
+                            context.beginPath();
+                            context.arc(point.x * size.x, point.y * size.y, radius, 0, 2 * Math.PI);
+                            context.fill();
+                            context.stroke();
+                        }
+                    }
+                    done(null, tile);
+                })
+                .catch(error => done(error, tile));
+            return tile;
+        }
+    });
 }
-);
 
+var tile_layers = {};
+function set_tile_layer(map_id, url, visible) {
+    const map = leaflet_maps[map_id];
+    if (!map) {
+        pending_tile_layers[map_id] = [url, visible];
+        return;
+    }
+    delete pending_tile_layers[map_id];
+    var layer = tile_layers[map_id];
+    if (layer && layer.options.url != url) {
+        map.removeLayer(layer);
+        delete tile_layers[map_id];
+        layer = undefined;
+    }
+    if (!layer && url) {
+        layer = tile_layers[map_id] = new PointTileLayer({ 'url': url, 'maxNativeZoom': 14 });
+    }
+    if (layer && visible) map.addLayer(layer);
+    if (layer && !visible) map.removeLayer(layer);
+}
 
+// Function that filters data
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    clientside: {
+        filter_function: function (nc, data_wt, data_wf, value_lc, value_ctr, value_cont, value_turb_slider, value_lf, value_dist_slider, value_elev_slider, value_shape) {
 
+            const selections = { "Country": value_ctr, "Land Cover": value_lc, "Continent": value_cont, "Landform": value_lf, "Shape": value_shape };
+            const ranges = { "Number of turbines": value_turb_slider, "Turbine Spacing": value_dist_slider, "Elevation": value_elev_slider };
 
+            // Filter turbines
+            const table_wt = decode_table(data_wt);
+            var wt_data = encode_bits(filter_table(table_wt, selections, ranges), table_wt.rows);
 
+            // filter wind farms
+            const table_wf = decode_table(data_wf);
+            var wf_data = encode_bits(filter_table(table_wf, selections, ranges, -1), table_wf.rows);
 
+            // only return row bitsets, return number of resulting filtered values for each
+            return [wt_data, wf_data, wf_data.count.toLocaleString('en').replace(",", "."), wt_data.count.toLocaleString('en').replace(",", "."),];
+        },
 
+        // Shows the turbine vector tiles of the current filter while the Wind Turbines layer is selected
+        tile_layer: function (url, base_layer, map_id) {
+            set_tile_layer(map_id, url, base_layer == "Wind Turbines");
+            return url;
+        }
+    }
+}
+);
@@ -0,0 +1,44 @@
+"""
+Map layer payloads of the server-side viewport clustering against shipping
+every filtered point as geobuf for clustering in the browser.
+
+Usage: python -m benchmarks.bench_clustering
+"""
+import json
+import tempfile
+
+import dash_leaflet.express as dlx
+
+from benchmarks.common import WF_CSV, timeit, turbine_csv
+from windfarms import ClusterIndex, load_table
+
+# Map bounds per zoom level as sent by dl.Map, [[south, west], [north, east]]
+VIEWPORTS = {
+    "world (zoom 2)": (2, [[-60, -200], [80, 200]]),
+    "Europe (zoom 5)": (5, [[35, -15], [60, 30]]),
+    "Northern Germany (zoom 8)": (8, [[52.5, 7], [54, 11]]),
+    "one farm (zoom 13)": (13, [[53.5, 8.5], [53.6, 8.7]]),
+}
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, path in [("wind farms", WF_CSV), ("wind turbines", turbine_csv(tmp_dir))]:
+            store = load_table(path, sort_by="WFid")
+            frame = store.to_frame(["lon", "lat", "WFid"])
+            print(f"{name} ({store.rows:,} points)")
+
+            ms, geobuf = timeit(lambda: dlx.geojson_to_geobuf(dlx.dicts_to_geojson(frame.to_dict("records"), lon="lon")), 1)
+            print(f"  {'geobuf, all points':<30}{ms:>10.1f} ms{len(geobuf) / 2**10:>12.1f} KB")
+
+            ms, index = timeit(lambda: ClusterIndex(store["lon"], store["lat"], {"WFid": store["WFid"]}), 3)
+            print(f"  {'cluster index build':<30}{ms:>10.1f} ms")
+            for viewport, (zoom, bounds) in VIEWPORTS.items():
+                bbox = [bounds[0][1], bounds[0][0], bounds[1][1], bounds[1][0]]
+                ms, features = timeit(lambda: index.get_clusters(bbox, zoom))
+                size = len(json.dumps(dlx.dicts_to_geojson([]) | {"features": features}))
+                print(f"  {viewport:<30}{ms:>10.1f} ms{size / 2**10:>12.1f} KB{len(features):>8} features")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+The Frequency tab: its three outputs from the filtered rows versus from the
+cells of the aggregation cube, for the full turbine table and the table
+repeated 4 times. The cube does not grow with repeated rows, only its
+counts do. Then the summary statistics of the wind farm cells: weighted
+describe versus merged value histograms, with the largest relative
+difference between the two.
+
+Usage: python -m benchmarks.bench_cube
+"""
+import tempfile
+
+from benchmarks.common import WF_CSV, tiled, timeit, turbine_csv
+from helpfile import plot_wf_histograms
+from windfarms import AggregationCube, FilterEngine, bitset, describe_weighted, load_table
+from windfarms.histogram import ValueHistogram
+
+AXES = ["Country", "Continent", "Land Cover", "Landform", "Shape", "Number of turbines", "Elevation", "Turbine Spacing"]
+SELECTIONS = {"Continent": ["Europe", "Asia"]}
+RANGES = {"Elevation": [0, 1000]}
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        farms = load_table(WF_CSV, sort_by="WFid")
+        turbines = load_table(turbine_csv(tmp_dir), sort_by="WFid")
+        wf_engine = FilterEngine(farms, exclude_wfids=[-1])
+        ms, wf_cube = timeit(lambda: AggregationCube(farms, exclude_wfids=[-1]), 1)
+        print(f"wind farm cube: {farms.rows:,} rows -> {len(wf_cube):,} cells, {ms:.0f} ms")
+        wf_bits = wf_engine.bits(SELECTIONS, RANGES)
+        wf_frame = farms.to_frame()[bitset.to_mask(wf_bits, farms.rows)]
+
+        for factor in [1, 4]:
+            store = tiled(turbines, factor) if factor > 1 else turbines
+            engine = FilterEngine(store)
+            ms, cube = timeit(lambda: AggregationCube(store), 1)
+            print(f"turbine cube x{factor}: {store.rows:,} rows -> {len(cube):,} cells, {ms:.0f} ms")
+            frame = store.to_frame()
+            bits = engine.bits(SELECTIONS, RANGES)
+
+            def rows():
+                wt_frame = frame[bitset.to_mask(bits, store.rows)]
+                return [plot_wf_histograms(wt_frame, wf_frame, axis) for axis in AXES]
+
+            def cells():
+                wt_cells = cube.frame(cube.cell_mask(bits))
+                wf_cells = wf_cube.frame(wf_cube.cell_mask(wf_bits))
+                return [plot_wf_histograms(wt_cells, wf_cells, axis, cells=True) for axis in AXES]
+
+            def histograms():
+                wt_cells = cube.frame(cube.cell_mask(bits))
+                wf_cells = wf_cube.frame(wf_cube.cell_mask(wf_bits))
+                return [plot_wf_histograms(wt_cells, wf_cells, axis, cells=True, wf_cube=wf_cube) for axis in AXES]
+
+            for name, fn in [("rows", rows), ("cells", cells), ("histograms", histograms)]:
+                ms, _ = timeit(fn, 3)
+                print(f"  8 axes from {name:<11}{ms:>9.0f} ms")
+
+        wf_cells = wf_cube.frame()
+        print(f"statistics of {len(wf_cells):,} wind farm cells")
+        for name in wf_cube.numeric:
+            ms, histogram = timeit(lambda: ValueHistogram(wf_cube.cells[name], wf_cube.counts), 1)
+            print(f"  {name}: histograms built in {ms:.0f} ms, {len(histogram.distinct):,} distinct values")
+            for by in [None, "Country"]:
+                codes = None if by is None else wf_cells[by].cat.codes.to_numpy()
+                exact_ms, exact = timeit(lambda: describe_weighted(wf_cells[name], wf_cells["count"], codes), 5)
+                histogram_ms, merged = timeit(lambda: histogram.describe(wf_cells["cell"].to_numpy(), codes), 5)
+                difference = ((merged - exact).abs() / exact.abs()).max().max()
+                print(f"    by {by or '-':<8} exact {exact_ms:>6.1f} ms, histogram {histogram_ms:>6.1f} ms, difference {difference:.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Fetching the turbines of wind farms by WFid: comparing the WFid column of
+every turbine against slicing the WFid-sorted table at its offsets.
+
+Usage: python -m benchmarks.bench_farm_lookup
+"""
+import tempfile
+
+import numpy as np
+
+from benchmarks.common import timeit, turbine_csv
+from helpfile import wind_farm_turbines
+from windfarms import load_table
+from windfarms.indexes import OffsetIndex
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = load_table(turbine_csv(tmp_dir), sort_by="WFid")
+        frame = store.to_frame()
+        ms, offsets = timeit(lambda: OffsetIndex(store["WFid"]), 3)
+        print(f"offset index over {store.rows:,} turbines: {ms:.1f} ms")
+
+        wfids = np.random.default_rng(0).choice(np.unique(store["WFid"][store["WFid"] >= 0]), 100, replace=False)
+        for n in [1, 100]:
+            for name, index in [("full scan", None), ("offset slice", offsets)]:
+                ms, _ = timeit(lambda: [wind_farm_turbines(frame, wfid, index) for wfid in wfids[:n]])
+                print(f"  {n:>3} farms  {name:<14}{ms:>10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
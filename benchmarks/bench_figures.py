@@ -0,0 +1,57 @@
+"""
+Single wind farm plots on marker clicks: building the figure on every click
+versus the figure cache, pre-warmed with the largest farms, for clicks that
+favour the large farms (Zipf-distributed over the farms by size).
+
+Usage: python -m benchmarks.bench_figures
+"""
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import timeit, turbine_csv
+from helpfile import plot_single_windfarm_mapbox
+from windfarms import FigureCache, load_table, load_views
+from windfarms.indexes import GridIndex, OffsetIndex
+
+CLICKS = 300
+WARM = 50
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = load_table(turbine_csv(tmp_dir), sort_by="WFid")
+        frame = store.to_frame()
+        offsets = OffsetIndex(store["WFid"])
+        grid = GridIndex(store["lon"], store["lat"])
+        views = load_views(store, f"{tmp_dir}/views")
+
+        def build(wfid):
+            return plot_single_windfarm_mapbox(frame, wfid, offsets=offsets, spatial_index=grid, views=views)
+
+        wfids, sizes = np.unique(store["WFid"][store["WFid"] >= 0], return_counts=True)
+        by_size = wfids[np.argsort(-sizes, kind="stable")].tolist()
+        rng = np.random.default_rng(0)
+        ranks = np.minimum(rng.zipf(1.3, CLICKS), len(by_size)) - 1
+        clicks = [by_size[rank] for rank in ranks]
+        print(f"{CLICKS} clicks on {len(set(clicks))} of {len(by_size)} farms")
+
+        ms, _ = timeit(lambda: [build(wfid).to_plotly_json() for wfid in clicks[:30]], 1)
+        print(f"  uncached      {ms / 30:>8.1f} ms per click")
+
+        cache = FigureCache(build, max_bytes=64 * 2**20)
+        start = time.perf_counter()
+        added = cache.warm(by_size[:WARM])
+        print(f"  warm {added} largest farms {time.perf_counter() - start:>6.1f} s, {cache.bytes / 2**20:.1f} MB")
+        ms, _ = timeit(lambda: [cache.get(wfid) for wfid in clicks], 1)
+        print(f"  cached        {ms / CLICKS:>8.1f} ms per click")
+        ms, _ = timeit(lambda: [cache.get(wfid) for wfid in by_size[:10]], 3)
+        print(f"  hit           {ms / 10:>8.1f} ms per click")
+        stats = cache.stats()
+        print(f"  hit rate {stats['hit_rate']:.1%}, {stats['entries']} figures, {stats['bytes'] / 2**20:.1f} MB, "
+              f"build {stats['mean_build_ms']:.0f} ms mean / {stats['max_build_ms']:.0f} ms max")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Latency of the server-side filter engine on the full turbine table and on a
+10x copy of it, the cost of moving a single range slider, and the page payload that the clientside filter needed for
+its data stores.
+
+Usage: python -m benchmarks.bench_filter
+"""
+import json
+import tempfile
+
+from benchmarks.common import WF_CSV, tiled, timeit, turbine_csv
+from windfarms import FilterEngine, load_table
+
+
+def scenarios(store):
+    everything = {name: store.categories(name) for name in ["Country", "Continent", "Land Cover", "Landform", "Shape"]}
+    full_ranges = {"Number of turbines": [1, 4086], "Turbine Spacing": [10, 13155], "Elevation": [-46, 4684]}
+    return {
+        "defaults": (everything, full_ranges),
+        "one country": (dict(everything, Country=["Germany"]), full_ranges),
+        "all but one": (dict(everything, Country=everything["Country"][1:]), full_ranges),
+        "half of all": ({name: values[::2] for name, values in everything.items()}, full_ranges),
+        "sliders only": (everything, {"Number of turbines": [10, 200], "Turbine Spacing": [200, 800], "Elevation": [0, 500]}),
+    }
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tables = {"wind farms": load_table(WF_CSV, sort_by="WFid"), "wind turbines": load_table(turbine_csv(tmp_dir), sort_by="WFid")}
+        scaled = {**tables, "turbines x10": tiled(tables["wind turbines"], 10)}
+
+        print("Filter latency")
+        for label, store in scaled.items():
+            engine = FilterEngine(store)
+            for name, (selections, ranges) in scenarios(store).items():
+                ms, mask = timeit(lambda: engine.mask(selections, ranges))
+                print(f"  {label:<14}{name:<14}{store.rows:>9} rows {mask.sum():>9} hits {ms:>8.2f} ms")
+
+        print("Moving one slider (sort permutation index, other sliders unchanged)")
+        for label, store in scaled.items():
+            engine = FilterEngine(store)
+            selections, ranges = scenarios(store)["sliders only"]
+            engine.bits(selections, ranges)
+            steps = iter(range(10**6))
+
+            def move_slider():
+                ranges["Elevation"] = [0, 500 + next(steps)]
+                return engine.sorted_indexes["Elevation"].select(*ranges["Elevation"])
+
+            ms, _ = timeit(move_slider)
+            print(f"  {label:<14}{'range query':<14}{store.rows:>9} rows {ms:>24.2f} ms")
+            def move_slider_and_filter():
+                ranges["Elevation"] = [0, 500 + next(steps)]
+                return engine.bits(selections, ranges)
+
+            ms, _ = timeit(move_slider_and_filter)
+            print(f"  {label:<14}{'full filter':<14}{store.rows:>9} rows {ms:>24.2f} ms")
+
+        print("Payload of the full data stores shipped for the clientside filter")
+        for label, store in tables.items():
+            size = len(json.dumps(store.to_frame().to_dict("list")))
+            print(f"  {label:<14}{size / 2**20:>8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
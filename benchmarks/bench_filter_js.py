@@ -0,0 +1,60 @@
+"""
+Browser-side filter time and memory of the typed-array clientside filter
+against the former row-object implementation, run headless with Node.js.
+
+Usage: python -m benchmarks.bench_filter_js
+"""
+import json
+import os
+import subprocess
+import tempfile
+
+from benchmarks.common import WF_CSV, turbine_csv
+from windfarms import encode_columns, load_table
+from windfarms.filtering import CATEGORICAL_FILTERS, RANGE_FILTERS
+
+
+def filter_args(store):
+    """
+    :returns: filter menu values in the argument order of filter_function, per scenario
+    """
+    everything = {name: store.categories(name) for name in CATEGORICAL_FILTERS}
+    full = {"Number of turbines": [1, 4086], "Turbine Spacing": [10, 13155], "Elevation": [-46, 4684]}
+
+    def args(selections, ranges):
+        return [selections["Land Cover"], selections["Country"], selections["Continent"], ranges["Number of turbines"],
+                selections["Landform"], ranges["Turbine Spacing"], ranges["Elevation"], selections["Shape"]]
+
+    return {
+        "defaults": args(everything, full),
+        "one country, narrow sliders": args(dict(everything, Country=["Germany"]),
+                                            {"Number of turbines": [10, 200], "Turbine Spacing": [200, 800], "Elevation": [0, 500]}),
+    }
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        wt = load_table(turbine_csv(tmp_dir), sort_by="WFid")
+        wf = load_table(WF_CSV, sort_by="WFid")
+        columns = ["WFid"] + CATEGORICAL_FILTERS + RANGE_FILTERS
+
+        inputs = {
+            "args.json": filter_args(wt),
+            "wt_rows.json": wt.to_frame().to_dict("list"),
+            "wf_rows.json": wf.to_frame().to_dict("list"),
+            "wt_typed.json": encode_columns(wt, columns),
+            "wf_typed.json": encode_columns(wf, columns),
+        }
+        for name, data in inputs.items():
+            with open(os.path.join(tmp_dir, name), "w") as f:
+                json.dump(data, f)
+
+        for name in ["wt_rows.json", "wt_typed.json"]:
+            print(f"{name:<16}{os.path.getsize(os.path.join(tmp_dir, name)) / 2**20:>8.1f} MB store payload")
+
+        harness = os.path.join(os.path.dirname(__file__), "filter_harness.js")
+        subprocess.run(["node", "--expose-gc", "--max-old-space-size=8192", harness, tmp_dir], check=True)
+
+
+if __name__ == "__main__":
+    main()
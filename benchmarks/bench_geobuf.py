@@ -0,0 +1,49 @@
+"""
+Throughput and peak memory of encoding all wind farm and turbine points as
+geobuf, NumPy encoder against the DataFrame -> records -> GeoJSON -> geobuf
+chain of dash_leaflet.express.
+
+Usage: python -m benchmarks.bench_geobuf
+"""
+import tempfile
+import tracemalloc
+
+import dash_leaflet.express as dlx
+
+from benchmarks.common import WF_CSV, timeit, turbine_csv
+from windfarms import load_table, points_to_geobuf
+
+
+def peak_memory(fn):
+    """
+    :returns: peak of the memory allocated while running fn, in MB
+    """
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, path in [("wind farms", WF_CSV), ("wind turbines", turbine_csv(tmp_dir))]:
+            store = load_table(path, sort_by="WFid")
+            frame = store.to_frame(["lon", "lat", "WFid"])
+            lon, lat, wfid = store["lon"], store["lat"], store["WFid"]
+            encoders = {
+                "dlx chain": lambda: dlx.geojson_to_geobuf(dlx.dicts_to_geojson(frame.to_dict("records"), lon="lon")),
+                "numpy encoder": lambda: points_to_geobuf(lon, lat, {"WFid": wfid}),
+            }
+
+            print(f"{name} ({store.rows:,} points)")
+            results = {}
+            for encoder, fn in encoders.items():
+                ms, results[encoder] = timeit(fn, 3)
+                peak = peak_memory(fn)
+                print(f"  {encoder:<16}{ms:>10.1f} ms{store.rows / ms / 1000:>8.2f} M points/s{peak:>10.1f} MB peak")
+            assert results["dlx chain"] == results["numpy encoder"]
+
+
+if __name__ == "__main__":
+    main()
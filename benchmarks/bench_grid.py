@@ -0,0 +1,40 @@
+"""
+The 1 km grids of the wind farm plots: turf.square_grid over the buffered
+bounding boxes of the largest farms, as GeoJSON polygons, as arrays and as
+deduplicated lines, the size of the map layers as JSON, and masked by a polygon.
+
+Usage: python -m benchmarks.bench_grid
+"""
+import json
+import tempfile
+
+import numpy as np
+
+import turf
+from benchmarks.common import timeit, turbine_csv
+from windfarms import load_table, load_views
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = load_table(turbine_csv(tmp_dir), sort_by="WFid")
+        views = load_views(store, f"{tmp_dir}/views").views
+        largest = views[np.argsort(views["grid_shape"].prod(axis=1))[-100:]]
+        bboxes = largest["bbox"].tolist()
+        print(f"100 largest grids: {largest['grid_shape'].prod(axis=1).sum():,} cells")
+
+        for output in ["polygons", "array", "lines"]:
+            ms, grids = timeit(lambda: [turf.square_grid(bbox, 1000, {"units": "meters"}, output=output) for bbox in bboxes], 3)
+            size = "" if output == "array" else f"  ({sum(len(json.dumps(grid)) for grid in grids) / 1e6:.2f} MB JSON)"
+            print(f"  square_grid  {output:<9}{ms:>10.1f} ms{size}")
+
+        # Mask: a diamond inscribed in the bounding box of the largest farm
+        west, south, east, north = bboxes[-1]
+        mid_x, mid_y = (west + east) / 2, (south + north) / 2
+        mask = turf.polygon([[[mid_x, south], [east, mid_y], [mid_x, north], [west, mid_y], [mid_x, south]]])
+        ms, grid = timeit(lambda: turf.square_grid(bboxes[-1], 1000, {"units": "meters", "mask": mask}), 3)
+        print(f"  square_grid  masked   {ms:>10.1f} ms  ({len(grid['features'])} cells)")
+
+
+if __name__ == "__main__":
+    main()
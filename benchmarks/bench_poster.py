@@ -0,0 +1,70 @@
+"""
+The 100-subplot wind farm poster: the +-1° box queries of its context
+turbines alone, scanning all turbines versus the grid index, the context
+turbines within +-1° versus the visible extent of the subplots for farms in
+dense regions, the whole poster with either index, and the rows streamed
+as figure dicts with the precomputed map views, as the poster job of the
+app draws them, serially and with the farms drawn in thread pools.
+
+Usage: python -m benchmarks.bench_poster
+"""
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import WF_CSV, timeit, turbine_csv
+from helpfile import POSTER_PLOT_MAX_TURBINES, iter_wf_poster, plot_wf_poster, turbines_in_box, turbines_in_view, zoom_center
+from windfarms import load_table, load_views
+from windfarms.indexes import GridIndex, OffsetIndex
+
+ROWS = COLS = 10
+
+
+def farm_zoom_center(lon, lat):
+    """
+    :returns: zoom and center of a farm plot around a single point, see helpfile.zoom_center
+    """
+    return zoom_center([lon - 0.02, lat - 0.02, lon + 0.02, lat + 0.02])
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = load_table(turbine_csv(tmp_dir), sort_by="WFid")
+        frame = store.to_frame()
+        farms = pd.read_csv(WF_CSV)
+        farms = farms[farms["WFid"] != -1]
+        offsets = OffsetIndex(store["WFid"])
+        ms, grid = timeit(lambda: GridIndex(store["lon"], store["lat"]), 3)
+        print(f"grid index over {store.rows:,} turbines: {ms:.1f} ms")
+
+        sample = farms.sample(ROWS * COLS, random_state=0)
+        centers = [{"lon": lon, "lat": lat} for lon, lat in zip(sample["lon"], sample["lat"])]
+        for name, index in [("full scan", None), ("grid index", grid)]:
+            ms, boxes = timeit(lambda: [turbines_in_box(frame, center, index) for center in centers])
+            print(f"  {len(centers)} box queries  {name:<12}{ms:>10.2f} ms  ({np.mean([len(box) for box in boxes]):,.0f} turbines per box)")
+
+        # 10x10 subplots of 173 x 148 pixels
+        for country in ["Germany", "China"]:
+            dense = farms[farms["Country"] == country].sample(ROWS * COLS, random_state=0)
+            views = [(wfid, *zoom_center) for wfid, zoom_center in zip(dense["WFid"], map(farm_zoom_center, dense["lon"], dense["lat"]))]
+            in_box = np.mean([len(turbines_in_box(frame, center, grid)) for _, _, center in views])
+            in_view = np.mean([len(turbines_in_view(frame, wfid, center, zoom, (173, 148), grid, max_turbines=POSTER_PLOT_MAX_TURBINES)) for wfid, zoom, center in views])
+            size = len(plot_wf_poster(frame, dense, plot_rows=ROWS, plot_col=COLS, offsets=offsets, spatial_index=grid).to_json())
+            print(f"  {country:<8} +-1° {in_box:>8,.0f}  in view {in_view:>6,.0f} turbines per subplot, poster {size / 1e6:.1f} MB JSON")
+
+        for name, index in [("full scan", None), ("grid index", grid)]:
+            ms, _ = timeit(lambda: plot_wf_poster(frame, farms, plot_rows=ROWS, plot_col=COLS, offsets=offsets, spatial_index=index), 1)
+            print(f"  {ROWS}x{COLS} poster      {name:<12}{ms:>10.0f} ms")
+
+        views = load_views(store)
+        for name, workers in [("serial", 1)] + [(f"{n} threads", n) for n in sorted({2, 4, os.cpu_count() or 1} - {1})]:
+            with ThreadPoolExecutor(workers) if workers > 1 else nullcontext() as executor:
+                ms, rows = timeit(lambda: list(iter_wf_poster(frame, farms, plot_rows=ROWS, plot_col=COLS, offsets=offsets, spatial_index=grid, views=views, executor=executor)), 2)
+            print(f"  {ROWS}x{COLS} poster      {len(rows)} rows streamed, {name:<10}{ms:>10.0f} ms")
+
+if __name__ == "__main__":
+    main()
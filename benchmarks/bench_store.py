@@ -0,0 +1,72 @@
+"""
+Cold start and resident memory of loading the tables from CSV versus the
+memory-mapped column store.
+
+Each variant runs in a fresh interpreter so that start-up time and peak RSS
+are measured the way a newly booted gunicorn worker sees them. Then the
+memory of every column of both tables: parsed from the CSV file (object
+strings, int64 and float64) versus the frames of the column stores
+(category dtypes, downcast numbers, the in-farm flag added).
+
+Usage: python -m benchmarks.bench_store
+"""
+import json
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+from benchmarks.common import WF_CSV, turbine_csv
+from windfarms.store import load_table
+
+CHILD = r"""
+import json, resource, sys, time
+import numpy as np, pandas as pd
+from windfarms.store import load_table
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+mode, paths = sys.argv[1], sys.argv[2:]
+base = rss_mb()
+start = time.perf_counter()
+if mode == "csv":
+    frames = [pd.read_csv(p) for p in paths]
+else:
+    frames = [load_table(p, sort_by="WFid").to_frame() for p in paths]
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "rss_mb": rss_mb() - base,
+                  "frame_mb": sum(f.memory_usage(deep=True).sum() for f in frames) / 2**20}))
+"""
+
+
+def run(mode, paths):
+    out = subprocess.run([sys.executable, "-c", CHILD, mode, *paths], check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = [WF_CSV, turbine_csv(tmp_dir)]
+        run("store", paths)  # build the stores outside of the measurement
+
+        print(f"{'loader':<8}{'cold start (s)':>16}{'RSS delta (MB)':>16}{'frame (MB)':>12}")
+        for mode in ["csv", "store"]:
+            r = run(mode, paths)
+            print(f"{mode:<8}{r['seconds']:>16.3f}{r['rss_mb']:>16.1f}{r['frame_mb']:>12.1f}")
+
+        for name, path in zip(["wind farms", "wind turbines"], paths):
+            before = pd.read_csv(path).memory_usage(index=False, deep=True)
+            frame = load_table(path, sort_by="WFid").to_frame()
+            after = frame.memory_usage(index=False, deep=True)
+            print(f"\n{name:<20}{'CSV (bytes)':>18}{'store (bytes)':>15}  dtype")
+            for column in after.index:
+                csv_bytes = f"{before[column]:,}" if column in before else "-"
+                print(f"{column:<20}{csv_bytes:>18}{after[column]:>15,}  {frame[column].dtype}")
+            print(f"{'total':<20}{before.sum():>18,}{after.sum():>15,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Build time and size of the turbine tile pyramid, and the bytes and time to
+fill a map view from it, with and without a filter.
+
+Usage: python -m benchmarks.bench_tiles
+"""
+import os
+import tempfile
+
+import numpy as np
+
+from benchmarks.common import timeit, turbine_csv
+from windfarms import load_table
+from windfarms.clustering import lat_to_y, lon_to_x
+from windfarms.tiles import TileSet, build_tiles
+
+# Map views as (zoom, [west, south, east, north])
+VIEWS = {
+    "world (zoom 2)": (2, [-180, -60, 180, 80]),
+    "Europe (zoom 5)": (5, [-15, 35, 30, 60]),
+    "Northern Germany (zoom 8)": (8, [7, 52.5, 11, 54]),
+}
+
+
+def view_tiles(zoom, bbox):
+    scale = 2**zoom
+    west, south, east, north = bbox
+    xs = range(int(lon_to_x(west) * scale), min(int(lon_to_x(east) * scale), scale - 1) + 1)
+    ys = range(int(lat_to_y(north) * scale), min(int(lat_to_y(south) * scale), scale - 1) + 1)
+    return [(zoom, x, y) for x in xs for y in ys]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = load_table(turbine_csv(tmp_dir), sort_by="WFid")
+        path = os.path.join(tmp_dir, "wt.mbtiles")
+        ms, _ = timeit(lambda: build_tiles(store, path), 1)
+        print(f"pyramid z0-z14 of {store.rows:,} points: {ms / 1000:.1f} s, {os.path.getsize(path) / 2**20:.1f} MB")
+
+        tiles = TileSet(path, store)
+        filters = {"all rows": None, "Elevation > 500": np.asarray(store["Elevation"]) > 500}
+        for view, (zoom, bbox) in VIEWS.items():
+            positions = view_tiles(zoom, bbox)
+            for name, mask in filters.items():
+                ms, data = timeit(lambda: [tiles.tile(*position, mask) for position in positions])
+                size = sum(len(d) for d in data if d is not None)
+                print(f"  {view:<28}{name:<18}{len(positions):>5} tiles{ms:>10.1f} ms{size / 2**10:>10.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
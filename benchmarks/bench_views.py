@@ -0,0 +1,54 @@
+"""
+Viewports and 1 km grids of the wind farm plots: computing them from the
+turbines of a farm on every draw versus reading the precomputed views, with
+and without the grid cache.
+
+Usage: python -m benchmarks.bench_views
+"""
+import os
+import tempfile
+
+import numpy as np
+
+from benchmarks.common import timeit, turbine_csv
+from helpfile import farm_grid, farm_viewport, wind_farm_turbines
+from windfarms import build_views, load_table
+from windfarms.indexes import OffsetIndex
+from windfarms.views import FarmViews
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = load_table(turbine_csv(tmp_dir), sort_by="WFid")
+        frame = store.to_frame()
+        offsets = OffsetIndex(store["WFid"])
+        path = os.path.join(tmp_dir, "views")
+        ms, _ = timeit(lambda: build_views(store, path), 1)
+        print(f"views of all farms: {ms:.0f} ms, {sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 1e6:.1f} MB")
+        ms, views = timeit(lambda: FarmViews(path), 3)
+        print(f"load views: {ms:.2f} ms")
+
+        wfids = np.random.default_rng(0).choice(np.unique(store["WFid"][store["WFid"] >= 0]), 100, replace=False).tolist()
+
+        def computed():
+            for wfid in wfids:
+                farm = wind_farm_turbines(frame, wfid, offsets)
+                bbox_buff, _, _ = farm_viewport(farm["lon"].to_numpy(), farm["lat"].to_numpy())
+                farm_grid(bbox_buff)
+
+        def precomputed(views):
+            for wfid in wfids:
+                views.viewport(wfid)
+                views.grid(wfid)
+
+        ms, _ = timeit(computed, 3)
+        print(f"  100 farms  computed per draw   {ms:>9.1f} ms")
+        ms, _ = timeit(lambda: precomputed(FarmViews(path, cache_size=0)), 3)
+        print(f"  100 farms  views, cold grids   {ms:>9.1f} ms")
+        precomputed(views)
+        ms, _ = timeit(lambda: precomputed(views), 3)
+        print(f"  100 farms  views, cached grids {ms:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
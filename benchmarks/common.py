@@ -0,0 +1,77 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from windfarms.store import ColumnStore
+
+WF_CSV = "data/wf_data_final.csv"
+WT_CSV = "data/wt_data_final.csv"
+
+# Size of the published turbine table
+N_TURBINES = 359947
+
+
+def synthetic_turbines(wf_csv: str = WF_CSV, n_rows: int = N_TURBINES, seed: int = 0) -> pd.DataFrame:
+    """
+    Builds a turbine table with the layout of ``wt_data_final.csv`` from the
+    wind farm table, for machines where only the wind farm CSV is available.
+    Each farm contributes "Number of turbines" points jittered around its
+    centroid, the remainder are stand-alone turbines (WFid -1).
+    """
+    rng = np.random.default_rng(seed)
+    farms = pd.read_csv(wf_csv)
+    farms = farms[farms["WFid"] != -1]
+
+    repeats = farms["Number of turbines"].to_numpy()
+    turbines = farms.loc[farms.index.repeat(repeats)].reset_index(drop=True)
+    spread = np.repeat(np.sqrt(repeats) * 0.004, repeats)
+    turbines["lon"] += rng.normal(0, 1, len(turbines)) * spread
+    turbines["lat"] += rng.normal(0, 1, len(turbines)) * spread
+
+    n_single = max(n_rows - len(turbines), 0)
+    singles = farms.sample(n_single, replace=True, random_state=seed).reset_index(drop=True)
+    singles["WFid"] = -1
+    singles["Number of turbines"] = 1
+    singles["Shape"] = "Single turbine"
+    singles["lon"] += rng.normal(0, 0.5, n_single)
+    singles["lat"] += rng.normal(0, 0.5, n_single)
+
+    table = pd.concat([turbines, singles], ignore_index=True).iloc[:n_rows]
+    table.insert(0, "id", np.arange(len(table)))
+    return table
+
+
+def turbine_csv(tmp_dir: str, n_rows: int = N_TURBINES) -> str:
+    """
+    :returns: path of the real turbine CSV, or of a synthetic one written to tmp_dir
+    """
+    if os.path.exists(WT_CSV) and n_rows == N_TURBINES:
+        return WT_CSV
+    path = os.path.join(tmp_dir, f"wt_synthetic_{n_rows}.csv")
+    if not os.path.exists(path):
+        synthetic_turbines(n_rows=n_rows).to_csv(path, index=False)
+    return path
+
+
+def timeit(fn, repeat: int = 5):
+    """
+    :returns: best wall-clock time of ``repeat`` calls in milliseconds and the last result
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def tiled(store, factor: int):
+    """
+    :returns: in-memory ColumnStore with every column repeated ``factor`` times
+    """
+    meta = dict(store.meta, rows=store.rows * factor)
+    columns = {name: np.tile(store[name], factor) for name in store.names}
+    return ColumnStore(None, meta, columns)
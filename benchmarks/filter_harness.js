@@ -0,0 +1,80 @@
+// Headless harness for the clientside filter of assets/script.js, run by bench_filter_js.py.
+//
+// Usage: node --expose-gc benchmarks/filter_harness.js <directory with the JSON inputs>
+//
+// Times the typed-array filter_function against the former implementation, which
+// converted both column stores into row objects and filtered with Array.includes.
+const fs = require('fs');
+const path = require('path');
+
+global.window = globalThis;
+global.btoa = (s) => Buffer.from(s, 'binary').toString('base64');
+global.atob = (s) => Buffer.from(s, 'base64').toString('binary');
+eval(fs.readFileSync(path.join(__dirname, '..', 'assets', 'script.js'), 'utf8'));
+
+// Former clientside filter, kept here for comparison
+function legacy_filter(nc, data_wt, data_wf, value_lc, value_ctr, value_cont, value_turb_slider, value_lf, value_dist_slider, value_elev_slider, value_shape) {
+    const keys = Object.keys(data_wt);
+    var data_wt_json = [];
+    for (let row = 0; row < 359947; row++) {
+        var templist = [];
+        for (const key of keys) {
+            templist[key] = data_wt[key][row];
+        }
+        data_wt_json.push(templist);
+    }
+    const keys_wf = Object.keys(data_wf);
+    var data_wf_json = [];
+    for (let row = 0; row < 359947; row++) {
+        var templist = {};
+        for (const key_wf of keys_wf) {
+            templist[key_wf] = data_wf[key_wf][row];
+        }
+        data_wf_json.push(templist);
+    }
+    var id_array = [];
+    var filtered_data = data_wt_json.filter(d => value_ctr.includes(d["Country"]) && value_lc.includes(d["Land Cover"]) && value_cont.includes(d["Continent"]) &&
+        value_lf.includes(d["Landform"]) && value_shape.includes(d["Shape"]) && (value_turb_slider[0] <= d["Number of turbines"]) &&
+        (value_turb_slider[1] >= d["Number of turbines"]) && (value_dist_slider[0] <= d["Turbine Spacing"]) &&
+        (value_dist_slider[1] >= d["Turbine Spacing"]) && (value_elev_slider[0] <= d["Elevation"]) &&
+        (value_elev_slider[1] >= d["Elevation"]));
+    filtered_data.forEach((arr) => { id_array.push(arr.id) });
+    var wfid_array_2 = [];
+    var filtered_data_2 = data_wf_json.filter(d => (d["WFid"] != -1) && value_ctr.includes(d["Country"]) && value_lc.includes(d["Land Cover"]) && value_cont.includes(d["Continent"]) &&
+        value_lf.includes(d["Landform"]) && value_shape.includes(d["Shape"]) && (value_turb_slider[0] <= d["Number of turbines"]) &&
+        (value_turb_slider[1] >= d["Number of turbines"]) && (value_dist_slider[0] <= d["Turbine Spacing"]) &&
+        (value_dist_slider[1] >= d["Turbine Spacing"]) && (value_elev_slider[0] <= d["Elevation"]) &&
+        (value_elev_slider[1] >= d["Elevation"]));
+    filtered_data_2.forEach((arr) => { wfid_array_2.push(arr.WFid) });
+    return [JSON.stringify({ 'id': id_array }), JSON.stringify({ 'WFid': wfid_array_2 }), filtered_data_2.length, filtered_data.length];
+}
+
+function measure(label, fn, repeat) {
+    var best = Infinity, result, peak = 0;
+    for (let i = 0; i < repeat; i++) {
+        global.gc && global.gc();
+        const before = process.memoryUsage().heapUsed;
+        const start = process.hrtime.bigint();
+        result = fn();
+        best = Math.min(best, Number(process.hrtime.bigint() - start) / 1e6);
+        peak = Math.max(peak, process.memoryUsage().heapUsed - before);
+    }
+    console.log(`  ${label.padEnd(26)}${best.toFixed(1).padStart(10)} ms${(peak / 2 ** 20).toFixed(1).padStart(10)} MB heap`);
+    return result;
+}
+
+const dir = process.argv[2];
+const read = (name) => JSON.parse(fs.readFileSync(path.join(dir, name), 'utf8'));
+const args = read('args.json');
+const rows_wt = read('wt_rows.json'), rows_wf = read('wf_rows.json');
+const typed_wt = read('wt_typed.json'), typed_wf = read('wf_typed.json');
+
+for (const [scenario, values] of Object.entries(args)) {
+    console.log(scenario);
+    const legacy = measure('row objects + includes', () => legacy_filter(1, rows_wt, rows_wf, ...values), 2);
+    const typed = measure('typed arrays (first call)', () => { decoded_tables = new WeakMap(); return window.dash_clientside.clientside.filter_function(1, typed_wt, typed_wf, ...values) }, 3);
+    measure('typed arrays (decoded)', () => window.dash_clientside.clientside.filter_function(1, typed_wt, typed_wf, ...values), 5);
+    if (legacy[2] != typed[1].count || legacy[3] != typed[0].count) {
+        throw new Error(`Mismatch: ${legacy[2]}/${legacy[3]} vs ${typed[1].count}/${typed[0].count}`);
+    }
+}
@@ -0,0 +1,9 @@
+# Gunicorn settings of the app, read by `gunicorn app:server` from the working directory
+
+
+# Start the background warm-up of the caches (app.start_warmup) in every worker once it has loaded the app, 
+# after the fork, so that the threads run in the worker and not in the master process
+def post_worker_init(worker):
+    import app
+
+    app.start_warmup()
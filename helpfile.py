@@ -1,18 +1,46 @@
 import random
+from functools import partial
 from random import sample
 
 import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from dash import dash_table, html
-from plotly.subplots import make_subplots
 
 
 import turf
+from windfarms.clustering import lat_to_y, lon_to_x, x_to_lon, y_to_lat
+from windfarms.cube import describe_weighted
+from windfarms.store import IN_FARM
+from windfarms.views import LON_ZOOM_RANGE
 
 pd.options.mode.chained_assignment = None  # default='warn'
 
+# Turbine attributes shown when hovering a turbine, with their labels
+HOVER_COLUMNS = {
+    "WFid": "Windfarm ID",
+    "Turbine Spacing": "Turbine Spacing (m)",
+    "Number of turbines": "Number of turbines",
+    "Elevation": "Elevation (m)",
+    "Land Cover": "Land Cover",
+    "Landform": "Landform",
+    "Country": "Country",
+    "Continent": "Continent",
+    "Shape": "Shape",
+}
+
+# One hovertemplate shared by all turbines of a trace, filled from the customdata of each turbine
+HOVER_TEMPLATE = "<br>".join(f"{label}: %{{customdata[{i}]}}" for i, label in enumerate(HOVER_COLUMNS.values()))
+
+# Largest size in pixels (width, height) of the single wind farm plot: 31vw wide on a wide screen, default graph height
+SINGLE_PLOT_SIZE = (800, 450)
+
+# Most turbines drawn in the single wind farm plot and in each subplot of the poster, turbines of the wind farm included
+SINGLE_PLOT_MAX_TURBINES = 5000
+POSTER_PLOT_MAX_TURBINES = 1000
+
 
 # Function that calculates the zoom and center of wind farm to show as scattermapbox plot
 # Source: https://stackoverflow.com/questions/63787612/plotly-automatic-zooming-for-mapbox-maps (last access: 24-11-2022)
@@ -29,11 +57,7 @@ def zoom_center(bbox, width_to_height: float = 2.0):
     }
 
     # longitudinal degreee range by zoom level (20 to 1)
-    lon_zoom_range = np.array([
-        0.0007, 0.0014, 0.003, 0.006, 0.012, 0.024, 0.048, 0.096,
-        0.192, 0.3712, 0.768, 1.536, 3.072, 6.144, 11.8784, 23.7568,
-        47.5136, 98.304, 190.0544, 360.0
-    ])
+    lon_zoom_range = LON_ZOOM_RANGE
 
     # calculate zoom with margin to outer points 
     margin = 4
@@ -45,33 +69,175 @@ def zoom_center(bbox, width_to_height: float = 2.0):
 
     return zoom, center
 
+# Turbines of one wind farm: a slice when the turbines are sorted by WFid and their 
+# offsets are given (windfarms.indexes.OffsetIndex), a scan over all turbines otherwise
+def wind_farm_turbines(clustered_data, wfid, offsets=None):
+    if offsets is None:
+        return clustered_data[clustered_data["WFid"] == wfid]
+    return clustered_data.iloc[offsets.slice(wfid)]
+
+# Turbines in the bounding box of +- 1° longitude/latitude around a center, or in the given bounding box: looked up in the 
+# spatial index of the turbines when given (windfarms.indexes.GridIndex), a scan over all turbines otherwise
+def turbines_in_box(clustered_data, center, spatial_index=None, bbox=None):
+    west, south, east, north = bbox if bbox is not None else [center["lon"]-1, center["lat"]-1, center["lon"]+1, center["lat"]+1]
+    if spatial_index is None:
+        ll = np.array([south, west])  # lower-left
+        ur = np.array([north, east])  # upper-right
+        inidx = np.all(np.logical_and(ll <= clustered_data[["lat", "lon"]], clustered_data[["lat", "lon"]] <= ur), axis=1)
+        return clustered_data[inidx]
+    return clustered_data.iloc[spatial_index.query(west, south, east, north)]
+
+# Extent [west, south, east, north] shown by a mapbox plot of width x height pixels at the given center and zoom, 
+# enlarged by margin to leave some room for panning. Mapbox draws the world 512 * 2^zoom pixels wide
+def visible_bbox(center, zoom, width, height, margin=1.25):
+    world = 512 * 2 ** zoom
+    x, y = lon_to_x(center["lon"]), lat_to_y(center["lat"])
+    dx, dy = width * margin / 2 / world, height * margin / 2 / world
+    return [float(x_to_lon(max(x - dx, 0))), float(y_to_lat(min(y + dy, 1))), float(x_to_lon(min(x + dx, 1))), float(y_to_lat(max(y - dy, 0)))]
+
+# Turbines to draw in the plot of a wind farm: all turbines of the farm and the other turbines in the visible extent 
+# of the plot (see visible_bbox), thinned to one turbine per cell_px x cell_px pixels and evenly subsampled 
+# when there are more than max_turbines turbines in total
+def turbines_in_view(clustered_data, wfid, center, zoom, size, spatial_index=None, max_turbines=SINGLE_PLOT_MAX_TURBINES, cell_px=2):
+    data_in_view = turbines_in_box(clustered_data, center, spatial_index, bbox=visible_bbox(center, zoom, *size))
+    in_farm = (data_in_view["WFid"] == wfid).to_numpy()
+    context = np.flatnonzero(~in_farm)
+
+    # One turbine per screen cell: cells of cell_px pixels in Web Mercator coordinates at this zoom
+    cells_per_world = 512 * 2 ** zoom / cell_px
+    x = np.floor(lon_to_x(data_in_view["lon"].to_numpy()[context]) * cells_per_world).astype(np.int64)
+    y = np.floor(lat_to_y(data_in_view["lat"].to_numpy()[context]) * cells_per_world).astype(np.int64)
+    _, first = np.unique(x * 2**32 + y, return_index=True)
+    context = context[np.sort(first)]
+
+    budget = max(max_turbines - int(in_farm.sum()), 0)
+    if len(context) > budget:
+        context = context[np.linspace(0, len(context) - 1, budget).astype(np.int64)] if budget else context[:0]
+    return data_in_view.iloc[np.sort(np.r_[np.flatnonzero(in_farm), context])]
+
+# Map viewport of a wind farm from the coordinates of its turbines: 
+# buffered bounding box, zoom level and center of the scattermapbox plot
+def farm_viewport(lon, lat):
+    wf_geopoints = turf.points(np.column_stack([lon, lat]).tolist())
+    bbox = turf.bbox(wf_geopoints)
+    bbox_buff = [bbox[0] - 0.01, bbox[1]-0.01, bbox[2]+0.01, bbox[3]+0.01] # add margin
+    zoom, center = zoom_center(bbox_buff)
+    return bbox_buff, zoom, center
+
+# Grid of 1 km squares to put on a wind farm, covering its buffered bounding box
+def farm_grid(bbox_buff):
+    return turf.square_grid(bbox_buff,1000, {"units": 'meters'}, output="lines")
+
+# Hover attributes of the turbines: in compact mode the attribute columns as customdata 
+# for the shared HOVER_TEMPLATE, otherwise a hovertemplate string per turbine
+def hover_attributes(data, compact=True):
+    if compact:
+        return dict(customdata=np.stack([data[column].to_numpy(dtype=object) for column in HOVER_COLUMNS], axis=1), hovertemplate=HOVER_TEMPLATE)
+    return dict(hovertemplate=[f'Windfarm ID: {string1}<br>Turbine Spacing (m): {string2}<br>Number of turbines: {string3}<br>Elevation (m): {string4}<br>Land Cover: {string5}<br>Landform: {string6}<br>Country: {string7}<br>Continent: {string8}<br>Shape: {string9}'
+                    for string1, string2, string3, string4, string5, string6, string7, string8, string9 in zip(data["WFid"], data["Turbine Spacing"], data["Number of turbines"], data["Elevation"], data["Land Cover"], data["Landform"], data["Country"],data["Continent"],  data["Shape"])])
+
+# Subplot of one wind farm on the poster: scattermapbox trace (as dict) of the wind farm and the turbines 
+# in the visible extent of the subplot
+def poster_subplot(wfid, data_in_box, compact=True):
+
+    # color for turbines contained in farm: red
+    # for remaining turbines in bounding box: orange 
+    # (as 1/0 on a two-color scale, numbers are validated much faster than color strings)
+    trace = dict(
+        type='scattermapbox',
+        lon=data_in_box["lon"].to_numpy(),
+        lat=data_in_box["lat"].to_numpy(), 
+        mode='markers', 
+        name='',
+        marker=dict(color=(data_in_box["WFid"] == wfid).to_numpy(dtype=np.int8), colorscale=[[0, "#FFC000"], [1, "#FF0000"]], cmin=0, cmax=1), 
+        text = ["test"],
+        **hover_attributes(data_in_box, compact)
+    )
+    return trace
+
+# Bin edges of about nbins bins over the values, like the automatic binning of plotly histograms: 
+# the bin size is 2, 5 or 10 times a power of ten and integer values are centered in their bins
+def histogram_bins(values, nbins=200):
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return np.array([0.0, 1.0])
+    low, high = values.min(), values.max()
+    if low == high:
+        return np.array([low - 0.5, low + 0.5])
+    rough = (high - low) / nbins
+    base = 10 ** np.floor(np.log10(rough))
+    size = base * next(step for step in (2, 5, 10) if step >= rough / base)
+    start = np.ceil(low / size) * size - size
+    if np.all(values == np.round(values)):
+        if size < 1:
+            start = low - 0.5 * size
+        else:
+            start -= 0.5
+            if start + size < low:
+                start += size
+    return start + size * np.arange(int((high - start) // size) + 2)
+
+# Groups of the turbines in the histograms with their colors, turbines contained in wind farms first
+TURBINE_GROUPS = ["contained in wind farm", "single turbine"]
+TURBINE_GROUP_COLORS = ["#F46281", "#f4a261"]
+
+# Horizontal bar traces of counts per value of a column for each group of rows, stacked like a colored plotly histogram. 
+# Categorical columns are counted per category code (in the order given, categories without rows included), numeric 
+# columns in the bins of histogram_bins. Groups without rows are left out, each group keeps its color. 
+# With weights, each row stands for that many rows (e.g. the cells of a windfarms.cube.AggregationCube)
+def histogram_traces(column, groups, names, colors, order=None, nbins=200, weights=None, **trace_options):
+    if order is not None:
+        column = column if isinstance(column.dtype, pd.CategoricalDtype) else column.astype("category")
+        codes = column.cat.codes.to_numpy()
+        valid = codes >= 0
+        # position of each category of the column in the given order
+        positions = column.cat.categories.get_indexer(order)
+        n_bins, y, width = len(column.cat.categories), list(order), None
+    else:
+        values = column.to_numpy(dtype=np.float64)
+        valid = ~np.isnan(values)
+        edges = histogram_bins(values[valid], nbins)
+        codes = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, len(edges) - 2)
+        n_bins, y, width = len(edges) - 1, (edges[:-1] + edges[1:]) / 2, edges[1] - edges[0]
+
+    traces = []
+    for group in np.unique(groups):
+        in_group = valid & (groups == group)
+        if not in_group.any():
+            continue
+        counts = np.bincount(codes[in_group], weights=None if weights is None else weights[in_group], minlength=n_bins).astype(np.int64)
+        if order is not None:
+            bars = dict(x=np.where(positions >= 0, counts[positions], 0), y=y)
+        else:
+            bars = dict(x=counts[counts > 0], y=y[counts > 0], width=width)
+        traces.append(go.Bar(
+            **bars, orientation="h", name=names[group], legendgroup=names[group], offsetgroup=names[group], alignmentgroup="True",
+            marker=dict(color=colors[group]), **trace_options,
+        ))
+    return traces
+
 # Function tht creats plot of single wind farm with specific visual encoding
-# Inputs: wind turbines data that must contain columns [WFid, lon, lat] & WFid 
-def plot_single_windfarm_mapbox(clustered_data, wfid):
+# Inputs: wind turbines data that must contain columns [WFid, lon, lat] & WFid, 
+# optionally the WFid offsets and the spatial index of the turbines, whether to pass the hover attributes as customdata 
+# and the precomputed viewports and grids of the wind farms (windfarms.views.FarmViews)
+def plot_single_windfarm_mapbox(clustered_data, wfid, offsets=None, spatial_index=None, compact=True, views=None):
 
     # Don't plot standalone turbines
     if (wfid == -1):
         return html.Div('Single turbines cannot be plotted!')
 
-    # Get selected wind farm and transform to class turf points 
-    current_wf = clustered_data[clustered_data["WFid"] == wfid]
-    wf_geopoints = turf.points(current_wf[["lon", "lat"]].values.tolist())
-    
-    # Create grid to put on wind farm and store in list
-    bbox = turf.bbox(wf_geopoints)
-    bbox_buff = [bbox[0] - 0.01, bbox[1]-0.01, bbox[2]+0.01, bbox[3]+0.01]
-
-    # Retrieve central loaction and zoom level of scattermapbox plot in dictionary to add to plot layout 
-    zoom, center = zoom_center(bbox_buff)
-
-    # Compute bounding box of plot
-    layer=turf.square_grid(bbox_buff,1000, {"units": 'meters'})
+    # Get central loaction and zoom level of scattermapbox plot of the selected wind farm and the grid to put on it
+    if views is not None and wfid in views:
+        bbox_buff, zoom, center = views.viewport(wfid)
+        layer = views.grid(wfid)
+    else:
+        current_wf = wind_farm_turbines(clustered_data, wfid, offsets)
+        bbox_buff, zoom, center = farm_viewport(current_wf["lon"].to_numpy(), current_wf["lat"].to_numpy())
+        layer = farm_grid(bbox_buff)
 
-    # Retrieve all turbines in bounding box of +- 1° longitudinale/latitudinal
-    ll = np.array([(center["lat"]-1), (center["lon"]-1)])  # lower-left
-    ur = np.array([(center["lat"]+1), (center["lon"]+1)])  # upper-right
-    inidx = np.all(np.logical_and(ll <= clustered_data[["lat", "lon"]], clustered_data[["lat", "lon"]] <= ur), axis=1)
-    data_in_box = clustered_data[inidx]
+    # Retrieve the turbines in the visible extent of the plot
+    data_in_box = turbines_in_view(clustered_data, wfid, center, zoom, SINGLE_PLOT_SIZE, spatial_index)
 
     # color for turbines contained in farm: red
     # for remaining turbines in bounding box: orange 
@@ -85,8 +251,7 @@ def plot_single_windfarm_mapbox(clustered_data, wfid):
         mode='markers', 
         name = "", 
         marker=dict(color=data_in_box["Color"]), 
-        hovertemplate = [f'Windfarm ID: {string1}<br>Turbine Spacing (m): {string2}<br>Number of turbines: {string3}<br>Elevation (m): {string4}<br>Land Cover: {string5}<br>Landform: {string6}<br>Country: {string7}<br>Continent: {string8}<br>Shape: {string9}'
-                    for string1, string2, string3, string4, string5, string6, string7, string8, string9 in zip(data_in_box["WFid"], data_in_box["Turbine Spacing"], data_in_box["Number of turbines"], data_in_box["Elevation"], data_in_box["Land Cover"], data_in_box["Landform"], data_in_box["Country"],data_in_box["Continent"],  data_in_box["Shape"])]
+        **hover_attributes(data_in_box, compact)
         ))
 
     # Update background layer 
@@ -114,18 +279,34 @@ def plot_single_windfarm_mapbox(clustered_data, wfid):
 
 # Creates frequency view: frequency distribution of wind farms and turbines oover selected variable and table showing summary statistics
 # Inputs are full wind tubrines and wind farm data, and variable over which to show distribution as String
-def plot_wf_histograms(filtered_wt_data, filtered_wf_data, y_axis = "Country"):
-
-    # Distinguish between stand-alone and non stand-alone turbines and name them accordingly  
-    filtered_wt_data['grouping'] = 'contained in wind farm'
-    filtered_wt_data.loc[(filtered_wt_data["WFid"] == -1), 'grouping'] = 'single turbine'
+# With wf_cube, the wind farm cube of the cells, the summary statistics are merged from the value histograms 
+# of its cells (windfarms.histogram.ValueHistogram), the same statistics as pandas' describe
+def plot_wf_histograms(filtered_wt_data, filtered_wf_data, y_axis = "Country", cells = False, wf_cube = None):
+
+    # Distinguish between non stand-alone (group 0) and stand-alone (group 1) turbines, with the in-farm 
+    # flag of the column stores and cubes (windfarms.store.IN_FARM) when the data has it
+    if IN_FARM in filtered_wt_data:
+        turbine_groups = (~filtered_wt_data[IN_FARM].to_numpy(dtype=bool)).astype(np.int8)
+    else:
+        turbine_groups = (filtered_wt_data["WFid"] == -1).to_numpy(dtype=np.int8)
+    # With cells, the rows of the data are the cells of aggregation cubes (windfarms.cube.AggregationCube.frame) 
+    # and stand for as many turbines or wind farms as their count
+    if cells:
+        wt_weights, wf_weights = filtered_wt_data["count"].to_numpy(), filtered_wf_data["count"].to_numpy()
+    else:
+        wt_weights = wf_weights = None
 
     # Create bar chart for categorical varible on y-axis
     if y_axis in ["Country", "Continent", "Land Cover", "Landform", "Shape" ]:
         y_axis_label = y_axis
 
         # wind farms bar chart
-        xaxis_groupby = filtered_wf_data[y_axis].value_counts()
+        # (categories without any wind farm are dropped, the columns are categorical)
+        if cells:
+            xaxis_groupby = filtered_wf_data.groupby(y_axis, observed=False)["count"].sum().rename(y_axis).rename_axis(None).sort_values(ascending=False)
+        else:
+            xaxis_groupby = filtered_wf_data[y_axis].value_counts()
+        xaxis_groupby = xaxis_groupby[xaxis_groupby > 0]
         category_order_names = xaxis_groupby.keys().tolist()
         xaxis_groupby = xaxis_groupby.reset_index().sort_values(y_axis)
 
@@ -133,7 +314,17 @@ def plot_wf_histograms(filtered_wt_data, filtered_wf_data, y_axis = "Country"):
                         category_orders={y_axis: category_order_names}, labels={"index": "Count of Wind farms", y_axis: y_axis})
 
         # Summary statistics of wind farm sizes in categories of variable
-        wfsizedistr_datatable =filtered_wf_data.groupby(y_axis)["Number of turbines"].describe().round(2).loc[category_order_names].reset_index()
+        if cells:
+            categories = filtered_wf_data[y_axis].cat.categories
+            codes = filtered_wf_data[y_axis].cat.codes.to_numpy()
+            if wf_cube is not None:
+                wfsizedistr = wf_cube.histogram("Number of turbines").describe(filtered_wf_data["cell"].to_numpy()[codes >= 0], codes[codes >= 0])
+            else:
+                wfsizedistr = describe_weighted(filtered_wf_data["Number of turbines"][codes >= 0], wf_weights[codes >= 0], codes[codes >= 0])
+            wfsizedistr = wfsizedistr.set_axis(categories[wfsizedistr.index]).rename_axis(y_axis)
+        else:
+            wfsizedistr = filtered_wf_data.groupby(y_axis, observed=True)["Number of turbines"].describe()
+        wfsizedistr_datatable = wfsizedistr.round(2).loc[category_order_names].reset_index()
         fig2_hist_wfsize = [dash_table.DataTable(
             columns=[{"name": i, "id": i} for i in wfsizedistr_datatable.columns],
             data=wfsizedistr_datatable.to_dict('records'), 
@@ -157,14 +348,14 @@ def plot_wf_histograms(filtered_wt_data, filtered_wf_data, y_axis = "Country"):
                 "background-color":"#F4F4F4",
                 },
             sort_action="native")]
-        categories_fig3 = np.unique(filtered_wt_data[y_axis])
+        categories_fig3 = sorted(filtered_wt_data[y_axis].dropna().unique())
         not_contained = [i for i in categories_fig3 if i not in category_order_names]
         for x in not_contained:
             category_order_names.append(x)
 
-        # wind turbines chart, color according to stand-alone or not 
-        fig3_histwt =  px.histogram(filtered_wt_data, y = y_axis, color="grouping",color_discrete_sequence=["#F46281", "#f4a261"], 
-                        category_orders={ y_axis: category_order_names,"grouping":['in wind farm','single turbine']})
+        # wind turbines chart, color according to stand-alone or not, counted per category 
+        fig3_histwt = go.Figure(histogram_traces(filtered_wt_data[y_axis], turbine_groups, TURBINE_GROUPS, TURBINE_GROUP_COLORS, order=category_order_names, weights=wt_weights))
+        fig3_histwt.update_layout(barmode="relative", bargap=0, yaxis=dict(categoryorder="array", categoryarray=category_order_names))
 
 
     # Create histogram for categorical varible on y-axis
@@ -173,14 +364,18 @@ def plot_wf_histograms(filtered_wt_data, filtered_wf_data, y_axis = "Country"):
         if y_axis in ["Elevation", "Turbine Spacing"]:
             y_axis_label = y_axis + " (m)"
         else: y_axis_label = y_axis
-        fig1_histwf = px.histogram(filtered_wf_data,y =y_axis,opacity=0.8, color_discrete_sequence=['#F46281'], nbins = 200,  
-            text_auto='.2s', labels={
-                        "index": "Count of Wind farms",
-                        y_axis: y_axis_label,
-                    })
+        fig1_histwf = go.Figure(histogram_traces(filtered_wf_data[y_axis], np.zeros(len(filtered_wf_data), dtype=np.int8), ["Wind farms"], ['#F46281'], 
+            weights=wf_weights, opacity=0.8, texttemplate='%{x:.2s}', showlegend=False))
+        fig1_histwf.update_layout(barmode="relative", bargap=0)
 
         # Summary statistics about varible itself
-        turbingesdist_datatable =filtered_wf_data[y_axis].describe().round(2).reset_index()
+        if cells and wf_cube is not None:
+            turbingesdist = wf_cube.histogram(y_axis).describe(filtered_wf_data["cell"].to_numpy()).iloc[0].rename(y_axis)
+        elif cells:
+            turbingesdist = describe_weighted(filtered_wf_data[y_axis], wf_weights).iloc[0].rename(y_axis)
+        else:
+            turbingesdist = filtered_wf_data[y_axis].describe()
+        turbingesdist_datatable = turbingesdist.round(2).reset_index()
         fig2_hist_wfsize = [dash_table.DataTable(
             # id='table-container',
             columns=[{"name": i, "id": i} for i in turbingesdist_datatable.columns],
@@ -206,9 +401,9 @@ def plot_wf_histograms(filtered_wt_data, filtered_wf_data, y_axis = "Country"):
             },
             sort_action="native")]
 
-        # Histogram of turbines, color according to stand-alone or not 
-        fig3_histwt =  px.histogram(filtered_wt_data, y = y_axis,  opacity=0.8, color="grouping",color_discrete_sequence=["#F46281", "#f4a261"], 
-                        category_orders={ "grouping":['turbines in wind farms','single turbines']}, nbins=200)
+        # Histogram of turbines, color according to stand-alone or not, binned over all turbines 
+        fig3_histwt = go.Figure(histogram_traces(filtered_wt_data[y_axis], turbine_groups, TURBINE_GROUPS, TURBINE_GROUP_COLORS, weights=wt_weights, opacity=0.8))
+        fig3_histwt.update_layout(barmode="relative", bargap=0)
 
     # Update layouts of histograms 
     fig1_histwf.update_layout(
@@ -271,7 +466,51 @@ def plot_wf_histograms(filtered_wt_data, filtered_wf_data, y_axis = "Country"):
 # Random seed for drawing sample
 # Variable after which the wind farms are sorted
 # number of rows and columns of raster poster
-def plot_wf_poster(clustered_data, filtered_wf_data, seed = 0, sorting_condition="Number of turbines",  plot_rows=5, plot_col = 5):
+# WFid offsets and spatial index of the wind turbines dataset (optional), and whether to pass the hover attributes as customdata
+# Precomputed viewports and grids of the wind farms (windfarms.views.FarmViews) (optional)
+# Executor drawing the wind farms concurrently (optional, see iter_wf_poster)
+def plot_wf_poster(clustered_data, filtered_wf_data, seed = 0, sorting_condition="Number of turbines",  plot_rows=5, plot_col = 5, offsets=None, spatial_index=None, compact=True, views=None, executor=None):
+    for fig in iter_wf_poster(clustered_data, filtered_wf_data, seed, sorting_condition, plot_rows, plot_col, offsets, spatial_index, compact, views, executor):
+        pass
+    return go.Figure(fig)
+
+# Domains of the mapbox subplots of a rows x cols grid (mapbox, mapbox2, ... row by row from the top), 
+# computed like plotly.subplots.make_subplots does
+def subplot_domains(rows, cols, horizontal_spacing, vertical_spacing):
+    widths = [(1.0 - horizontal_spacing * (cols - 1)) / cols] * cols
+    heights = [(1.0 - vertical_spacing * (rows - 1)) / rows] * rows
+    domains = {}
+    for row in range(rows):
+        # rows are stacked from the bottom up, the first row is on top
+        bottom = rows - 1 - row
+        y_s = sum(heights[:bottom]) + bottom * vertical_spacing
+        for col in range(cols):
+            x_s = sum(widths[:col]) + col * horizontal_spacing
+            n = row * cols + col + 1
+            domains["mapbox" + (str(n) if n > 1 else "")] = dict(
+                x=[max(0.0, x_s), min(1.0, x_s + widths[col])], y=[max(0.0, y_s), min(1.0, y_s + heights[row])])
+    return domains
+
+# Everything the poster needs of one wind farm: its trace (poster_subplot), grid, center and zoom, for subplots 
+# of subplot_size pixels. Inputs as for plot_single_windfarm_mapbox
+def poster_farm(clustered_data, wfid, subplot_size, offsets=None, spatial_index=None, compact=True, views=None):
+    # Viewport of the wind farm and the grid to put on it, precomputed where available
+    if views is not None and wfid in views:
+        bbox_buff, zoom, center = views.viewport(wfid)
+        grid = views.grid(wfid)
+    else:
+        farm = wind_farm_turbines(clustered_data, wfid, offsets)
+        bbox_buff, zoom, center = farm_viewport(farm["lon"].to_numpy(), farm["lat"].to_numpy())
+        grid = farm_grid(bbox_buff)
+    data_in_box = turbines_in_view(clustered_data, wfid, center, zoom, subplot_size, spatial_index, max_turbines=POSTER_PLOT_MAX_TURBINES)
+    return poster_subplot(wfid, data_in_box, compact), grid, center, zoom
+
+# Builds the Random Wind farms view row by row, same inputs as plot_wf_poster. 
+# Yields the poster as a figure dict after each row of subplots is filled in, the last one is the whole poster. 
+# The traces and the layout are plain dicts, assembled without plotly's validation of the figure after every row. 
+# With an executor (e.g. a concurrent.futures.ThreadPoolExecutor), the wind farms of all rows are submitted to it 
+# up front (poster_farm) and the rows are yielded as they complete in order, otherwise the farms are drawn one by one
+def iter_wf_poster(clustered_data, filtered_wf_data, seed = 0, sorting_condition="Number of turbines",  plot_rows=5, plot_col = 5, offsets=None, spatial_index=None, compact=True, views=None, executor=None):
 
     # Draw a random sample of wind farms (from wf data index) that match the filtered data
     wfids = filtered_wf_data.WFid.to_list()
@@ -279,88 +518,19 @@ def plot_wf_poster(clustered_data, filtered_wf_data, seed = 0, sorting_condition
     random_wfsids = sample(wfids,plot_rows*plot_col)
     random_wfs_ids = filtered_wf_data[filtered_wf_data["WFid"].isin(random_wfsids)].sort_values(sorting_condition)["WFid"].to_list()
 
-    # Initialize mapbox figure for each subplot 
-    specs = [{"type": 'mapbox'}]
-    i = 1
-    while (i  < (plot_col)):
-        specs.append( {"type": 'mapbox'})
-        i = i+1
-    j = 0
-    specs_list = []
-    while (j < (plot_rows)):
-        specs_list.append(specs)
-        j = j+1
-
-    # Create subplot figure and set common map layer
-    fig = make_subplots(rows=plot_rows, cols=plot_col, horizontal_spacing = 0.01,vertical_spacing = 0.02,
-         specs= specs_list)
-    fig.update_mapboxes(
-                style= "mapbox://styles/zwiefele/cl4dap44m001d15pfttaws59k", 
-                accesstoken="pk.eyJ1IjoiendpZWZlbGUiLCJhIjoiY2wxeTAzazJxMDcwaTNibXQ5aTRyMno0bSJ9.zPSVI0wOb_sIXGH-tgHNVw",
-                )
-    fig.update_layout(
-        title = "Random Wind Farms" ,
-        showlegend=False, 
-        )
-
-    x = 0
-
-    # Initialize lists where levels for center and zoom, and overlaying grids will be stored
-    zooms = []
-    centers = []
-    grids = []
-
-    # Loop over each wind farm and fill row and columns wise 
-    for i in range(1, plot_rows + 1):
-        for j in range(1, plot_col + 1):
-            #update common attributes:
-
-            # Get wind farms through random ids sample
-            current_wfid = random_wfs_ids[x]
-            current_wf = clustered_data[clustered_data["WFid"] == current_wfid]
-            wf_geopoints = turf.points(current_wf[["lon", "lat"]].values.tolist())
-
-            # Create grid to put on wind farm and store in list
-            bbox = turf.bbox(wf_geopoints)
-            bbox_buff = [bbox[0] - 0.01, bbox[1]-0.01, bbox[2]+0.01, bbox[3]+0.01] # add margin
-            layer=turf.square_grid(bbox_buff,1000, {"units": 'meters'} )
-            grids.append(layer) 
-
-            # Retrieve central loaction and zoom level of scattermapbox plot and add to list
-            zoom, center = zoom_center(bbox_buff)
-            centers.append(center)
-            zooms.append(zoom)
-
-            # Retrieve all turbines in bounding box of +- 1° longitudinale/latitudinal
-            ll = np.array([(center["lat"]-1), (center["lon"]-1)])  # lower-left
-            ur = np.array([(center["lat"]+1), (center["lon"]+1)])  # upper-right
-            inidx = np.all(np.logical_and(ll <= clustered_data[["lat", "lon"]], clustered_data[["lat", "lon"]] <= ur), axis=1)
-            data_in_box = clustered_data[inidx]
-            data_in_box["group"] = 0
-
-            # color for turbines contained in farm: red
-            # for remaining turbines in bounding box: orange 
-            data_in_box.loc[data_in_box["WFid"].isin([current_wfid]),"group"] = "#FF0000"
-            data_in_box.loc[~data_in_box["WFid"].isin([current_wfid]),"group"] = "#FFC000"
-            
-            # Create plot of single wind farm and add as trace to subplot figure
-            fig.add_trace(go.Scattermapbox(
-                lon=list(data_in_box["lon"]),
-                lat=list(data_in_box["lat"]), 
-                mode='markers', 
-                name='',
-                marker=dict(color=data_in_box["group"]), 
-                text = ["test"],
-                hovertemplate = [f'Windfarm ID: {string1}<br>Turbine Spacing (m): {string2}<br>Number of turbines: {string3}<br>Elevation (m): {string4}<br>Land Cover: {string5}<br>Landform: {string6}<br>Country: {string7}<br>Continent: {string8}<br>Shape: {string9}'
-                    for string1, string2, string3, string4, string5, string6, string7, string8, string9 in zip(data_in_box["WFid"], data_in_box["Turbine Spacing"], data_in_box["Number of turbines"], data_in_box["Elevation"], data_in_box["Land Cover"], data_in_box["Landform"], data_in_box["Country"],data_in_box["Continent"],  data_in_box["Shape"])]
-            ), row=i, col=j)
-
-            x=x+1
-
+    # Mapbox subplot for each cell of the raster with the common map layer
+    mapbox_style = dict(
+        style= "mapbox://styles/zwiefele/cl4dap44m001d15pfttaws59k", 
+        accesstoken="pk.eyJ1IjoiendpZWZlbGUiLCJhIjoiY2wxeTAzazJxMDcwaTNibXQ5aTRyMno0bSJ9.zPSVI0wOb_sIXGH-tgHNVw",
+    )
+    layout = {subplot: dict(domain=domain, **mapbox_style) for subplot, domain in subplot_domains(plot_rows, plot_col, 0.01, 0.02).items()}
 
     # Adjust figure layout 
     temp= min(plot_rows, plot_col)
-    fig.update_layout(
+    layout.update(
+        template=pio.templates[pio.templates.default].to_plotly_json(),
+        title=dict(text="Random Wind Farms"),
+        showlegend=False, 
         height = 300+temp*150, 
         width = 400+temp*150, 
         autosize = True, 
@@ -373,17 +543,36 @@ def plot_wf_poster(clustered_data, filtered_wf_data, seed = 0, sorting_condition
             font_family='Montserrat, sans-serif'
         )
     )
-    # Update grid layers of figures 
-    for m, g in zip(fig.data, grids):
-        exec("fig.update_layout("+ str(m.subplot) 
-        + "=dict(layers=[dict(sourcetype = 'geojson',source ="
-        +str(g) + ",type = 'line', color = '#454545',opacity = 0.2,line=dict(width=1))]))")
-                
-    # Update centers of figures 
-    for m, c in zip(fig.data, centers):
-        exec("fig.layout." + m.subplot+"[\"center\"] = " + str(c))
-    # Update centers of figures 
-    for m, z in zip(fig.data, zooms):
-        exec("fig.layout." + m.subplot+"[\"zoom\"] = " + str(z))
-
-    return fig
\ No newline at end of file
+    # Size in pixels of the subplots
+    subplot_size = (layout["width"] * (1 - 0.01*(plot_col-1)) / plot_col, layout["height"] * (1 - 0.02*(plot_rows-1)) / plot_rows)
+
+    # Fill the subplots row by row
+    draw = partial(poster_farm, clustered_data, subplot_size=subplot_size, offsets=offsets, spatial_index=spatial_index, compact=compact, views=views)
+    futures = []
+    if executor is not None:
+        futures = [executor.submit(draw, wfid) for wfid in random_wfs_ids[:plot_rows * plot_col]]
+        farms = (future.result() for future in futures)
+    else:
+        farms = map(draw, random_wfs_ids)
+    data = []
+    try:
+        for row in range(1, plot_rows + 1):
+            row_wfids = random_wfs_ids[(row - 1) * plot_col:row * plot_col]
+            if not row_wfids:
+                break
+
+            for wfid, (trace, grid, center, zoom) in zip(row_wfids, farms):
+                subplot = "mapbox" + (str(len(data) + 1) if data else "")
+                data.append(dict(trace, subplot=subplot))
+                # Grid layer, center and zoom of the subplot, new dicts so that the figures yielded before stay as they are
+                layout[subplot] = dict(
+                    layout[subplot],
+                    layers=[dict(sourcetype = 'geojson',source = grid,type = 'line', color = '#454545',opacity = 0.2,line=dict(width=1))],
+                    center=center,
+                    zoom=zoom,
+                )
+            yield dict(data=list(data), layout=dict(layout))
+    finally:
+        # Farms not drawn yet when the poster is abandoned (e.g. its job cancelled) are not drawn at all
+        for future in futures:
+            future.cancel()
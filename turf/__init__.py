@@ -26,7 +26,7 @@ from turf.point_on_feature import point_on_feature
 from turf.point_to_line_distance import point_to_line_distance
 from turf.polygon_tangents import polygon_tangents
 from turf.polygon_to_line import polygon_to_line
-from turf.rectangle_grid import rectangle_grid
+from turf.rectangle_grid import rectangle_grid, rectangle_grid_cells, rectangle_grid_layout
 from turf.rhumb_bearing import rhumb_bearing
 from turf.rhumb_destination import rhumb_destination
 from turf.rhumb_distance import rhumb_distance
@@ -1 +1,5 @@
-from turf.rectangle_grid._rectangle_grid import rectangle_grid
+from turf.rectangle_grid._rectangle_grid import (
+    rectangle_grid,
+    rectangle_grid_cells,
+    rectangle_grid_layout,
+)
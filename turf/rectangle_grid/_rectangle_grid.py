@@ -1,9 +1,9 @@
 from typing import Dict, List, Union
 
+import numpy as np
+
 from turf.distance import distance
-from turf.bbox import bbox
-from turf.boolean_intersects import boolean_intersects
-from turf.helpers import feature_collection, polygon, FeatureCollection
+from turf.helpers import Feature, FeatureCollection
 
 
 def rectangle_grid(
@@ -11,7 +11,8 @@ def rectangle_grid(
     cell_width: Union[int, float],
     cell_height: Union[int, float],
     options: Dict = {},
-) -> FeatureCollection:
+    output: str = "polygons",
+) -> Union[FeatureCollection, np.ndarray, Feature]:
     """
     Creates a grid of rectangles from a bounding box, Feature or FeatureCollection.
 
@@ -25,13 +26,46 @@ def rectangle_grid(
         [options["mask"]]: if passed a Polygon or MultiPolygon here,
                            the grid Points will be created only inside it
         [options["properties"]]: passed to each point of the grid
+    :param output: "polygons" for a FeatureCollection of polygons,
+        "array" for the rings of the cells as array of shape (cells, 5, 2),
+        "lines" for a MultiLineString Feature of the cell borders, see rectangle_grid_cells
 
-    :returns: FeatureCollection of a grid of polygons
+    :returns: FeatureCollection of a grid of polygons for output="polygons",
+        array of cell rings for output="array", or for output="lines" a single
+        Feature whose geometry is a MultiLineString of the cell borders
+    """
+    if not isinstance(options, dict):
+        options = {}
+
+    return rectangle_grid_cells(
+        rectangle_grid_layout(bbox, cell_width, cell_height, options), options, output
+    )
+
+
+def rectangle_grid_layout(
+    bbox: List[float],
+    cell_width: Union[int, float],
+    cell_height: Union[int, float],
+    options: Dict = {},
+) -> Dict:
+    """
+    Computes the placement of the cells of a rectangle grid, which is all
+    that is needed to generate the grid again later.
+
+    :param bbox: Array extent in [minX, minY, maxX, maxY] order
+    :param cell_width: of each cell, in units
+    :param cell_height: of each cell, in units
+    :param options: Optional parameters
+        [options["units"]]: units ("degrees", "radians", "miles", "kilometers")
+                            of the given cell_width and cell_height
+
+    :returns: dict with the lower left corner of the first cell ("x", "y"),
+        the cell size in degrees ("cell_width", "cell_height") and the
+        number of "columns" and "rows"
     """
     if not isinstance(options, dict):
         options = {}
 
-    results = []
     west = bbox[0]
     south = bbox[1]
     east = bbox[2]
@@ -52,32 +86,244 @@ def rectangle_grid(
     delta_x = (bbox_width - columns * cell_width_deg) / 2
     delta_y = (bbox_height - rows * cell_height_deg) / 2
 
-    # iterate over columns & rows
-    current_x = west + delta_x
-    for _ in range(columns):
-        current_y = south + delta_y
-        for _ in range(rows):
-            cell_poly = polygon(
-                [
-                    [
-                        [current_x, current_y],
-                        [current_x, current_y + cell_height_deg],
-                        [current_x + cell_width_deg, current_y + cell_height_deg],
-                        [current_x + cell_width_deg, current_y],
-                        [current_x, current_y],
-                    ]
-                ],
-                options.get("properties", {}),
-            )
-
-            if "mask" in options:
-                if boolean_intersects(options["mask"], cell_poly):
-                    results.append(cell_poly)
-            else:
-                results.append(cell_poly)
+    return {
+        "x": west + delta_x,
+        "y": south + delta_y,
+        "cell_width": cell_width_deg,
+        "cell_height": cell_height_deg,
+        "columns": columns,
+        "rows": rows,
+    }
+
+
+def rectangle_grid_cells(
+    layout: Dict, options: Dict = {}, output: str = "polygons"
+) -> Union[FeatureCollection, np.ndarray, Feature]:
+    """
+    Creates the grid of rectangles of a layout computed by rectangle_grid_layout.
+
+    All cell corners are computed at once as NumPy arrays, the cells are
+    ordered column by column.
+
+    :param layout: placement of the cells, see rectangle_grid_layout
+    :param options: Optional parameters
+        [options["mask"]]: if passed a Polygon or MultiPolygon here,
+                           the grid Points will be created only inside it
+        [options["properties"]]: passed to each point of the grid
+    :param output: "polygons" for a FeatureCollection of polygons,
+        "array" for the rings of the cells as array of shape (cells, 5, 2),
+        "lines" for a MultiLineString Feature of the cell borders: every
+        border shared by two cells is drawn once, and the borders along a
+        grid line are merged into one line, so a full grid takes
+        columns + rows + 2 lines instead of 5 positions per cell
+
+    :returns: FeatureCollection of a grid of polygons for output="polygons",
+        array of cell rings for output="array", or for output="lines" a single
+        Feature whose geometry is a MultiLineString of the cell borders
+    """
+    if not isinstance(options, dict):
+        options = {}
+    if output not in ("polygons", "array", "lines"):
+        raise ValueError(f"Unknown output {output!r}")
+
+    xs = _edges(layout["x"], layout["cell_width"], layout["columns"])
+    ys = _edges(layout["y"], layout["cell_height"], layout["rows"])
+    columns, rows = np.meshgrid(
+        np.arange(layout["columns"]), np.arange(layout["rows"]), indexing="ij"
+    )
+    columns, rows = columns.ravel(), rows.ravel()
 
-            current_y += cell_height_deg
+    if "mask" in options:
+        keep = _intersects_mask(xs, ys, options["mask"])[columns, rows]
+        columns, rows = columns[keep], rows[keep]
 
-        current_x += cell_width_deg
+    if output == "lines":
+        return {
+            "type": "Feature",
+            "properties": dict(options.get("properties", {})),
+            "geometry": {
+                "type": "MultiLineString",
+                "coordinates": _grid_lines(xs, ys, columns, rows),
+            },
+        }
+
+    west, east = xs[columns], xs[columns + 1]
+    south, north = ys[rows], ys[rows + 1]
+    rings = np.stack(
+        [
+            np.stack([west, south], axis=1),
+            np.stack([west, north], axis=1),
+            np.stack([east, north], axis=1),
+            np.stack([east, south], axis=1),
+            np.stack([west, south], axis=1),
+        ],
+        axis=1,
+    ).reshape(len(columns), 5, 2)
+    if output == "array":
+        return rings
+
+    properties = options.get("properties", {})
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": dict(properties),
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+            }
+            for ring in rings.tolist()
+        ],
+    }
+
+
+def _grid_lines(
+    xs: np.ndarray, ys: np.ndarray, columns: np.ndarray, rows: np.ndarray
+) -> List:
+    """
+    :param xs: cell edges along x
+    :param ys: cell edges along y
+    :param columns: column of each cell in the grid
+    :param rows: row of each cell in the grid
+    :returns: the vertical lines, then the horizontal lines along which
+        the borders of the cells run, one line per run of adjacent borders
+    """
+    cells = np.zeros((len(xs) + 1, len(ys) + 1), dtype=bool)
+    cells[columns + 1, rows + 1] = True
+    # A border is drawn if the cell on either side of it is in the grid
+    vertical = cells[:-1, 1:-1] | cells[1:, 1:-1]
+    horizontal = (cells[1:-1, :-1] | cells[1:-1, 1:]).T
+
+    lines = []
+    for borders, positions, edges, is_vertical in (
+        (vertical, xs, ys, True),
+        (horizontal, ys, xs, False),
+    ):
+        steps = np.diff(np.pad(borders, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+        line, start = np.nonzero(steps == 1)
+        _, stop = np.nonzero(steps == -1)
+        ends = np.stack(
+            [positions[line], edges[start], positions[line], edges[stop]], axis=1
+        ).reshape(-1, 2, 2)
+        lines.append(ends if is_vertical else ends[:, :, ::-1])
+    return np.concatenate(lines).tolist()
+
+
+def _edges(start: float, step: float, n: int) -> np.ndarray:
+    """
+    :returns: the n + 1 cell edges along one axis, summed up one cell after another
+        so that they are exactly the coordinates of an iterative construction
+    """
+    return np.add.accumulate(np.r_[start, np.full(n, step)])
+
+
+def _cell_ranges(edges: np.ndarray, values: np.ndarray):
+    """
+    :param edges: ascending cell edges
+    :param values: coordinates along the same axis
+    :returns: first and last cell containing each value, borders included,
+        last < first where the value is outside all cells
+    """
+    first = np.searchsorted(edges, values, side="left") - 1
+    last = np.searchsorted(edges, values, side="right") - 1
+    n_cells = len(edges) - 1
+    return np.maximum(first, 0), np.minimum(last, n_cells - 1)
+
+
+def _mark(hits: np.ndarray, col_ranges, row_ranges):
+    """
+    Marks the cells of the given column and row ranges, each range spans at most two cells.
+    """
+    (col_first, col_last), (row_first, row_last) = col_ranges, row_ranges
+    for col in (col_first, col_first + 1):
+        for row in (row_first, row_first + 1):
+            valid = (col <= col_last) & (row <= row_last)
+            hits[col[valid], row[valid]] = True
+
+
+def _in_ring(x: np.ndarray, y: np.ndarray, ring: np.ndarray, ignore_boundary: bool):
+    """
+    Batch version of turf.boolean_point_in_polygon's in_ring.
+    """
+    if len(ring) > 1 and np.array_equal(ring[0], ring[-1]):
+        ring = ring[:-1]
+    inside = np.zeros(len(x), dtype=bool)
+    boundary = np.zeros(len(x), dtype=bool)
+    for (xi, yi), (xj, yj) in zip(ring.tolist(), np.roll(ring, 1, axis=0).tolist()):
+        boundary |= (
+            (y * (xi - xj) + yi * (xj - x) + yj * (x - xi) == 0)
+            & ((xi - x) * (xj - x) <= 0)
+            & ((yi - y) * (yj - y) <= 0)
+        )
+        if yi != yj:
+            inside ^= ((yi > y) != (yj > y)) & (x < (xj - xi) * (y - yi) / (yj - yi) + xi)
+    return np.where(boundary, not ignore_boundary, inside)
+
+
+def _mask_polygons(mask) -> List[List[np.ndarray]]:
+    geometry = mask.get("geometry", mask) if isinstance(mask, dict) else mask
+    coordinates = geometry["coordinates"]
+    if geometry["type"] == "Polygon":
+        coordinates = [coordinates]
+    elif geometry["type"] != "MultiPolygon":
+        raise ValueError("Mask must be a Polygon or MultiPolygon")
+    return [
+        [np.asarray(ring, dtype=np.float64) for ring in polygon]
+        for polygon in coordinates
+    ]
+
+
+def _intersects_mask(xs: np.ndarray, ys: np.ndarray, mask) -> np.ndarray:
+    """
+    Batch version of boolean_intersects(mask, cell) for all cells of a grid:
+    a cell intersects the mask if one of its corners lies in the mask, a
+    vertex of the mask lies in the cell or the edges of both cross.
+
+    :param xs: cell edges along x
+    :param ys: cell edges along y
+    :param mask: Polygon or MultiPolygon Feature or geometry
+    :returns: boolean array of shape (columns, rows)
+    """
+    n_columns, n_rows = len(xs) - 1, len(ys) - 1
+    # Ascending edges, the hits are flipped back at the end
+    flip_x, flip_y = n_columns > 0 and xs[-1] < xs[0], n_rows > 0 and ys[-1] < ys[0]
+    xs, ys = (xs[::-1] if flip_x else xs), (ys[::-1] if flip_y else ys)
+    hits = np.zeros((n_columns, n_rows), dtype=bool)
+    if hits.size == 0:
+        return hits
+
+    # Grid vertices inside the mask
+    vertex_x, vertex_y = np.meshgrid(xs, ys, indexing="ij")
+    vertex_x, vertex_y = vertex_x.ravel(), vertex_y.ravel()
+    inside = np.zeros(len(vertex_x), dtype=bool)
+    polygons = _mask_polygons(mask)
+    for polygon in polygons:
+        in_polygon = _in_ring(vertex_x, vertex_y, polygon[0], False)
+        for hole in polygon[1:]:
+            in_polygon &= ~_in_ring(vertex_x, vertex_y, hole, True)
+        inside |= in_polygon
+    inside = inside.reshape(n_columns + 1, n_rows + 1)
+    hits |= inside[:-1, :-1] | inside[1:, :-1] | inside[:-1, 1:] | inside[1:, 1:]
+
+    for ring in (ring for polygon in polygons for ring in polygon):
+        # Mask vertices inside a cell
+        _mark(hits, _cell_ranges(xs, ring[:, 0]), _cell_ranges(ys, ring[:, 1]))
+
+        # Mask edges crossing the grid lines, parallel edges never cross
+        (x1, y1), (x2, y2) = ring[:-1].T, ring[1:].T
+        for edges, other_edges, (a1, b1, a2, b2), swap in (
+            (xs, ys, (x1, y1, x2, y2), False),
+            (ys, xs, (y1, x1, y2, x2), True),
+        ):
+            crossing = a1 != a2
+            a1, b1, a2, b2 = a1[crossing], b1[crossing], a2[crossing], b2[crossing]
+            t = (edges[None, :] - a1[:, None]) / (a2 - a1)[:, None]
+            segment, line = np.nonzero((t >= 0) & (t <= 1))
+            b = b1[segment] + t[segment, line] * (b2 - b1)[segment]
+            line_ranges = np.maximum(line - 1, 0), np.minimum(line, len(edges) - 2)
+            other_ranges = _cell_ranges(other_edges, b)
+            if swap:
+                _mark(hits, other_ranges, line_ranges)
+            else:
+                _mark(hits, line_ranges, other_ranges)
 
-    return feature_collection(results)
+    return hits[::-1 if flip_x else 1, ::-1 if flip_y else 1]
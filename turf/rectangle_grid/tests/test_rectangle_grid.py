@@ -1,8 +1,13 @@
 import pytest
 import os
 
+import numpy as np
+
 from turf.bbox_polygon import bbox_polygon
+from turf.boolean_intersects import boolean_intersects
+from turf.helpers import multi_polygon, polygon
 from turf.rectangle_grid import rectangle_grid
+from turf.square_grid import square_grid
 
 from turf.utils.test_setup import get_fixtures
 
@@ -80,3 +85,107 @@ def round_coordinates(cell_poly):
     cell_poly["geometry"]["coordinates"] = coords
 
     return cell_poly
+
+
+def star_polygon(center, radii):
+    """
+    Polygon with vertices at the given distances from its center.
+    """
+    angles = np.linspace(0, 2 * np.pi, len(radii), endpoint=False)
+    ring = np.column_stack([center[0] + radii * np.cos(angles), center[1] + radii * np.sin(angles)])
+    return [np.vstack([ring, ring[:1]]).tolist()]
+
+
+class TestRectangleGridEngine:
+    def test_array_output(self):
+        bbox = [8.5, 47.3, 8.6, 47.4]
+        grid = rectangle_grid(bbox, 1, 2, {"units": "kilometers"})
+        rings = rectangle_grid(bbox, 1, 2, {"units": "kilometers"}, output="array")
+
+        assert rings.shape == (len(grid["features"]), 5, 2)
+        assert rings.tolist() == [feature["geometry"]["coordinates"][0] for feature in grid["features"]]
+        assert square_grid(bbox, 1, {"units": "kilometers"}, output="array").shape[1:] == (5, 2)
+
+    def test_unknown_output(self):
+        with pytest.raises(ValueError):
+            rectangle_grid([0, 0, 1, 1], 10, 10, {"units": "kilometers"}, output="points")
+
+    @pytest.mark.parametrize("seed", range(3))
+    def test_mask_matches_boolean_intersects(self, seed):
+        rng = np.random.default_rng(seed)
+        bbox = [0, 0, 1, 0.8]
+        first = star_polygon([0.5, 0.4], rng.uniform(0.05, 0.5, 9))
+        second = star_polygon([0.9, 0.1], rng.uniform(0.01, 0.2, 4))
+        masks = [polygon(first), multi_polygon([first, second])]
+
+        cells = rectangle_grid(bbox, 8, 8, {"units": "kilometers"})["features"]
+        for mask in masks:
+            expected = [cell for cell in cells if boolean_intersects(mask, cell)]
+            assert rectangle_grid(bbox, 8, 8, {"units": "kilometers", "mask": mask}) == {"type": "FeatureCollection", "features": expected}
+
+    def test_mask_with_hole(self):
+        outer = [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]
+        hole = [[2.5, 2.5], [2.5, 7.5], [7.5, 7.5], [7.5, 2.5], [2.5, 2.5]]
+        options = {"units": "degrees"}
+        rings = rectangle_grid([0, 0, 10, 10], 1, 1, options, output="array")
+        masked = rectangle_grid([0, 0, 10, 10], 1, 1, dict(options, mask=polygon([outer, hole])), output="array")
+
+        in_hole = np.all((rings > 2.5) & (rings < 7.5), axis=(1, 2))
+        assert 0 < in_hole.sum() < len(rings)
+        assert masked.tolist() == rings[~in_hole].tolist()
+
+
+def cell_borders(rings):
+    """
+    Unit borders of the cells, each as sorted pair of corners.
+    """
+    return {tuple(sorted(map(tuple, ring[i:i + 2]))) for ring in rings.tolist() for i in range(4)}
+
+
+def line_borders(lines, xs, ys):
+    """
+    Splits the lines at the cell edges xs and ys into unit borders.
+    """
+    borders = []
+    for (x0, y0), (x1, y1) in lines:
+        if x0 == x1:
+            stops = [y for y in ys if y0 <= y <= y1]
+            borders += [((x0, a), (x0, b)) for a, b in zip(stops, stops[1:])]
+        else:
+            stops = [x for x in xs if x0 <= x <= x1]
+            borders += [((a, y0), (b, y0)) for a, b in zip(stops, stops[1:])]
+    return borders
+
+
+class TestRectangleGridLines:
+    def test_full_grid(self):
+        bbox = [8.5, 47.3, 8.6, 47.4]
+        rings = rectangle_grid(bbox, 1, 2, {"units": "kilometers"}, output="array")
+        grid = rectangle_grid(bbox, 1, 2, {"units": "kilometers", "properties": {"a": 1}}, output="lines")
+        lines = grid["geometry"]["coordinates"]
+        xs, ys = np.unique(rings[:, :, 0]).tolist(), np.unique(rings[:, :, 1]).tolist()
+
+        assert grid["type"] == "Feature" and grid["properties"] == {"a": 1}
+        assert grid["geometry"]["type"] == "MultiLineString"
+        assert len(lines) == len(xs) + len(ys)
+        borders = line_borders(lines, xs, ys)
+        assert len(borders) == len(set(borders))
+        assert set(borders) == cell_borders(rings)
+
+    def test_masked_grid(self):
+        bbox = [0, 0, 1, 0.8]
+        mask = polygon(star_polygon([0.5, 0.4], np.random.default_rng(0).uniform(0.05, 0.5, 9)))
+        options = {"units": "kilometers", "mask": mask}
+        rings = rectangle_grid(bbox, 8, 8, options, output="array")
+        lines = square_grid(bbox, 8, options, output="lines")["geometry"]["coordinates"]
+        xs, ys = np.unique(rings[:, :, 0]).tolist(), np.unique(rings[:, :, 1]).tolist()
+
+        borders = line_borders(lines, xs, ys)
+        assert len(borders) == len(set(borders))
+        assert set(borders) == cell_borders(rings)
+
+    def test_empty_grid(self):
+        bbox = [0, 0, 1, 1]
+        mask = polygon([[[5, 5], [6, 5], [6, 6], [5, 5]]])
+        grid = rectangle_grid(bbox, 10, 10, {"units": "kilometers", "mask": mask}, output="lines")
+        assert grid["geometry"]["coordinates"] == []
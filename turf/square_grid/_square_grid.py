@@ -1,6 +1,8 @@
 from typing import Dict, List, Union
 
-from turf.helpers import FeatureCollection
+import numpy as np
+
+from turf.helpers import Feature, FeatureCollection
 from turf.rectangle_grid import rectangle_grid
 
 
@@ -8,7 +10,8 @@ def square_grid(
     bbox: List[float],
     n_cells: Union[int, float],
     options: Dict = {},
-) -> FeatureCollection:
+    output: str = "polygons",
+) -> Union[FeatureCollection, np.ndarray, Feature]:
     """
     Creates a square of rectangles from a bounding box, Feature or FeatureCollection.
 
@@ -20,8 +23,13 @@ def square_grid(
         [options["mask"]]: if passed a Polygon or MultiPolygon here,
                            the grid Points will be created only inside it
         [options["properties"]]: passed to each point of the grid
+    :param output: "polygons" for a FeatureCollection of polygons,
+        "array" for the rings of the cells as array of shape (cells, 5, 2),
+        "lines" for a MultiLineString Feature of the cell borders, see rectangle_grid_cells
 
-    :returns: FeatureCollection of a grid of polygons
+    :returns: FeatureCollection of a grid of polygons for output="polygons",
+        array of cell rings for output="array", or for output="lines" a single
+        Feature whose geometry is a MultiLineString of the cell borders
     """
 
-    return rectangle_grid(bbox, n_cells, n_cells, options)
+    return rectangle_grid(bbox, n_cells, n_cells, options, output)
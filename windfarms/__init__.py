@@ -0,0 +1,10 @@
+from windfarms.store import ColumnStore, ingest_csv, load_store, load_table
+from windfarms.filtering import FilterEngine
+from windfarms.encoding import decode_bits, decode_mask, encode_bits, encode_columns, encode_mask
+from windfarms.cache import FigureCache, FilterResult, FilterResultCache, LRUCache
+from windfarms.geobuf import encode_points, points_to_geobuf
+from windfarms.clustering import ClusterIndex
+from windfarms.tiles import TileSet, build_tiles, load_tiles
+from windfarms.views import FarmViews, build_views, load_views
+from windfarms.cube import AggregationCube, describe_weighted
+from windfarms.histogram import ValueHistogram
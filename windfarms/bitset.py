@@ -0,0 +1,88 @@
+"""
+Packed bitsets over the row positions of a table.
+
+A bitset of ``n`` rows is a ``uint64`` array of ``ceil(n / 64)`` words, bit
+``i % 64`` of word ``i // 64`` standing for row ``i``. Bits past ``n`` are
+always zero, so bitwise AND/OR of bitsets and population counts need no
+special handling of the last word.
+"""
+import numpy as np
+
+# Number of set bits of every byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def n_words(n_rows: int) -> int:
+    return (n_rows + 63) // 64
+
+
+def empty(n_rows: int) -> np.ndarray:
+    return np.zeros(n_words(n_rows), dtype=np.uint64)
+
+
+def full(n_rows: int) -> np.ndarray:
+    return from_mask(np.ones(n_rows, dtype=bool))
+
+
+def from_mask(mask: np.ndarray) -> np.ndarray:
+    """
+    :param mask: boolean array with one entry per row
+    :returns: bitset of the True rows
+    """
+    packed = np.packbits(mask, bitorder="little")
+    words = np.zeros(n_words(len(mask)) * 8, dtype=np.uint8)
+    words[: len(packed)] = packed
+    return words.view("<u8").astype(np.uint64, copy=False)
+
+
+def from_indices(indices: np.ndarray, n_rows: int) -> np.ndarray:
+    """
+    :param indices: row positions to set
+    :param n_rows: number of rows of the table
+    :returns: bitset with the given rows set
+    """
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[indices] = True
+    return from_mask(mask)
+
+
+def to_mask(bits: np.ndarray, n_rows: int) -> np.ndarray:
+    """
+    :returns: boolean array with one entry per row
+    """
+    as_bytes = np.ascontiguousarray(bits, dtype="<u8").view(np.uint8)
+    return np.unpackbits(as_bytes, count=n_rows, bitorder="little").view(bool)
+
+
+def count(bits: np.ndarray) -> int:
+    """
+    :returns: number of set bits
+    """
+    return int(_POPCOUNT[np.ascontiguousarray(bits).view(np.uint8)].sum(dtype=np.int64))
+
+
+def toggled(bits: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """
+    :param bits: bitset
+    :param indices: distinct row positions to flip
+    :returns: copy of the bitset with the given rows flipped
+    """
+    result = bits.copy()
+    if len(indices):
+        indices = np.sort(indices)
+        words = indices >> 6
+        masks = np.left_shift(np.uint64(1), (indices & 63).astype(np.uint64))
+        # One combined mask per touched word
+        starts = np.flatnonzero(np.r_[True, words[1:] != words[:-1]])
+        result[words[starts]] ^= np.bitwise_or.reduceat(masks, starts)
+    return result
+
+
+def is_set(bits: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """
+    :param bits: bitset
+    :param indices: row positions
+    :returns: boolean array, whether the bit of each given row is set
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    return ((bits[indices >> 6] >> (indices & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
@@ -0,0 +1,400 @@
+import binascii
+import hashlib
+import json
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+from flask_caching.backends.base import BaseCache
+
+from windfarms import bitset
+from windfarms.encoding import decode_bits, encode_bits
+
+
+def estimate_nbytes(value: Any, seen: Optional[set] = None) -> int:
+    """
+    Rough memory size of a value: the buffers of arrays and frames, the
+    ``nbytes`` of objects that report it, otherwise the sizes of the items
+    of containers and the attributes of objects, each object counted once.
+
+    :param value: any value, e.g. a cached filter result or a figure
+    :returns: estimated size in bytes
+    """
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, (np.ndarray, FilterResult)):
+        return int(value.nbytes)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(index=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(item, seen) for item in value.values())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(item, seen) for item in value)
+    if hasattr(value, "to_plotly_json"):
+        # plotly figures and Dash components
+        return estimate_nbytes(value.to_plotly_json(), seen)
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + estimate_nbytes(vars(value), seen)
+    return sys.getsizeof(value)
+
+
+class LRUCache(BaseCache):
+    """
+    In-process least-recently-used backend for Flask-Caching.
+
+    Unlike the SimpleCache backend, values are kept as live objects instead of
+    pickled copies, so cached arrays and frames are shared rather than
+    deserialized on every hit, and the entries touched least recently are
+    evicted once more than ``threshold`` entries are stored or their sizes
+    (``estimate_nbytes``) add up to more than ``max_bytes``. Values that grow
+    while cached, like filter results deriving frames, are measured again
+    whenever an entry is set or read. The entry touched last is always kept.
+    Cached values must be treated as read-only.
+
+    Use with ``CACHE_TYPE = "windfarms.cache.LRUCache"``, ``CACHE_THRESHOLD``
+    and optionally ``CACHE_MAX_BYTES``.
+    """
+
+    def __init__(self, threshold: int = 500, default_timeout: int = 0, max_bytes: Optional[int] = None):
+        super().__init__(default_timeout=default_timeout)
+        self._threshold = threshold
+        self._max_bytes = max_bytes
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(threshold=config["CACHE_THRESHOLD"], max_bytes=config.get("CACHE_MAX_BYTES"))
+        return cls(*args, **kwargs)
+
+    def _evict(self):
+        while len(self._cache) > self._threshold:
+            self._cache.popitem(last=False)
+        if self._max_bytes is None:
+            return
+        sizes = [estimate_nbytes(value) for value in self._cache.values()]
+        total = sum(sizes)
+        for size in sizes[:-1]:
+            if total <= self._max_bytes:
+                break
+            self._cache.popitem(last=False)
+            total -= size
+
+    def nbytes(self) -> int:
+        """
+        :returns: estimated size of the cached values
+        """
+        with self._lock:
+            return sum(estimate_nbytes(value) for value in self._cache.values())
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            try:
+                value = self._cache[key]
+            except KeyError:
+                return None
+            self._cache.move_to_end(key)
+            self._evict()
+            return value
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            self._evict()
+        return True
+
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        with self._lock:
+            if key in self._cache:
+                return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._cache.pop(key, None) is not None
+
+    def has(self, key: str) -> bool:
+        with self._lock:
+            return key in self._cache
+
+    def clear(self) -> bool:
+        with self._lock:
+            self._cache.clear()
+        return True
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+class FilterResult:
+    """
+    Rows of one table that pass one filter state, plus values derived from
+    them (masks, frames, figures) that callbacks compute at most once, also
+    when several threads ask for the same value at the same time.
+    """
+
+    def __init__(self, key: str, bits: np.ndarray, rows: int, state: Optional[Dict] = None):
+        """
+        :param key: cache key of the filter state
+        :param bits: bitset of the matching rows
+        :param rows: number of rows of the table
+        :param state: normalized filter state the rows can be recomputed from (see
+            ``FilterEngine.state``), unknown for clientside results
+        """
+        self.key = key
+        self.bits = bits
+        self.rows = rows
+        self.state = state
+        self.count = bitset.count(bits)
+        self._derived = {}
+        # Lock per derived value, so that computing one value does not hold up the others
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._derived_nbytes = 0
+
+    @property
+    def mask(self) -> np.ndarray:
+        return self.derive("mask", lambda: bitset.to_mask(self.bits, self.rows))
+
+    def derive(self, name: str, compute: Callable[[], Any]) -> Any:
+        """
+        :param name: name of the derived value
+        :param compute: function computing the value on first use
+        :returns: derived value
+        """
+        if name in self._derived:
+            return self._derived[name]
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._derived:
+                value = compute()
+                size = estimate_nbytes(value)
+                with self._lock:
+                    self._derived[name] = value
+                    self._derived_nbytes += size
+        return self._derived[name]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        :returns: estimated size of the bits and the derived values (see ``estimate_nbytes``)
+        """
+        return int(self.bits.nbytes) + self._derived_nbytes
+
+    def payload(self) -> Dict:
+        """
+        :returns: encoded result for a dcc.Store, carrying the cache key and the filter state
+        """
+        return self.derive("payload", lambda: dict(encode_bits(self.bits, self.rows), key=self.key, state=self.state))
+
+
+class FilterResultCache:
+    """
+    Filter results shared by all callbacks of a process, keyed by table and
+    a canonical hash of the filter state (see ``FilterEngine.key``), or for
+    clientside results without a state by a hash of their bits.
+    """
+
+    def __init__(self, cache):
+        """
+        :param cache: flask_caching.Cache to store the results in
+        """
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: str, compute: Callable[[], np.ndarray], rows: int, state: Optional[Dict] = None) -> FilterResult:
+        """
+        :param key: cache key of the filter state
+        :param compute: function returning the bitset of the matching rows
+        :param rows: number of rows of the table
+        :param state: normalized filter state of the key, see ``FilterResult``
+        :returns: cached or newly computed FilterResult
+        """
+        result = self.cache.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = FilterResult(key, compute(), rows, state)
+        self.cache.set(key, result)
+        return result
+
+    def get(self, key: str) -> Optional[FilterResult]:
+        """
+        :param key: cache key of a filter state
+        :returns: cached FilterResult, None if it is not (or no longer) cached
+        """
+        return self.cache.get(key)
+
+    def from_payload(self, payload: Dict, engine) -> FilterResult:
+        """
+        Reads a filter result sent back by a client. Its cache key and its bits
+        are never trusted: a result with a filter state is recomputed from the
+        state checked by the engine, other (clientside) results are keyed by a
+        hash of their own bits, so no payload can replace the result of
+        another filter state.
+
+        :param payload: encoded filter result from a dcc.Store
+        :param engine: FilterEngine of the table of the result
+        :returns: FilterResult, computed only if it is not cached in this process
+        :raises ValueError: if the payload does not belong to the table of the engine
+        """
+        if not isinstance(payload, dict) or payload.get("rows") != engine.rows:
+            raise ValueError(f"Filter result does not match the {engine.rows} rows of table {engine.name!r}")
+        state = payload.get("state")
+        if state is not None:
+            if not isinstance(state, dict):
+                raise ValueError(f"Invalid filter state: {state!r}")
+            return self.get_or_compute(engine.state_key(state), lambda: engine.state_bits(state), engine.rows, state)
+        if not isinstance(payload.get("bits"), str):
+            raise ValueError("Filter result without bits")
+        digest = hashlib.sha1(f"{payload.get('encoding')}:{payload['bits']}".encode("utf-8")).hexdigest()
+        return self.get_or_compute(f"{engine.name}:bits:{digest[:20]}", lambda: _checked_bits(payload, engine.rows), engine.rows)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        backend = getattr(self.cache, "cache", self.cache)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "entries": len(backend) if hasattr(backend, "__len__") else None,
+        }
+
+
+def _checked_bits(payload: Dict, rows: int) -> np.ndarray:
+    """
+    :returns: bitset of an encoded filter result, bits past the rows of the table cleared
+    :raises ValueError: if the bits cannot be decoded or hold more rows than the table
+    """
+    try:
+        bits = decode_bits(payload)
+    except (zlib.error, binascii.Error) as error:
+        raise ValueError(f"Invalid filter result bits: {error}") from error
+    return bits & bitset.full(rows)
+
+
+class FigureCache:
+    """
+    Serialized figures keyed by an id (e.g. the WFid of a single wind farm
+    plot), built on first use and evicted least recently used first once
+    their total size exceeds ``max_bytes``.
+
+    Figures are stored as JSON, so a hit skips building and validating the
+    plotly figure and returns a fresh dict that callers may modify.
+    """
+
+    def __init__(self, build: Callable[[Hashable], Any], max_bytes: int = 64 * 2**20):
+        """
+        :param build: function returning the plotly figure of a key
+        :param max_bytes: total size of the serialized figures kept
+        """
+        self.build = build
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.build_seconds = 0.0
+        self.max_build_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._figures)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._figures
+
+    def _get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            data = self._figures.get(key)
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._figures.move_to_end(key)
+            return data
+
+    def _set(self, key: Hashable, data: bytes):
+        with self._lock:
+            previous = self._figures.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous)
+            # Figures larger than the whole cache are not kept
+            if len(data) > self.max_bytes:
+                return
+            self._figures[key] = data
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._figures.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def _build(self, key: Hashable) -> bytes:
+        start = time.perf_counter()
+        data = pio.to_json(self.build(key), validate=False).encode("utf-8")
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.builds += 1
+            self.build_seconds += seconds
+            self.max_build_seconds = max(self.max_build_seconds, seconds)
+        return data
+
+    def get(self, key: Hashable) -> Dict:
+        """
+        :param key: id of the figure
+        :returns: cached or newly built figure as dict
+        """
+        data = self._get(key)
+        if data is None:
+            data = self._build(key)
+            self._set(key, data)
+        return json.loads(data)
+
+    def warm(self, keys: Iterable[Hashable]) -> int:
+        """
+        Builds the figures of the given keys that are not cached yet, in order,
+        until the next one does not fit without evicting others.
+
+        :param keys: ids of the figures, most important first
+        :returns: number of figures added
+        """
+        added = 0
+        for key in keys:
+            if key in self:
+                continue
+            data = self._build(key)
+            if self.bytes + len(data) > self.max_bytes:
+                break
+            self._set(key, data)
+            added += 1
+        return added
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "entries": len(self._figures),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "builds": self.builds,
+            "mean_build_ms": self.build_seconds / self.builds * 1000 if self.builds else None,
+            "max_build_ms": self.max_build_seconds * 1000,
+        }
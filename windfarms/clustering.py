@@ -0,0 +1,205 @@
+import math
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Latitude limit of the Web Mercator projection
+MAX_LATITUDE = 85.05112878
+
+
+def lon_to_x(lon):
+    """
+    :returns: Web Mercator x in [0, 1]
+    """
+    return np.asarray(lon, dtype=np.float64) / 360 + 0.5
+
+
+def lat_to_y(lat):
+    """
+    :returns: Web Mercator y in [0, 1], 0 at the top
+    """
+    sin = np.sin(np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE)))
+    return 0.5 - 0.25 * np.log((1 + sin) / (1 - sin)) / np.pi
+
+
+def x_to_lon(x):
+    return (np.asarray(x) - 0.5) * 360
+
+
+def y_to_lat(y):
+    return np.degrees(2 * np.arctan(np.exp((0.5 - np.asarray(y)) * 2 * np.pi)) - np.pi / 2)
+
+
+def abbreviate(count: int) -> str:
+    """
+    :returns: point count as shown on a cluster marker, e.g. 1.2k
+    """
+    if count >= 10000:
+        return f"{round(count / 1000)}k"
+    if count >= 1000:
+        return f"{round(count / 100) / 10:g}k"
+    return str(count)
+
+
+class _Level:
+    """
+    Clusters of one zoom level, sorted by x for range queries.
+    """
+
+    def __init__(self, x, y, count, point, expansion_zoom):
+        order = np.argsort(x, kind="stable")
+        self.x = x[order]
+        self.y = y[order]
+        self.count = count[order]
+        self.point = point[order]
+        self.expansion_zoom = expansion_zoom[order]
+
+    def __len__(self):
+        return len(self.x)
+
+    def within(self, min_x, min_y, max_x, max_y) -> np.ndarray:
+        start = np.searchsorted(self.x, min_x, side="left")
+        stop = np.searchsorted(self.x, max_x, side="right")
+        idx = np.arange(start, stop)
+        return idx[(self.y[idx] >= min_y) & (self.y[idx] <= max_y)]
+
+
+class ClusterIndex:
+    """
+    Hierarchical point clustering in the spirit of supercluster, built once
+    per set of points and queried per viewport.
+
+    Points are binned into a grid of ``radius`` pixels per zoom level, where a
+    tile is ``extent`` pixels wide. Grids of consecutive zoom levels nest, so
+    each level is computed from the clusters of the level below it instead of
+    from the raw points, and every cluster splits into the clusters of its
+    cell at the next zoom level. A cluster is placed at the weighted centroid
+    of its points. Unlike supercluster's greedy radius search, points closer
+    than ``radius`` but on either side of a cell border are not merged.
+    """
+
+    def __init__(
+        self,
+        lon: Sequence[float],
+        lat: Sequence[float],
+        properties: Optional[Dict[str, Sequence]] = None,
+        radius: int = 100,
+        extent: int = 512,
+        min_zoom: int = 0,
+        max_zoom: int = 11,
+    ):
+        """
+        :param lon: longitude per point
+        :param lat: latitude per point
+        :param properties: columns attached to unclustered points
+        :param radius: cluster radius in pixels
+        :param extent: tile extent in pixels
+        :param min_zoom: lowest zoom level with clusters
+        :param max_zoom: highest zoom level with clusters, points are returned unclustered above it
+        """
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.properties = {k: np.asarray(v) for k, v in (properties or {}).items()}
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+
+        n = len(self.lon)
+        x, y = lon_to_x(self.lon), lat_to_y(self.lat)
+        count = np.ones(n, dtype=np.int64)
+        point = np.arange(n, dtype=np.int64)
+        expansion_zoom = np.full(n, max_zoom + 1, dtype=np.int64)
+        self.levels = {max_zoom + 1: _Level(x, y, count, point, expansion_zoom)}
+
+        # Grid cell of every point at the highest clustered zoom level
+        cell_size = radius / (extent * 2.0**max_zoom)
+        n_cells = int(math.ceil(1 / cell_size))
+        cell_x = np.minimum((x / cell_size).astype(np.int64), n_cells - 1)
+        cell_y = np.minimum((y / cell_size).astype(np.int64), n_cells - 1)
+
+        for zoom in range(max_zoom, min_zoom - 1, -1):
+            keys, parent = np.unique(cell_x * n_cells + cell_y, return_inverse=True)
+            parent = parent.ravel()
+            n_groups = len(keys)
+
+            children = np.bincount(parent, minlength=n_groups)
+            group_count = np.bincount(parent, weights=count, minlength=n_groups)
+            group_x = np.bincount(parent, weights=x * count, minlength=n_groups) / group_count
+            group_y = np.bincount(parent, weights=y * count, minlength=n_groups) / group_count
+
+            # Any member of a group, enough for groups with a single child
+            member = np.zeros(n_groups, dtype=np.int64)
+            member[parent] = np.arange(len(parent))
+            group_count = group_count.astype(np.int64)
+            group_point = np.where(group_count == 1, point[member], -1)
+            group_expansion = np.where(children == 1, expansion_zoom[member], zoom + 1)
+
+            self.levels[zoom] = _Level(group_x, group_y, group_count, group_point, group_expansion)
+
+            # Cells of the next lower zoom level cover 2x2 cells of this one
+            x, y, count, point, expansion_zoom = group_x, group_y, group_count, group_point, group_expansion
+            cell_x = (keys // n_cells) // 2
+            cell_y = (keys % n_cells) // 2
+            n_cells = (n_cells + 1) // 2
+
+    def __len__(self) -> int:
+        return len(self.lon)
+
+    def _query(self, bbox: Sequence[float], zoom: int):
+        west, south, east, north = bbox
+        level = self.levels[min(max(int(zoom), self.min_zoom), self.max_zoom + 1)]
+        min_y, max_y = lat_to_y(min(max(north, -90), 90)), lat_to_y(min(max(south, -90), 90))
+
+        if east - west >= 360:
+            spans = [(-180.0, 180.0)]
+        else:
+            west = (west + 180) % 360 - 180
+            east = (east + 180) % 360 - 180
+            spans = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+
+        idx = np.concatenate([
+            level.within(lon_to_x(w), min_y, lon_to_x(e), max_y) for w, e in spans
+        ])
+        return level, idx
+
+    def get_cluster_columns(self, bbox: Sequence[float], zoom: int):
+        """
+        :param bbox: viewport extent in [west, south, east, north] order
+        :param zoom: zoom level of the viewport
+        :returns: longitudes, latitudes and property columns of the clusters and points in view.
+            The cluster properties ``cluster``, ``point_count``, ``point_count_abbreviated`` and
+            ``expansion_zoom`` are masked for points, the point properties for clusters
+        """
+        level, idx = self._query(bbox, zoom)
+        point = level.point[idx]
+        is_point = point >= 0
+        source = np.where(is_point, point, 0)
+        lon = np.where(is_point, self.lon[source], x_to_lon(level.x[idx]))
+        lat = np.where(is_point, self.lat[source], y_to_lat(level.y[idx]))
+
+        count = level.count[idx]
+        columns = {
+            "cluster": np.ma.masked_array(np.ones(len(idx), dtype=bool), is_point),
+            "point_count": np.ma.masked_array(count, is_point),
+            "point_count_abbreviated": np.ma.masked_array([abbreviate(c) for c in count.tolist()], is_point, dtype=object),
+            "expansion_zoom": np.ma.masked_array(level.expansion_zoom[idx], is_point),
+        }
+        for name, values in self.properties.items():
+            columns[name] = np.ma.masked_array(values[source], ~is_point)
+        return lon, lat, columns
+
+    def get_clusters(self, bbox: Sequence[float], zoom: int) -> List[Dict]:
+        """
+        :param bbox: viewport extent in [west, south, east, north] order
+        :param zoom: zoom level of the viewport
+        :returns: GeoJSON point features, see ``get_cluster_columns`` for the properties
+        """
+        lon, lat, columns = self.get_cluster_columns(bbox, zoom)
+        values = [(name, np.ma.getdata(column).tolist(), np.ma.getmaskarray(column).tolist()) for name, column in columns.items()]
+        return [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [x, y]},
+                "properties": {name: column[i] for name, column, masked in values if not masked[i]},
+            }
+            for i, (x, y) in enumerate(zip(lon.tolist(), lat.tolist()))
+        ]
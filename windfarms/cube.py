@@ -0,0 +1,193 @@
+"""
+Precomputed aggregation cube of a table over the filter dimensions.
+
+Rows that agree on every filter dimension (the categorical columns, the
+values of the range columns) and on whether they belong to a wind farm
+always pass or fail a filter together. They are collapsed into one cell
+holding their count, so the counts, histograms and summary statistics of a
+filter result are sums over the selected cells and no longer touch the rows.
+
+The range columns are kept at their exact values rather than in bins: the
+sliders may stop at any value, and a bin that a slider bound splits could
+not be assigned to either side.
+"""
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from windfarms import bitset
+from windfarms.filtering import CATEGORICAL_FILTERS, RANGE_FILTERS
+from windfarms.histogram import DESCRIBE, ValueHistogram
+from windfarms.store import IN_FARM, ColumnStore
+
+
+def _cell_keys(codes: Sequence[np.ndarray], sizes: Sequence[int]) -> np.ndarray:
+    """
+    :param codes: non-negative integer codes per row, one array per dimension
+    :param sizes: number of distinct codes per dimension
+    :returns: one key per row, equal for rows with equal codes in every dimension
+    """
+    radix = 1
+    for size in sizes:
+        radix *= size
+    if radix < 2**63:
+        keys = np.zeros(len(codes[0]), dtype=np.int64)
+        for column, size in zip(codes, sizes):
+            keys = keys * size + column
+        return keys
+    _, keys = np.unique(np.column_stack(codes), axis=0, return_inverse=True)
+    return keys
+
+
+class AggregationCube:
+    """
+    Row counts of one table per combination of the filter dimensions and the
+    wind farm flag.
+    """
+
+    def __init__(self, store: ColumnStore, exclude_wfids: Iterable[int] = ()):
+        """
+        :param store: table to aggregate
+        :param exclude_wfids: WFids whose rows are left out, e.g. -1 for the wind farm table
+        """
+        self.store = store
+        self.categorical = [name for name in CATEGORICAL_FILTERS if name in store]
+        self.numeric = [name for name in RANGE_FILTERS if name in store]
+
+        rows = ~np.isin(store["WFid"], list(exclude_wfids))
+        self.row_ids = np.flatnonzero(rows)
+        in_farm = store["WFid"][rows] != -1
+
+        codes, sizes, values = [], [], {}
+        for name in self.categorical:
+            # +1: code 0 for missing values
+            codes.append(store[name][rows].astype(np.int64) + 1)
+            sizes.append(len(store.categories(name)) + 1)
+        for name in self.numeric:
+            values[name], inverse = np.unique(store[name][rows], return_inverse=True)
+            codes.append(inverse)
+            sizes.append(len(values[name]))
+        codes.append(in_farm.astype(np.int64))
+        sizes.append(2)
+
+        _, first, row_cells, counts = np.unique(
+            _cell_keys(codes, sizes), return_index=True, return_inverse=True, return_counts=True
+        )
+        # Cell of every row of the table, -1 for left out rows
+        self.row_cells = np.full(store.rows, -1, dtype=np.int32)
+        self.row_cells[self.row_ids] = row_cells
+        # First row of the table in each cell
+        self.first_rows = self.row_ids[first]
+        self.counts = counts
+        self.cells = {name: store[name][self.first_rows] for name in self.categorical + self.numeric}
+        self.cells[IN_FARM] = store["WFid"][self.first_rows] != -1
+        self._histograms = {}
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def cell_mask(self, bits: np.ndarray) -> np.ndarray:
+        """
+        :param bits: bitset of the rows of a filter result, see ``FilterEngine.bits``
+        :returns: boolean mask of the selected cells, the cells whose rows pass
+        """
+        return bitset.is_set(bits, self.first_rows)
+
+    def select(
+        self,
+        selections: Dict[str, Sequence[str]],
+        ranges: Optional[Dict[str, Sequence[float]]] = None,
+    ) -> np.ndarray:
+        """
+        Evaluates a filter state on the cells, with the predicates of ``FilterEngine``.
+
+        :param selections: selected labels per categorical column
+        :param ranges: [low, high] per numeric column
+        :returns: boolean mask of the selected cells
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for name, selected in selections.items():
+            lookup = {c: i for i, c in enumerate(self.store.categories(name))}
+            mask &= np.isin(self.cells[name], [lookup[s] for s in selected or [] if s in lookup])
+        for name, (low, high) in (ranges or {}).items():
+            mask &= (self.cells[name] >= low) & (self.cells[name] <= high)
+        return mask
+
+    def count(self, mask: np.ndarray) -> int:
+        """
+        :returns: number of rows in the selected cells
+        """
+        return int(self.counts[mask].sum())
+
+    def histogram(self, name: str) -> ValueHistogram:
+        """
+        :param name: numeric column
+        :returns: value histograms of the column per cell, computed on first use
+        """
+        if name not in self._histograms:
+            self._histograms[name] = ValueHistogram(self.store[name][self.first_rows], self.counts)
+        return self._histograms[name]
+
+    def frame(self, mask: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        :param mask: selected cells, all by default
+        :returns: one row per selected cell with the filter dimensions (categorical columns with
+            category dtype), the wind farm flag IN_FARM, the number of rows of the cell as "count" and its position as "cell"
+        """
+        positions = slice(None) if mask is None else np.flatnonzero(mask)
+        data = {}
+        for name in self.categorical:
+            data[name] = pd.Categorical.from_codes(self.cells[name][positions], categories=self.store.categories(name))
+        for name in self.numeric + [IN_FARM]:
+            data[name] = self.cells[name][positions]
+        data["count"] = self.counts[positions]
+        data["cell"] = np.arange(len(self))[positions]
+        return pd.DataFrame(data)
+
+
+def describe_weighted(values, weights, groups=None) -> pd.DataFrame:
+    """
+    Exact ``describe`` of repeated values: every value stands for ``weight``
+    rows, optionally per group like ``groupby(groups)[...].describe()``.
+
+    :param values: numeric values
+    :param weights: positive integer number of rows of each value
+    :param groups: group of each value, one group by default
+    :returns: DataFrame with the DESCRIBE statistics as columns, one row per group with
+        rows in ascending order of the groups
+    """
+    values = np.asarray(values, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.int64)
+    valid = ~np.isnan(values)
+    values, weights = values[valid], weights[valid]
+    groups = np.zeros(len(values), dtype=np.int64) if groups is None else np.asarray(groups)[valid]
+    labels, groups = np.unique(groups, return_inverse=True)
+
+    order = np.lexsort((values, groups))
+    values, weights, groups = values[order], weights[order], groups[order]
+    n = np.bincount(groups, weights=weights, minlength=len(labels))
+    total = np.bincount(groups, weights=weights * values, minlength=len(labels))
+    mean = total / n
+    squares = np.bincount(groups, weights=weights * (values - mean[groups]) ** 2, minlength=len(labels))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        std = np.where(n > 1, np.sqrt(squares / (n - 1)), np.nan)
+
+    # Rows before each group and the row up to which each value reaches, in the sorted order
+    cumulative = np.cumsum(weights)
+    starts = np.r_[0, np.cumsum(n)[:-1]].astype(np.int64)
+
+    def value_at(rank):
+        return values[np.searchsorted(cumulative, starts + rank, side="right")]
+
+    stats = {"count": n, "mean": mean, "std": std}
+    stats["min"] = value_at(np.zeros(len(labels), dtype=np.int64))
+    for q in (0.25, 0.5, 0.75):
+        # linear interpolation between the two closest ranks, like pandas
+        position = (n - 1) * q
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        low_value, high_value = value_at(low), value_at(high)
+        stats[f"{q:.0%}"] = low_value + (high_value - low_value) * (position - low)
+    stats["max"] = value_at((n - 1).astype(np.int64))
+    return pd.DataFrame(stats, index=labels, columns=DESCRIBE)
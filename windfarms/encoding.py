@@ -0,0 +1,93 @@
+"""
+Compact encoding of filter results for the dcc.Store components.
+
+A result is the bitset of the matching row positions of a table, stored as
+base64 text. The server additionally deflates it with zlib, which collapses
+the long runs of set or cleared bits that filters produce, e.g. the
+all-default filter of the turbine table takes about a hundred bytes. The
+clientside filter emits the uncompressed form.
+"""
+import base64
+import zlib
+from typing import Dict
+
+import numpy as np
+
+from windfarms import bitset
+
+
+def encode_bits(bits: np.ndarray, n_rows: int, compress: bool = True) -> Dict:
+    """
+    :param bits: bitset of the matching rows
+    :param n_rows: number of rows of the table
+    :param compress: deflate the bitset before base64 encoding
+    :returns: JSON serializable filter result
+    """
+    raw = np.ascontiguousarray(bits, dtype="<u8").tobytes()[: (n_rows + 7) // 8]
+    return {
+        "rows": n_rows,
+        "count": bitset.count(bits),
+        "encoding": "zlib" if compress else "raw",
+        "bits": base64.b64encode(zlib.compress(raw) if compress else raw).decode("ascii"),
+    }
+
+
+def encode_mask(mask: np.ndarray, compress: bool = True) -> Dict:
+    """
+    :param mask: boolean array with one entry per row
+    :returns: JSON serializable filter result
+    """
+    return encode_bits(bitset.from_mask(mask), len(mask), compress)
+
+
+def decode_bits(payload: Dict) -> np.ndarray:
+    """
+    :param payload: filter result made by ``encode_bits`` or the clientside filter
+    :returns: bitset of the matching rows
+    """
+    raw = base64.b64decode(payload["bits"])
+    if payload.get("encoding") == "zlib":
+        raw = zlib.decompress(raw)
+    words = np.zeros(bitset.n_words(payload["rows"]) * 8, dtype=np.uint8)
+    words[: len(raw)] = np.frombuffer(raw, dtype=np.uint8)
+    return words.view("<u8").astype(np.uint64, copy=False)
+
+
+def decode_mask(payload: Dict) -> np.ndarray:
+    """
+    :param payload: filter result made by ``encode_bits`` or the clientside filter
+    :returns: boolean array with one entry per row
+    """
+    return bitset.to_mask(decode_bits(payload), payload["rows"])
+
+
+# Typed array constructors of the browser per NumPy dtype
+_JS_ARRAY_TYPES = {("i", 1): "Int8Array", ("i", 2): "Int16Array", ("i", 4): "Int32Array", ("f", 8): "Float64Array"}
+
+
+def encode_columns(store, columns) -> Dict:
+    """
+    Encodes columns of a table for the clientside filter: categorical columns
+    as their integer codes plus labels, numeric columns as int32 or float64,
+    each as base64 of the little-endian buffer of a JavaScript typed array.
+
+    :param store: ColumnStore
+    :param columns: names of the columns to include
+    :returns: JSON serializable table
+    """
+    encoded = {}
+    for name in columns:
+        values = np.asarray(store[name])
+        if store.is_categorical(name):
+            values = values.astype(values.dtype.newbyteorder("<"))
+        elif np.issubdtype(values.dtype, np.integer) and np.abs(values).max(initial=0) < 2**31:
+            values = values.astype("<i4")
+        else:
+            values = values.astype("<f8")
+        encoded[name] = {
+            "type": _JS_ARRAY_TYPES[values.dtype.kind, values.dtype.itemsize],
+            "data": base64.b64encode(values.tobytes()).decode("ascii"),
+        }
+        if store.is_categorical(name):
+            encoded[name]["categories"] = store.categories(name)
+    return {"rows": store.rows, "columns": encoded}
@@ -0,0 +1,182 @@
+import hashlib
+import json
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from windfarms import bitset
+from windfarms.indexes import BitmapIndex, SortedIndex
+from windfarms.store import ColumnStore
+
+# Filter dimensions of the app, in the order of the filter menus
+CATEGORICAL_FILTERS = ["Country", "Continent", "Land Cover", "Landform", "Shape"]
+RANGE_FILTERS = ["Number of turbines", "Turbine Spacing", "Elevation"]
+
+
+class FilterEngine:
+    """
+    Evaluates the filter menus of the app against the columns of one table.
+
+    A row passes if its value is among the selected values of every
+    categorical dimension and within the closed [low, high] interval of every
+    range dimension, the same predicates as the former clientside filter.
+    Categorical dimensions are answered from prebuilt bitmap indexes: an OR
+    within a dimension and an AND across dimensions on packed bitsets. Range
+    dimensions are answered from sort permutations, two binary searches per
+    slider.
+    """
+
+    def __init__(self, store: ColumnStore, exclude_wfids: Iterable[int] = (), name: str = ""):
+        """
+        :param store: table to filter
+        :param exclude_wfids: WFids that never pass, e.g. -1 for the wind farm table
+        :param name: name of the table, prefixes the keys of the filter states
+        """
+        self.store = store
+        self.name = name
+        self.rows = store.rows
+
+        exclude_wfids = list(exclude_wfids)
+        if exclude_wfids:
+            self._base = bitset.from_mask(~np.isin(store["WFid"], exclude_wfids))
+        else:
+            self._base = bitset.full(self.rows)
+
+        self.bitmaps = {
+            name: BitmapIndex(store[name], len(store.categories(name)))
+            for name in CATEGORICAL_FILTERS
+            if name in store
+        }
+        self.sorted_indexes = {
+            name: SortedIndex(store[name]) for name in RANGE_FILTERS if name in store
+        }
+
+    def category_codes(self, name: str, selected: Sequence[str]) -> Sequence[int]:
+        """
+        :returns: sorted codes of the selected labels that occur in the column
+        """
+        lookup = {c: i for i, c in enumerate(self.store.categories(name))}
+        return sorted({lookup[s] for s in selected or [] if s in lookup})
+
+    def category_bits(self, name: str, selected: Sequence[str]) -> Optional[np.ndarray]:
+        """
+        :param name: categorical column
+        :param selected: selected category labels
+        :returns: bitset of rows whose value is selected, None if all rows pass
+        """
+        return self.bitmaps[name].select(self.category_codes(name, selected))
+
+    def range_bits(self, name: str, low: float, high: float) -> Optional[np.ndarray]:
+        """
+        :param name: numeric column
+        :returns: bitset of rows with low <= value <= high, None if all rows pass
+        """
+        return self.sorted_indexes[name].select(low, high)
+
+    def state(
+        self,
+        selections: Dict[str, Sequence[str]],
+        ranges: Optional[Dict[str, Sequence[float]]] = None,
+    ) -> Dict[str, List[int]]:
+        """
+        Normalized filter state.
+
+        Selections are reduced to the category codes present in the table and
+        ranges to their [start, stop) bounds in the sorted order of the column,
+        dimensions that let every row pass are left out. States selecting the
+        same rows by the same predicates, e.g. a slider moved within a gap
+        between two values, therefore normalize to the same state.
+
+        :returns: sorted codes per categorical column and [start, stop] per numeric column
+        """
+        state = {}
+        for name, selected in selections.items():
+            codes = self.category_codes(name, selected)
+            index = self.bitmaps[name]
+            if len(codes) < index.n_categories or not index.complete:
+                state[name] = codes
+        for name, (low, high) in (ranges or {}).items():
+            start, stop = self.sorted_indexes[name].bounds(low, high)
+            if stop - start < self.rows:
+                state[name] = [start, stop]
+        return state
+
+    def state_key(self, state: Dict[str, List[int]]) -> str:
+        """
+        :param state: normalized filter state, see ``state``
+        :returns: key of the filter state, prefixed with the table name
+        """
+        digest = hashlib.sha1(json.dumps(state, sort_keys=True).encode("utf-8")).hexdigest()
+        return f"{self.name}:{digest[:20]}"
+
+    def key(
+        self,
+        selections: Dict[str, Sequence[str]],
+        ranges: Optional[Dict[str, Sequence[float]]] = None,
+    ) -> str:
+        """
+        Canonical cache key of a filter state, equal for states with the same
+        normalized state.
+
+        :returns: key of the filter state, prefixed with the table name
+        """
+        return self.state_key(self.state(selections, ranges))
+
+    def state_bits(self, state: Dict[str, List[int]]) -> np.ndarray:
+        """
+        Evaluates a normalized filter state, e.g. one passed along in a URL.
+
+        :param state: normalized filter state, see ``state``
+        :returns: bitset of the matching rows
+        :raises ValueError: if the state does not belong to this table
+        """
+        result = self._base.copy()
+        for name, value in state.items():
+            if not isinstance(value, list):
+                raise ValueError(f"Invalid filter dimension {name}: {value}")
+            if name in self.bitmaps:
+                codes = [int(code) for code in value]
+                if any(code < 0 or code >= self.bitmaps[name].n_categories for code in codes):
+                    raise ValueError(f"Invalid category codes for {name}: {value}")
+                selected_bits = self.bitmaps[name].select(codes)
+            elif name in self.sorted_indexes and len(value) == 2:
+                start, stop = int(value[0]), int(value[1])
+                if not 0 <= start <= stop <= self.rows:
+                    raise ValueError(f"Invalid bounds for {name}: {value}")
+                selected_bits = bitset.from_indices(self.sorted_indexes[name].order[start:stop], self.rows)
+            else:
+                raise ValueError(f"Invalid filter dimension {name}: {value}")
+            if selected_bits is not None:
+                result &= selected_bits
+        return result
+
+    def bits(
+        self,
+        selections: Dict[str, Sequence[str]],
+        ranges: Optional[Dict[str, Sequence[float]]] = None,
+    ) -> np.ndarray:
+        """
+        :param selections: selected labels per categorical column
+        :param ranges: [low, high] per numeric column
+        :returns: bitset of the matching rows
+        """
+        result = self._base.copy()
+        for name, selected in selections.items():
+            selected_bits = self.category_bits(name, selected)
+            if selected_bits is not None:
+                result &= selected_bits
+        for name, (low, high) in (ranges or {}).items():
+            selected_bits = self.range_bits(name, low, high)
+            if selected_bits is not None:
+                result &= selected_bits
+        return result
+
+    def mask(
+        self,
+        selections: Dict[str, Sequence[str]],
+        ranges: Optional[Dict[str, Sequence[float]]] = None,
+    ) -> np.ndarray:
+        """
+        :returns: boolean mask over the rows of the table, see ``bits``
+        """
+        return bitset.to_mask(self.bits(selections, ranges), self.rows)
@@ -0,0 +1,104 @@
+"""
+Exact value histograms of a numeric column over the cells of an aggregation
+cube, merged into the summary statistics of filter results.
+
+Every cell of a cube holds one value of the column, so the summary of a set
+of cells is its moments (count, sum, sum of squares, min, max) plus the
+number of rows of each distinct value. Summaries merge by adding their
+moments and counts, so the statistics of a filter result, per category or
+overall, are summed over its cells without sorting its rows.
+
+Accuracy: all statistics of ``describe`` are exact (up to floating point
+rounding of the mean and std), the 25%, 50% and 75% interpolate between the
+values at the two ranks around q * (n - 1) like pandas.
+
+Size: this is not a bounded-size quantile sketch (t-digest, KLL). Besides
+five arrays with one entry per cell, ``describe`` builds a histogram of
+groups x distinct values, which grows with the number of distinct values of
+the column. The reduction therefore comes only from the cube: for columns
+with few distinct values many rows share a cell, while the wind farm table
+has almost one cell per row (20,608 rows, 20,591 cells), so there a
+histogram costs about as much as the rows themselves.
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Statistics of pandas' describe, in its order
+DESCRIBE = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+
+class ValueHistogram:
+    """
+    Histograms of one numeric column, one per cube cell: every cell holds
+    ``count`` rows of one value.
+    """
+
+    def __init__(self, values: np.ndarray, counts: np.ndarray):
+        """
+        :param values: value of each cell, NaN for missing values
+        :param counts: number of rows of each cell
+        """
+        values = np.asarray(values, dtype=np.float64)
+        self.valid = ~np.isnan(values)
+        self.values = np.where(self.valid, values, 0.0)
+        self.counts = np.where(self.valid, counts, 0).astype(np.int64)
+        self.sums = self.values * self.counts
+        self.squares = self.values**2 * self.counts
+
+        # Dense ids of the distinct values in ascending order, -1 for missing values
+        self.ranks = np.full(len(values), -1, dtype=np.int64)
+        self.distinct, self.ranks[self.valid] = np.unique(self.values[self.valid], return_inverse=True)
+        # Cells in ascending order of their values, for the extremes
+        self.order = np.argsort(self.values, kind="stable")
+
+    def describe(self, cells: np.ndarray, groups: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        Merges the histograms of the given cells, optionally per group.
+
+        :param cells: positions of distinct cells
+        :param groups: non-negative group code of each given cell, one group by default
+        :returns: DataFrame with the DESCRIBE statistics as columns, one row per group
+            with values, indexed by group code in ascending order
+        """
+        cells = np.asarray(cells, dtype=np.int64)
+        groups = np.zeros(len(cells), dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+        keep = self.valid[cells]
+        cells, groups = cells[keep], groups[keep]
+        labels, groups = np.unique(groups, return_inverse=True)
+        n_groups, n_distinct = len(labels), len(self.distinct)
+
+        counts = self.counts[cells]
+        n = np.bincount(groups, weights=counts, minlength=n_groups)
+        total = np.bincount(groups, weights=self.sums[cells], minlength=n_groups)
+        squares = np.bincount(groups, weights=self.squares[cells], minlength=n_groups)
+        # Groups of the given cells in ascending order of their values: the last assignment to
+        # a group is its largest value, assigned in reverse its smallest
+        cell_groups = np.full(len(self.values), -1, dtype=np.int64)
+        cell_groups[cells] = groups
+        ordered = self.order[cell_groups[self.order] >= 0]
+        minimum, maximum = np.empty(n_groups), np.empty(n_groups)
+        maximum[cell_groups[ordered]] = self.values[ordered]
+        minimum[cell_groups[ordered[::-1]]] = self.values[ordered[::-1]]
+        mean = total / n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            std = np.where(n > 1, np.sqrt(np.maximum(squares - total * mean, 0) / (n - 1)), np.nan)
+
+        # Rows of each distinct value per group
+        histogram = np.bincount(
+            groups * n_distinct + self.ranks[cells], weights=counts, minlength=n_groups * n_distinct
+        ).reshape(n_groups, n_distinct)
+        cumulative = np.cumsum(histogram, axis=1)
+
+        def value_at(rank):
+            return self.distinct[np.argmax(cumulative > rank[:, None], axis=1)]
+
+        stats = {"count": n, "mean": mean, "std": std, "min": minimum}
+        for q in (0.25, 0.5, 0.75):
+            position = (n - 1) * q
+            low, high = np.floor(position), np.ceil(position)
+            low_value, high_value = value_at(low), value_at(high)
+            stats[f"{q:.0%}"] = low_value + (high_value - low_value) * (position - low)
+        stats["max"] = maximum
+        return pd.DataFrame(stats, index=labels, columns=DESCRIBE)
@@ -0,0 +1,198 @@
+from typing import Optional, Sequence
+
+import numpy as np
+
+from windfarms import bitset
+
+
+class BitmapIndex:
+    """
+    One bitset per distinct value of a dictionary-encoded column.
+
+    Selecting a set of values ORs their bitsets. When more than half of the
+    values are selected the complement is computed from the unselected ones
+    instead, so a query never touches more than half of the bitsets no matter
+    how many values are ticked.
+    """
+
+    def __init__(self, codes: np.ndarray, n_categories: int):
+        """
+        :param codes: integer codes per row, -1 for missing values
+        :param n_categories: number of distinct codes
+        """
+        self.rows = len(codes)
+        self.n_categories = n_categories
+        self.bits = np.zeros((n_categories, bitset.n_words(self.rows)), dtype=np.uint64)
+        for code in range(n_categories):
+            self.bits[code] = bitset.from_mask(codes == code)
+        # Rows with a value, i.e. without the missing value code
+        self.present = bitset.from_mask(codes >= 0)
+        self.complete = bitset.count(self.present) == self.rows
+
+    def select(self, codes: Sequence[int]) -> Optional[np.ndarray]:
+        """
+        :param codes: selected codes
+        :returns: bitset of the rows holding one of the codes, None if every row does
+        """
+        selected = np.zeros(self.n_categories, dtype=bool)
+        selected[list(codes)] = True
+        n_selected = int(selected.sum())
+
+        if n_selected == self.n_categories:
+            return None if self.complete else self.present.copy()
+        if n_selected == 0:
+            return bitset.empty(self.rows)
+        if 2 * n_selected <= self.n_categories:
+            return np.bitwise_or.reduce(self.bits[selected], axis=0)
+        return self.present & ~np.bitwise_or.reduce(self.bits[~selected], axis=0)
+
+
+class SortedIndex:
+    """
+    Sort permutation of a numeric column.
+
+    A closed range [low, high] becomes two binary searches into the sorted
+    values and a contiguous slice of the permutation, i.e. the ids of the
+    matching rows, without comparing every row. The last result is kept and
+    a moved slider only flips the rows between the old and the new bounds.
+    """
+
+    def __init__(self, values: np.ndarray):
+        """
+        :param values: numeric value per row
+        """
+        self.rows = len(values)
+        order_dtype = np.int32 if self.rows < 2**31 else np.int64
+        self.order = np.argsort(values, kind="stable").astype(order_dtype)
+        self.sorted = np.asarray(values)[self.order]
+        self._last = None
+
+    def bounds(self, low: float, high: float):
+        """
+        :returns: start and stop positions in the sorted order of the rows with low <= value <= high
+        """
+        start = int(np.searchsorted(self.sorted, low, side="left"))
+        stop = int(np.searchsorted(self.sorted, high, side="right"))
+        return start, max(start, stop)
+
+    def row_ids(self, low: float, high: float) -> np.ndarray:
+        """
+        :returns: row positions with low <= value <= high, in value order
+        """
+        start, stop = self.bounds(low, high)
+        return self.order[start:stop]
+
+    def select(self, low: float, high: float) -> Optional[np.ndarray]:
+        """
+        :returns: bitset of the rows with low <= value <= high, None if every row does
+        """
+        start, stop = self.bounds(low, high)
+        if stop - start == self.rows:
+            return None
+
+        last = self._last
+        if last is not None and (start, stop) == last[:2]:
+            return last[2]
+        if (
+            last is not None
+            and start < last[1] and last[0] < stop
+            and 8 * (abs(start - last[0]) + abs(stop - last[1])) < self.rows
+        ):
+            # Overlapping small move: flip the rows entering or leaving on either side
+            changed = np.concatenate([
+                self.order[min(start, last[0]):max(start, last[0])],
+                self.order[min(stop, last[1]):max(stop, last[1])],
+            ])
+            bits = bitset.toggled(last[2], changed)
+        elif 2 * (stop - start) <= self.rows:
+            bits = bitset.from_indices(self.order[start:stop], self.rows)
+        else:
+            # Mostly selected: scatter the few rows outside the range instead
+            outside = np.concatenate([self.order[:start], self.order[stop:]])
+            bits = bitset.full(self.rows) & ~bitset.from_indices(outside, self.rows)
+
+        self._last = (start, stop, bits)
+        return bits
+
+
+class OffsetIndex:
+    """
+    Row offsets of every key of a column the table is sorted by.
+
+    The rows of a key form one contiguous block, so looking them up is a
+    slice instead of a comparison against every row. Keys are looked up in a
+    dense table spanning the smallest to the largest key, which suits ids
+    such as WFid.
+    """
+
+    def __init__(self, values: np.ndarray):
+        """
+        :param values: integer keys per row, in ascending order
+        """
+        values = np.asarray(values)
+        if np.any(values[1:] < values[:-1]):
+            raise ValueError("Rows must be sorted by the indexed column")
+        self.rows = len(values)
+        keys, starts = np.unique(values, return_index=True)
+        stops = np.r_[starts[1:], self.rows]
+        self.min_key = int(keys[0]) if len(keys) else 0
+        span = int(keys[-1]) - self.min_key + 1 if len(keys) else 0
+        self.starts = np.zeros(span, dtype=np.int64)
+        self.stops = np.zeros(span, dtype=np.int64)
+        self.starts[keys - self.min_key] = starts
+        self.stops[keys - self.min_key] = stops
+
+    def slice(self, key: int) -> slice:
+        """
+        :returns: positions of the rows with the key, an empty slice for unknown keys
+        """
+        position = int(key) - self.min_key
+        if not 0 <= position < len(self.starts):
+            return slice(0, 0)
+        return slice(int(self.starts[position]), int(self.stops[position]))
+
+
+class GridIndex:
+    """
+    Uniform grid of points bucketed by longitude/latitude cell.
+
+    The point positions are sorted by cell, with the offsets of every cell in
+    a dense table, so a box query gathers the points of the few cells it
+    overlaps and only compares those against the box.
+    """
+
+    def __init__(self, lon: np.ndarray, lat: np.ndarray, cell_size: float = 1.0):
+        """
+        :param lon: longitude per point
+        :param lat: latitude per point
+        :param cell_size: cell width and height in degrees
+        """
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.cell_size = cell_size
+        self.n_cols = int(np.ceil(360 / cell_size))
+        self.n_rows = int(np.ceil(180 / cell_size))
+
+        cells = self._col(self.lon) * self.n_rows + self._row(self.lat)
+        self.order = np.argsort(cells, kind="stable").astype(np.int32)
+        bounds = np.searchsorted(cells[self.order], np.arange(self.n_cols * self.n_rows + 1))
+        self.starts = bounds[:-1].reshape(self.n_cols, self.n_rows)
+        self.stops = bounds[1:].reshape(self.n_cols, self.n_rows)
+
+    def _col(self, lon):
+        return np.clip(((np.asarray(lon) + 180) // self.cell_size).astype(np.int64), 0, self.n_cols - 1)
+
+    def _row(self, lat):
+        return np.clip(((np.asarray(lat) + 90) // self.cell_size).astype(np.int64), 0, self.n_rows - 1)
+
+    def query(self, west: float, south: float, east: float, north: float) -> np.ndarray:
+        """
+        :returns: ascending positions of the points within the closed box
+        """
+        cols = slice(int(self._col(west)), int(self._col(east)) + 1)
+        rows = slice(int(self._row(south)), int(self._row(north)) + 1)
+        starts, stops = self.starts[cols, rows].ravel(), self.stops[cols, rows].ravel()
+        candidates = np.concatenate([self.order[start:stop] for start, stop in zip(starts.tolist(), stops.tolist())] or [self.order[:0]])
+        lon, lat = self.lon[candidates], self.lat[candidates]
+        inside = (lon >= west) & (lon <= east) & (lat >= south) & (lat <= north)
+        return np.sort(candidates[inside])
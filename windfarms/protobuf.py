@@ -0,0 +1,136 @@
+"""
+Minimal Protocol Buffers wire format writer and reader for the vector tile
+and geobuf encoders.
+
+Messages are written directly as bytes rather than through generated
+classes. Repeated messages of the same layout are encoded column-wise: all
+their fields are laid out as one token matrix of varints, which ``varints``
+encodes in a single vectorized pass.
+"""
+from typing import Iterator, Tuple, Union
+
+import numpy as np
+
+VARINT = 0
+LENGTH_DELIMITED = 2
+
+
+def tag(field: int, wire_type: int) -> int:
+    """
+    :returns: field key as written in front of a field value
+    """
+    return (field << 3) | wire_type
+
+
+def zigzag(values):
+    """
+    :param values: signed integers
+    :returns: unsigned integers, small magnitudes mapped to small values
+    """
+    values = np.asarray(values, dtype=np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def varint_lengths(values: np.ndarray) -> np.ndarray:
+    """
+    :param values: unsigned integers
+    :returns: number of bytes of each value encoded as varint
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(values.shape, dtype=np.int64)
+    for shift in range(7, 64, 7):
+        longer = values >= np.uint64(1 << shift)
+        if not longer.any():
+            break
+        lengths += longer
+    return lengths
+
+
+def varints(values: np.ndarray) -> bytes:
+    """
+    :param values: unsigned integers, encoded in C order if multidimensional
+    :returns: concatenated varint encoding of the values
+    """
+    values = np.asarray(values, dtype=np.uint64).ravel()
+    lengths = varint_lengths(values)
+    positions = np.cumsum(lengths) - lengths
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    # Every byte round only touches the values that are still longer
+    while len(values):
+        more = lengths > 1
+        out[positions] = (values & np.uint64(0x7F)) | (more.astype(np.uint64) << np.uint64(7))
+        values, lengths, positions = values[more] >> np.uint64(7), lengths[more] - 1, positions[more] + 1
+    return out.tobytes()
+
+
+def varint(value: int) -> bytes:
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def field_varint(field: int, value: int) -> bytes:
+    return varint(tag(field, VARINT)) + varint(value)
+
+
+def field_bytes(field: int, data: Union[bytes, str]) -> bytes:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return varint(tag(field, LENGTH_DELIMITED)) + varint(len(data)) + data
+
+
+def field_packed(field: int, values: np.ndarray) -> bytes:
+    """
+    :returns: packed repeated varint field
+    """
+    return field_bytes(field, varints(values))
+
+
+def read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def read_fields(data: bytes) -> Iterator[Tuple[int, Union[int, bytes]]]:
+    """
+    Iterates over the fields of a message with varint and length-delimited fields.
+
+    :param data: encoded message
+    :returns: iterator of (field number, int or bytes value)
+    """
+    pos = 0
+    while pos < len(data):
+        key, pos = read_varint(data, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == VARINT:
+            value, pos = read_varint(data, pos)
+        elif wire_type == LENGTH_DELIMITED:
+            length, pos = read_varint(data, pos)
+            value, pos = bytes(data[pos : pos + length]), pos + length
+        else:
+            raise ValueError(f"Unsupported wire type {wire_type}")
+        yield field, value
+
+
+def read_packed(data: bytes) -> list:
+    """
+    :returns: values of a packed repeated varint field
+    """
+    values, pos = [], 0
+    while pos < len(data):
+        value, pos = read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def unzigzag(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
@@ -0,0 +1,265 @@
+import json
+import os
+import re
+import shutil
+import sys
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Bump whenever the on-disk layout changes so that stale stores are rebuilt
+STORE_VERSION = 2
+
+# Text columns that are stored as dictionary-encoded integer codes
+CATEGORICAL_COLUMNS = ["Country", "Continent", "Land Cover", "Landform", "Shape"]
+
+# Boolean column added to tables with a WFid column: whether a row belongs to a wind farm (WFid other than -1)
+IN_FARM = "In wind farm"
+
+META_FILE = "meta.json"
+
+
+class ColumnStore:
+    """
+    Read-only columnar view of one table on disk.
+
+    Every column lives in its own ``.npy`` file and is memory-mapped on load,
+    so worker processes share the pages through the OS cache instead of each
+    holding a private parsed copy. Categorical columns are kept as integer
+    codes together with their category labels, numeric columns in the
+    smallest dtype that holds their values exactly.
+    """
+
+    def __init__(self, path: str, meta: Dict, columns: Dict[str, np.ndarray]):
+        self.path = path
+        self.meta = meta
+        self._columns = columns
+        self._categories = {
+            c["name"]: c["categories"]
+            for c in meta["columns"]
+            if c.get("categories") is not None
+        }
+
+    @property
+    def rows(self) -> int:
+        return self.meta["rows"]
+
+    @property
+    def names(self) -> List[str]:
+        return [c["name"] for c in self.meta["columns"]]
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._columns
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """
+        :param name: column name
+        :returns: raw column array, integer codes for categorical columns
+        """
+        return self._columns[name]
+
+    def is_categorical(self, name: str) -> bool:
+        return name in self._categories
+
+    def categories(self, name: str) -> List[str]:
+        return self._categories[name]
+
+    def to_frame(self, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Builds a pandas DataFrame on top of the stored columns.
+
+        :param columns: subset of columns to include, all by default
+        :returns: DataFrame with category dtype for the categorical columns
+        """
+        names = self.names if columns is None else list(columns)
+        data = {}
+        for name in names:
+            if self.is_categorical(name):
+                data[name] = pd.Categorical.from_codes(
+                    self._columns[name], categories=self._categories[name]
+                )
+            else:
+                data[name] = self._columns[name]
+        return pd.DataFrame(data, columns=names, copy=False)
+
+
+def _column_file(name: str) -> str:
+    return re.sub(r"[^0-9a-z]+", "_", name.lower()).strip("_") + ".npy"
+
+
+def _code_dtype(n_categories: int) -> np.dtype:
+    return np.dtype(np.int8) if n_categories < 128 else np.dtype(np.int16)
+
+
+def _downcast(values: np.ndarray) -> np.ndarray:
+    """
+    :returns: integers in the smallest signed integer dtype holding their range,
+        floats as float32 if that keeps every value, other values unchanged
+    """
+    if values.dtype.kind in "iu" and len(values):
+        low, high = values.min(), values.max()
+        for dtype in (np.int8, np.int16, np.int32):
+            if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                return values.astype(dtype)
+        return values.astype(np.int64)
+    if values.dtype == np.float64:
+        single = values.astype(np.float32)
+        if np.array_equal(single, values, equal_nan=True):
+            return single
+    return values
+
+
+def _source_info(csv_path: str) -> Dict:
+    stat = os.stat(csv_path)
+    return {"path": os.path.basename(csv_path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def default_store_path(csv_path: str) -> str:
+    """
+    :param csv_path: path of the source CSV file
+    :returns: directory of the binary store that belongs to the CSV file
+    """
+    directory, filename = os.path.split(csv_path)
+    return os.path.join(directory, "store", os.path.splitext(filename)[0])
+
+
+def ingest_csv(
+    csv_path: str,
+    store_path: Optional[str] = None,
+    categorical: Iterable[str] = CATEGORICAL_COLUMNS,
+    sort_by: Optional[str] = None,
+) -> str:
+    """
+    Converts a CSV table into a directory of per-column ``.npy`` files.
+
+    The store is written to a temporary directory first and moved in place
+    afterwards, so concurrent readers never see a half written store.
+
+    :param csv_path: path of the source CSV file
+    :param store_path: target directory, next to the CSV file by default
+    :param categorical: columns to dictionary-encode
+    :param sort_by: column to (stably) sort the rows by, e.g. to slice them by key
+    :returns: path of the written store, with the numeric columns downcast and
+        the IN_FARM flag added after the columns of a table with WFids
+    """
+    if store_path is None:
+        store_path = default_store_path(csv_path)
+
+    frame = pd.read_csv(csv_path)
+    if sort_by is not None:
+        frame = frame.sort_values(sort_by, kind="stable", ignore_index=True)
+    categorical = [c for c in categorical if c in frame.columns]
+    if "WFid" in frame.columns:
+        frame[IN_FARM] = frame["WFid"] != -1
+
+    tmp_path = f"{store_path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    columns = []
+    for name in frame.columns:
+        entry = {"name": name, "file": _column_file(name)}
+        if name in categorical:
+            categories = sorted(frame[name].dropna().unique().tolist())
+            codes = pd.Categorical(frame[name], categories=categories).codes
+            values = codes.astype(_code_dtype(len(categories)))
+            entry["categories"] = categories
+        else:
+            values = _downcast(frame[name].to_numpy())
+        entry["dtype"] = values.dtype.str
+        np.save(os.path.join(tmp_path, entry["file"]), np.ascontiguousarray(values))
+        columns.append(entry)
+
+    meta = {
+        "version": STORE_VERSION,
+        "rows": len(frame),
+        "columns": columns,
+        "sort_by": sort_by,
+        "source": _source_info(csv_path),
+    }
+    with open(os.path.join(tmp_path, META_FILE), "w") as f:
+        json.dump(meta, f, indent=1)
+
+    # Swap the finished store in place of an older one
+    if os.path.isdir(store_path):
+        old_path = f"{store_path}.old-{os.getpid()}"
+        os.replace(store_path, old_path)
+        os.replace(tmp_path, store_path)
+        shutil.rmtree(old_path, ignore_errors=True)
+    else:
+        os.makedirs(os.path.dirname(store_path) or ".", exist_ok=True)
+        os.replace(tmp_path, store_path)
+
+    return store_path
+
+
+def read_meta(store_path: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(store_path, META_FILE), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_stale(store_path: str, csv_path: str, sort_by: Optional[str] = None) -> bool:
+    """
+    :returns: True if the store is missing, outdated, sorted differently or older than its CSV
+    """
+    meta = read_meta(store_path)
+    if meta is None or meta.get("version") != STORE_VERSION or meta.get("sort_by") != sort_by:
+        return True
+    if not os.path.exists(csv_path):
+        return False
+    source = _source_info(csv_path)
+    return meta["source"]["size"] != source["size"] or meta["source"]["mtime"] != source["mtime"]
+
+
+def load_store(store_path: str, mmap: bool = True) -> ColumnStore:
+    """
+    Opens a store written by ``ingest_csv``.
+
+    :param store_path: directory of the store
+    :param mmap: memory-map the column files instead of reading them
+    :returns: ColumnStore
+    """
+    meta = read_meta(store_path)
+    if meta is None:
+        raise FileNotFoundError(f"No column store found at {store_path}")
+
+    mode = "r" if mmap else None
+    columns = {
+        c["name"]: np.load(os.path.join(store_path, c["file"]), mmap_mode=mode)
+        for c in meta["columns"]
+    }
+    return ColumnStore(store_path, meta, columns)
+
+
+def load_table(csv_path: str, store_path: Optional[str] = None, sort_by: Optional[str] = None) -> ColumnStore:
+    """
+    Loads a table from its binary store, (re)building the store from the CSV
+    file first if it is missing or out of date.
+
+    :param csv_path: path of the source CSV file
+    :param store_path: directory of the store, next to the CSV file by default
+    :param sort_by: column the rows are sorted by, see ``ingest_csv``
+    :returns: ColumnStore
+    """
+    if store_path is None:
+        store_path = default_store_path(csv_path)
+    if is_stale(store_path, csv_path, sort_by):
+        ingest_csv(csv_path, store_path, sort_by=sort_by)
+    return load_store(store_path)
+
+
+if __name__ == "__main__":
+    # Usage: python -m windfarms.store [csv ...]
+    paths = sys.argv[1:] or ["data/wf_data_final.csv", "data/wt_data_final.csv"]
+    for path in paths:
+        if os.path.exists(path):
+            print(f"{path} -> {ingest_csv(path, sort_by='WFid')}")
+        else:
+            print(f"{path} not found, skipped")
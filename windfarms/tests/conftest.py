@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from windfarms.store import load_table
+
+COUNTRIES = ["Austria", "China", "Germany", "United Kingdom", "United States"]
+CONTINENTS = ["Asia", "Europe", "North America"]
+LAND_COVERS = ["Agriculture", "Forest", "Grassland", "Oceans and seas"]
+LANDFORMS = ["Flat", "Hills", "Summit or ridge"]
+SHAPES = ["Irregular lines", "Lines", "Polygon", "Single turbine"]
+
+
+def random_table(n_rows=2000, seed=0):
+    """
+    Small turbine-like table with the columns and value ranges of the app data.
+    """
+    rng = np.random.default_rng(seed)
+    wfid = rng.integers(-1, n_rows // 20, n_rows)
+    return pd.DataFrame(
+        {
+            "id": np.arange(n_rows),
+            "WFid": wfid,
+            "lon": rng.uniform(-20, 40, n_rows),
+            "lat": rng.uniform(30, 60, n_rows),
+            "Turbine Spacing": rng.integers(10, 13155, n_rows),
+            "Elevation": rng.integers(-46, 4684, n_rows),
+            "Country": rng.choice(COUNTRIES, n_rows),
+            "Continent": rng.choice(CONTINENTS, n_rows),
+            "Land Cover": rng.choice(LAND_COVERS, n_rows),
+            "Landform": rng.choice(LANDFORMS, n_rows),
+            "Number of turbines": rng.integers(1, 3296, n_rows),
+            "Shape": rng.choice(SHAPES, n_rows),
+        }
+    )
+
+
+@pytest.fixture
+def table():
+    return random_table()
+
+
+@pytest.fixture
+def store(tmp_path, table):
+    path = str(tmp_path / "wt_data.csv")
+    table.to_csv(path, index=False)
+    return load_table(path)
+
+
+@pytest.fixture
+def farm_table(table):
+    """
+    Table whose wind farms are a few kilometres across, like in the app data.
+    """
+    rng = np.random.default_rng(1)
+    n_farms = table["WFid"].max() + 1
+    in_farm = table["WFid"] != -1
+    wfid = table.loc[in_farm, "WFid"]
+    table.loc[in_farm, "lon"] = rng.uniform(-1, 1, n_farms)[wfid] + rng.normal(0, 0.01, in_farm.sum())
+    table.loc[in_farm, "lat"] = rng.uniform(45, 47, n_farms)[wfid] + rng.normal(0, 0.01, in_farm.sum())
+    return table
+
+
+@pytest.fixture
+def farm_store(tmp_path, farm_table):
+    path = str(tmp_path / "wt_farms.csv")
+    farm_table.to_csv(path, index=False)
+    return load_table(path, sort_by="WFid")
+
+
+@pytest.fixture
+def coarse_table():
+    """
+    Table with few distinct values per column, so that rows share cells.
+    """
+    table = random_table(5000, seed=3)
+    for name, step in [("Turbine Spacing", 2000), ("Elevation", 1000), ("Number of turbines", 500)]:
+        table[name] = table[name] // step * step
+    table.loc[::7, "Shape"] = np.nan
+    return table
+
+
+@pytest.fixture
+def coarse_store(tmp_path, coarse_table):
+    path = str(tmp_path / "coarse.csv")
+    coarse_table.to_csv(path, index=False)
+    return load_table(path)
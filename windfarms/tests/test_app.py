@@ -0,0 +1,217 @@
+import gzip
+import importlib
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+import dash
+import numpy as np
+import pytest
+
+from helpfile import plot_wf_histograms
+from windfarms.encoding import encode_mask
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="module")
+def app():
+    """
+    The Dash app module on the data of the repository, skipped without the data.
+    """
+    if not all(os.path.exists(os.path.join(ROOT, "data", name)) for name in ["wf_data_final.csv", "wt_data_final.csv"]):
+        pytest.skip("app data not available")
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        yield importlib.import_module("app")
+    finally:
+        os.chdir(cwd)
+
+
+def apply_filter(app, countries):
+    """
+    :returns: turbine and wind farm payloads of the default filter state restricted to some countries
+    """
+    wt, wf, _, _ = app.apply_filter(
+        1, app.landcover_defaults, countries, app.continent_defaults, app.turbines_defaults,
+        app.landform_defaults, app.distance_defaults, app.elevation_defaults, app.shape_defaults,
+    )
+    return wt, wf
+
+
+def filter_results(app, countries):
+    """
+    :returns: turbine and wind farm filter results of the default filter state restricted to some countries
+    """
+    return app.filter_results(
+        app.landcover_defaults, countries, app.continent_defaults, app.turbines_defaults,
+        app.landform_defaults, app.distance_defaults, app.elevation_defaults, app.shape_defaults,
+    )
+
+
+@pytest.fixture
+def plot_calls(app, monkeypatch):
+    """
+    y-axes of the plot_wf_histograms calls of the app
+    """
+    calls = []
+
+    def plot(*args, **kwargs):
+        calls.append(kwargs["y_axis"])
+        return plot_wf_histograms(*args, **kwargs)
+
+    monkeypatch.setattr(app, "plot_wf_histograms", plot)
+    return calls
+
+
+def tile_path(app, payload):
+    """
+    :returns: path of a tile holding turbines of Germany for the tile URL of a payload
+    """
+    url = urlsplit(app.update_tile_url(payload).format(z=5, x=16, y=10))
+    return f"{url.path}?{url.query}"
+
+
+class TestPayloads:
+    def test_forged_payload(self, app):
+        _, wf = apply_filter(app, app.country_defaults)
+        count = filter_results(app, app.country_defaults)[1].count
+        app.filter_cache.cache.clear()
+
+        # the key of the default filter with no wind farms
+        forged = dict(encode_mask(np.zeros(wf["rows"], dtype=bool)), key=wf["key"])
+        assert app.filtered_windfarms(forged).empty
+        assert filter_results(app, app.country_defaults)[1].count == count
+
+    def test_rows_mismatch(self, app):
+        wt, wf = apply_filter(app, ["Germany"])
+        with pytest.raises(dash.exceptions.PreventUpdate):
+            app.update_tab2("Country", wt, dict(wf, rows=wf["rows"] - 1))
+        with pytest.raises(dash.exceptions.PreventUpdate):
+            app.filtered_windfarms(wt)
+
+
+class TestSingleWindFarm:
+    def test_cluster_click(self, app):
+        cluster = {"geometry": {"coordinates": [10, 50]}, "properties": {"cluster": True, "point_count": 12, "WFid": 3, "expansion_zoom": 7}}
+        with pytest.raises(dash.exceptions.PreventUpdate):
+            app.update_tooltip(cluster)
+        assert app.zoom_to_cluster(cluster) == {"center": [50, 10], "zoom": 7}
+
+    def test_marker_click(self, app):
+        wfid = int(app.largest_wfids.iloc[0])
+        graph = app.update_tooltip({"geometry": {"coordinates": [10, 50]}, "properties": {"WFid": wfid}})
+        assert isinstance(graph, app.dcc.Graph)
+
+
+class TestTiles:
+    def test_filtered_tile_after_eviction(self, app):
+        client = app.server.test_client()
+        path = tile_path(app, apply_filter(app, ["Germany"])[0])
+        first = client.get(path)
+        assert first.status_code == 200
+
+        # other filters push the result out of the cache, or another worker serves the tile
+        for country in app.country_defaults[:40]:
+            apply_filter(app, [country])
+        app.filter_cache.cache.clear()
+
+        again = client.get(path)
+        assert again.status_code == 200
+        assert again.data == first.data
+
+    def test_version_in_url(self, app):
+        client = app.server.test_client()
+        url = app.update_tile_url(apply_filter(app, app.country_defaults)[0])
+        assert f"/{app.tilesets['wt'].version}/" in url
+
+        assert client.get(url.format(z=5, x=16, y=10)).status_code == 200
+        assert client.get(url.replace(app.tilesets["wt"].version, "0" * 16).format(z=5, x=16, y=10)).status_code == 404
+
+    def test_accept_encoding(self, app):
+        client = app.server.test_client()
+        path = tile_path(app, apply_filter(app, ["Germany"])[0])
+        gzipped = client.get(path, headers={"Accept-Encoding": "gzip, deflate"})
+        plain = client.get(path)
+        refused = client.get(path, headers={"Accept-Encoding": "gzip;q=0, identity"})
+
+        assert gzipped.headers["Content-Encoding"] == "gzip"
+        assert "Content-Encoding" not in plain.headers and "Content-Encoding" not in refused.headers
+        assert gzip.decompress(gzipped.data) == plain.data == refused.data
+        assert gzipped.headers["Vary"] == "Accept-Encoding"
+        assert gzipped.headers["ETag"] != plain.headers["ETag"]
+
+    @pytest.mark.parametrize("query", ["filter=not-json", "filter=%5B1%5D", "filter=%7B%22Country%22%3A%5B9999%5D%7D"])
+    def test_invalid_filter(self, app, query):
+        response = app.server.test_client().get(f"/tiles/wt/{app.tilesets['wt'].version}/5/16/10.pbf?{query}")
+        assert response.status_code == 400
+
+
+class TestFrequencyTab:
+    def test_memoized(self, app, plot_calls):
+        wt_result, wf_result = filter_results(app, ["Germany", "Denmark"])
+        first = app.frequency_outputs(wt_result, wf_result, "Elevation")
+        again = app.frequency_outputs(wt_result, wf_result, "Elevation")
+
+        assert plot_calls == ["Elevation"]
+        assert all(a is b for a, b in zip(first, again))
+
+    def test_misses(self, app, plot_calls):
+        wt_result, wf_result = filter_results(app, ["Germany", "France"])
+        app.frequency_outputs(wt_result, wf_result, "Elevation")
+        app.frequency_outputs(wt_result, wf_result, "Country")
+        other_wt, other_wf = filter_results(app, ["France"])
+        app.frequency_outputs(other_wt, other_wf, "Elevation")
+
+        assert plot_calls == ["Elevation", "Country", "Elevation"]
+
+    @pytest.mark.parametrize("y_axis", ["Country", "Turbine Spacing"])
+    def test_uncached(self, app, y_axis):
+        wt_result, wf_result = filter_results(app, ["Spain", "Portugal"])
+        wf_chart, wf_table, wt_chart = app.frequency_outputs(wt_result, wf_result, y_axis)
+        expected = plot_wf_histograms(
+            app.cube_windturbines.frame(app.cube_windturbines.cell_mask(wt_result.bits)),
+            app.cube_windfarms.frame(app.cube_windfarms.cell_mask(wf_result.bits)),
+            y_axis=y_axis, cells=True, wf_cube=app.cube_windfarms,
+        )
+
+        assert json.loads(wf_chart.to_json()) == json.loads(expected[0].to_json())
+        assert wf_table[0].to_plotly_json() == expected[1][0].to_plotly_json()
+        assert json.loads(wt_chart.to_json()) == json.loads(expected[2].to_json())
+
+    def test_warm(self, app, plot_calls):
+        app.filter_cache.cache.clear()
+        app.warm_frequency_tab()
+        assert sorted(plot_calls) == sorted(app.column_names)
+
+        wt_result, wf_result = filter_results(app, app.country_defaults)
+        for y_axis in app.column_names:
+            assert f"frequency:{y_axis}:wf_chart" in wf_result._derived
+            assert f"frequency:{y_axis}:{wf_result.key}:wt_chart" in wt_result._derived
+            app.frequency_outputs(wt_result, wf_result, y_axis)
+        assert len(plot_calls) == len(app.column_names)
+
+
+class TestWarmup:
+    def test_not_started_on_import(self, app):
+        assert not app.warmup_threads
+        assert not {"warm_figure_cache", "warm_frequency_tab"} & {thread.name for thread in threading.enumerate()}
+
+    def test_start_once(self, app, monkeypatch):
+        calls = []
+        monkeypatch.setattr(app, "warmup_threads", [])
+        monkeypatch.setattr(app.figure_cache, "warm", lambda wfids: calls.append(("figures", len(wfids))))
+        monkeypatch.setattr(app, "warm_frequency_tab", lambda: calls.append(("frequency", None)))
+
+        threads = app.start_warmup()
+        for thread in threads:
+            thread.join()
+        assert sorted(calls) == [("figures", len(app.largest_wfids)), ("frequency", None)]
+        assert app.start_warmup() == []
+
+    def test_switched_off(self, app, monkeypatch):
+        monkeypatch.setattr(app, "warmup_threads", [])
+        monkeypatch.setenv("WF_WARMUP", "0")
+        assert app.start_warmup() == []
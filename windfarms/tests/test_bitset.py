@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from windfarms import bitset
+
+
+class TestBitset:
+    @pytest.mark.parametrize("n_rows", [0, 1, 63, 64, 65, 1000])
+    def test_mask_roundtrip(self, n_rows):
+        mask = np.random.default_rng(n_rows).random(n_rows) < 0.3
+
+        bits = bitset.from_mask(mask)
+
+        assert bits.dtype == np.uint64
+        assert len(bits) == bitset.n_words(n_rows)
+        np.testing.assert_array_equal(bitset.to_mask(bits, n_rows), mask)
+        assert bitset.count(bits) == mask.sum()
+
+    def test_from_indices(self):
+        bits = bitset.from_indices(np.array([0, 3, 64, 99]), 100)
+
+        assert np.flatnonzero(bitset.to_mask(bits, 100)).tolist() == [0, 3, 64, 99]
+
+    def test_full_has_no_padding_bits(self):
+        bits = bitset.full(70)
+
+        assert bitset.count(bits) == 70
+        assert bitset.count(~bits & bitset.full(70)) == 0
+
+    def test_toggled(self):
+        mask = np.zeros(130, dtype=bool)
+        mask[[1, 64, 129]] = True
+        bits = bitset.from_mask(mask)
+
+        result = bitset.toggled(bits, np.array([129, 2, 1, 65]))
+
+        assert np.flatnonzero(bitset.to_mask(result, 130)).tolist() == [2, 64, 65]
+        assert bitset.count(bits) == 3
+
+    def test_is_set(self):
+        mask = np.random.default_rng(1).random(130) < 0.5
+        indices = np.array([0, 63, 64, 65, 129, 5, 5])
+
+        np.testing.assert_array_equal(bitset.is_set(bitset.from_mask(mask), indices), mask[indices])
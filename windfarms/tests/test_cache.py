@@ -0,0 +1,235 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+from flask import Flask
+from flask_caching import Cache
+
+from windfarms import bitset
+from windfarms.cache import FigureCache, FilterResult, FilterResultCache, LRUCache, estimate_nbytes
+from windfarms.encoding import encode_mask
+from windfarms.filtering import FilterEngine
+
+
+@pytest.fixture
+def filter_cache():
+    cache = Cache(Flask(__name__), config={"CACHE_TYPE": "windfarms.cache.LRUCache", "CACHE_THRESHOLD": 2})
+    return FilterResultCache(cache)
+
+
+class TestLRUCache:
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(threshold=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert len(cache) == 2
+
+    def test_keeps_objects(self):
+        cache = LRUCache()
+        value = np.arange(3)
+        cache.set("a", value)
+
+        assert cache.get("a") is value
+
+
+    def test_evicts_beyond_max_bytes(self):
+        cache = LRUCache(threshold=10, max_bytes=2000)
+        for key in "abc":
+            cache.set(key, np.zeros(100))
+
+        assert cache.get("a") is None
+        assert cache.get("b") is not None and cache.get("c") is not None
+        assert cache.nbytes() == 1600
+
+        # the entry set last is kept even if it is larger than the cache
+        cache.set("d", np.zeros(1000))
+        assert len(cache) == 1 and cache.get("d") is not None
+
+    def test_measures_growing_values(self):
+        cache = LRUCache(threshold=10, max_bytes=10000)
+        first = FilterResult("wt:a", bitset.full(100), 100)
+        cache.set("a", first)
+        cache.set("b", FilterResult("wt:b", bitset.full(100), 100))
+        first.derive("frame", lambda: np.zeros(2000))
+        cache.set("c", FilterResult("wt:c", bitset.full(100), 100))
+
+        assert cache.get("a") is None and cache.get("b") is not None
+
+
+class TestEstimateNbytes:
+    def test_buffers(self):
+        frame = pd.DataFrame({"a": np.zeros(1000), "b": np.zeros(1000, dtype=np.int8)})
+        assert estimate_nbytes(frame) == frame.memory_usage(index=True).sum()
+        assert estimate_nbytes(np.zeros(1000)) == 8000
+        # shared arrays are counted once
+        array = np.zeros(1000)
+        assert 8000 <= estimate_nbytes({"x": array, "y": [array]}) < 9000
+
+    def test_figures_and_objects(self):
+        figure = go.Figure(go.Bar(x=np.arange(10000), y=np.arange(10000)))
+        assert estimate_nbytes(figure) >= 2 * np.arange(10000).nbytes
+        result = FilterResult("wt:a", bitset.full(1000), 1000)
+        result.derive("figure", lambda: figure)
+        assert estimate_nbytes(result) == result.nbytes > estimate_nbytes(figure)
+
+
+class TestFilterResultCache:
+    def test_hits_and_misses(self, filter_cache):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return bitset.full(10)
+
+        first = filter_cache.get_or_compute("wt:x", compute, 10)
+        second = filter_cache.get_or_compute("wt:x", compute, 10)
+
+        assert first is second
+        assert len(calls) == 1
+        assert filter_cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+
+    def test_derived_values_are_computed_once(self, filter_cache):
+        result = filter_cache.get_or_compute("wt:x", lambda: bitset.full(10), 10)
+
+        assert result.derive("frame", lambda: object()) is result.derive("frame", lambda: object())
+        assert result.mask.all()
+
+    def test_derive_in_threads(self, filter_cache):
+        result = filter_cache.get_or_compute("wt:x", lambda: bitset.full(10), 10)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return object()
+
+        values = []
+        threads = [threading.Thread(target=lambda: values.append(result.derive("frame", compute))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert all(value is values[0] for value in values)
+
+    def test_payload_roundtrip(self, filter_cache, store):
+        engine = FilterEngine(store, name="wt")
+        state = engine.state({"Country": ["Germany"]})
+        result = filter_cache.get_or_compute(engine.state_key(state), lambda: engine.state_bits(state), engine.rows, state)
+
+        assert filter_cache.from_payload(result.payload(), engine) is result
+
+    def test_payload_carries_state(self, filter_cache, store):
+        engine = FilterEngine(store, name="wt")
+        state = engine.state({}, {"Elevation": [0, 1000]})
+        result = filter_cache.get_or_compute(engine.state_key(state), lambda: engine.state_bits(state), engine.rows, state)
+
+        # decoded by another process
+        other = FilterResultCache(Cache(Flask(__name__), config={"CACHE_TYPE": "windfarms.cache.LRUCache"})).from_payload(result.payload(), engine)
+        assert other.state == state
+        assert other.key == result.key
+        np.testing.assert_array_equal(other.bits, result.bits)
+
+    def test_payload_cannot_replace_results(self, filter_cache, store):
+        engine = FilterEngine(store, name="wt")
+        state = engine.state({"Country": ["Germany"]})
+        key = engine.state_key(state)
+
+        # a payload with the key of a state and other bits, with and without the state
+        forged = dict(encode_mask(np.zeros(engine.rows, dtype=bool)), key=key, state=state)
+        assert filter_cache.from_payload(forged, engine).count == bitset.count(engine.state_bits(state))
+        filter_cache.cache.clear()
+        forged.pop("state")
+        assert filter_cache.from_payload(forged, engine).key != key
+        assert filter_cache.get(key) is None
+
+    @pytest.mark.parametrize("payload", [
+        encode_mask(np.ones(99, dtype=bool)),
+        dict(encode_mask(np.ones(2000, dtype=bool)), bits="not base64!"),
+        dict(encode_mask(np.ones(2000, dtype=bool)), bits=encode_mask(np.ones(3000, dtype=bool))["bits"]),
+        dict(encode_mask(np.ones(2000, dtype=bool)), state={"Country": [99]}),
+        dict(encode_mask(np.ones(2000, dtype=bool)), state=[1]),
+        None,
+    ])
+    def test_invalid_payload(self, filter_cache, store, payload):
+        with pytest.raises(ValueError):
+            filter_cache.from_payload(payload, FilterEngine(store, name="wt"))
+
+    def test_clientside_payload(self, filter_cache, store):
+        engine = FilterEngine(store, name="wt")
+        mask = np.arange(engine.rows) % 3 == 0
+        payload = encode_mask(mask, compress=False)
+
+        result = filter_cache.from_payload(payload, engine)
+
+        np.testing.assert_array_equal(result.mask, mask)
+        assert result.key.startswith("wt:bits:")
+        assert filter_cache.from_payload(dict(payload, key="wt:x"), engine) is result
+
+
+class TestFilterKey:
+    def test_equivalent_states_share_a_key(self, store):
+        engine = FilterEngine(store, name="wt")
+        everything = {name: store.categories(name) for name in ["Country", "Landform"]}
+
+        key = engine.key(everything, {"Elevation": [-46, 4684]})
+
+        assert key.startswith("wt:")
+        assert key == engine.key({}, {"Elevation": [-1000, 10000]})
+        assert key == engine.key({"Country": list(reversed(everything["Country"])) + ["Atlantis"]}, {})
+
+    def test_different_states_differ(self, store):
+        engine = FilterEngine(store)
+
+        assert engine.key({"Country": ["Germany"]}) != engine.key({"Country": ["Austria"]})
+        assert engine.key({}, {"Elevation": [0, 100]}) != engine.key({}, {"Elevation": [0, 200]})
+
+
+def line_figure(n):
+    return go.Figure(go.Scatter(x=list(range(n)), y=list(range(n))))
+
+
+class TestFigureCache:
+    def test_hits_and_misses(self):
+        calls = []
+        cache = FigureCache(lambda key: calls.append(key) or line_figure(key))
+        first = cache.get(3)
+        first["data"][0]["x"].append(99)
+
+        assert cache.get(3)["data"][0]["x"] == [0, 1, 2]
+        assert calls == [3]
+        assert first["layout"] == line_figure(3).to_plotly_json()["layout"]
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["builds"], stats["entries"]) == (1, 1, 1, 1)
+        assert stats["bytes"] == len(line_figure(3).to_json())
+
+    def test_evicts_by_size(self):
+        cache = FigureCache(line_figure, max_bytes=len(line_figure(11).to_json()) + len(line_figure(12).to_json()))
+        cache.get(10)
+        cache.get(10)
+        cache.get(11)
+        cache.get(12)
+
+        assert 10 not in cache and 11 in cache and 12 in cache
+        assert cache.bytes <= cache.max_bytes
+
+        cache.get(10_000)
+        assert 10_000 not in cache and len(cache) == 2
+
+    def test_warm(self):
+        size = len(line_figure(10).to_json())
+        cache = FigureCache(line_figure, max_bytes=2 * size + size // 2)
+        cache.get(10)
+
+        assert cache.warm([10, 11, 12, 13]) == 1
+        assert 10 in cache and 11 in cache and 12 not in cache
+        assert cache.stats()["hits"] == 0
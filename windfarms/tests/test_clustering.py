@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from windfarms.clustering import ClusterIndex, abbreviate, lat_to_y, lon_to_x, x_to_lon, y_to_lat
+
+WORLD = [-180, -90, 180, 90]
+
+
+def total(features):
+    return sum(f["properties"].get("point_count", 1) for f in features)
+
+
+@pytest.fixture
+def index(table):
+    return ClusterIndex(table["lon"], table["lat"], {"WFid": table["WFid"]})
+
+
+def test_projection_roundtrip():
+    lon = np.array([-179.5, -3.8, 0, 120.25])
+    lat = np.array([-60, 0, 33.25, 80])
+
+    np.testing.assert_allclose(x_to_lon(lon_to_x(lon)), lon)
+    np.testing.assert_allclose(y_to_lat(lat_to_y(lat)), lat)
+
+
+@pytest.mark.parametrize("count, expected", [(7, "7"), (999, "999"), (1234, "1.2k"), (25000, "25k")])
+def test_abbreviate(count, expected):
+    assert abbreviate(count) == expected
+
+
+@pytest.mark.parametrize("zoom", range(0, 14))
+def test_every_point_counted_once(index, table, zoom):
+    assert total(index.get_clusters(WORLD, zoom)) == len(table)
+
+
+def test_unclustered_above_max_zoom(index, table):
+    features = index.get_clusters(WORLD, 12)
+
+    assert not any(f["properties"].get("cluster") for f in features)
+    assert sorted(f["properties"]["WFid"] for f in features) == sorted(table["WFid"])
+
+
+def test_clusters_split_with_zoom(index):
+    counts = [len(index.get_clusters(WORLD, zoom)) for zoom in range(0, 13)]
+
+    assert counts == sorted(counts)
+    assert counts[0] < counts[-1]
+
+
+def test_expansion_zoom(index):
+    for zoom in range(0, 12):
+        for feature in index.get_clusters(WORLD, zoom):
+            if feature["properties"].get("cluster"):
+                expansion_zoom = feature["properties"]["expansion_zoom"]
+                lon, lat = feature["geometry"]["coordinates"]
+                around = [lon - 1e-6, lat - 1e-6, lon + 1e-6, lat + 1e-6]
+
+                # The cluster stays in place until it splits
+                assert zoom < expansion_zoom <= 12
+                for between in range(zoom, expansion_zoom):
+                    assert total(index.get_clusters(around, between)) == feature["properties"]["point_count"]
+
+
+def test_expansion_zoom_of_pair():
+    index = ClusterIndex([10.0, 10.01], [50.0, 50.0])
+    [cluster] = index.get_clusters(WORLD, 0)
+    expansion_zoom = cluster["properties"]["expansion_zoom"]
+
+    assert len(index.get_clusters(WORLD, expansion_zoom - 1)) == 1
+    assert len(index.get_clusters(WORLD, expansion_zoom)) == 2
+
+
+def test_viewport(index, table):
+    bbox = [0, 40, 10, 50]
+    features = index.get_clusters(bbox, 12)
+    inside = table["lon"].between(0, 10) & table["lat"].between(40, 50)
+
+    assert len(features) == inside.sum()
+
+
+def test_antimeridian():
+    index = ClusterIndex([179.5, -179.5, 0], [0, 0, 0])
+
+    assert total(index.get_clusters([170, -10, -170, 10], 12)) == 2
+    assert total(index.get_clusters([170, -10, 190, 10], 12)) == 2
+    assert total(index.get_clusters([-540, -10, 540, 10], 12)) == 3
+
+
+def test_empty():
+    index = ClusterIndex([], [])
+
+    assert index.get_clusters(WORLD, 0) == []
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from windfarms.cube import IN_FARM, AggregationCube, describe_weighted
+from windfarms.filtering import FilterEngine
+from windfarms.tests.test_filtering import CASES
+
+
+class TestAggregationCube:
+    def test_cells(self, coarse_store, coarse_table):
+        cube = AggregationCube(coarse_store)
+        frame = cube.frame()
+        columns = ["Country", "Continent", "Land Cover", "Landform", "Shape", "Number of turbines", "Turbine Spacing", "Elevation"]
+        expected = coarse_table.fillna({"Shape": "-"}).assign(**{IN_FARM: coarse_table["WFid"] != -1}).groupby(columns + [IN_FARM]).size()
+
+        assert len(cube) == len(expected) < coarse_store.rows
+        assert cube.count(np.ones(len(cube), dtype=bool)) == coarse_store.rows
+        actual = frame.astype({name: object for name in columns[:5]}).fillna("-").set_index(columns + [IN_FARM])["count"]
+        assert actual.sort_index().to_dict() == expected.sort_index().to_dict()
+        np.testing.assert_array_equal(cube.row_cells[cube.first_rows], np.arange(len(cube)))
+
+    @pytest.mark.parametrize("case", CASES.keys())
+    def test_filters(self, coarse_store, case):
+        selections, ranges = CASES[case]
+        engine = FilterEngine(coarse_store)
+        cube = AggregationCube(coarse_store)
+        rows = engine.mask(selections, ranges)
+
+        cells = cube.cell_mask(engine.bits(selections, ranges))
+        np.testing.assert_array_equal(cube.select(selections, ranges), cells)
+        assert cube.count(cells) == rows.sum()
+        # every row passes the filter together with its cell
+        np.testing.assert_array_equal(cells[cube.row_cells], rows)
+
+    def test_excluded_wfids(self, coarse_store):
+        cube = AggregationCube(coarse_store, exclude_wfids=[-1])
+        engine = FilterEngine(coarse_store, exclude_wfids=[-1])
+
+        assert cube.frame()[IN_FARM].all()
+        assert cube.count(cube.cell_mask(engine.bits({}))) == (coarse_store["WFid"] != -1).sum()
+        assert (cube.row_cells[coarse_store["WFid"] == -1] == -1).all()
+
+
+class TestDescribeWeighted:
+    def test_matches_pandas(self, coarse_table):
+        values = coarse_table["Number of turbines"].to_numpy()
+        unique, weights = np.unique(values, return_counts=True)
+        expected = coarse_table["Number of turbines"].describe()
+
+        actual = describe_weighted(unique, weights).iloc[0]
+        pd.testing.assert_series_equal(actual, expected, check_names=False)
+
+    def test_groups(self):
+        rng = np.random.default_rng(0)
+        frame = pd.DataFrame({"group": rng.integers(0, 5, 300), "value": rng.integers(0, 20, 300).astype(float)})
+        frame.loc[::11, "value"] = np.nan
+        frame = pd.concat([frame, pd.DataFrame({"group": [9], "value": [4.0]})], ignore_index=True)
+        cells = frame.groupby(["group", "value"]).size().reset_index(name="count")
+
+        actual = describe_weighted(cells["value"], cells["count"], cells["group"])
+        expected = frame.groupby("group")["value"].describe()
+        pd.testing.assert_frame_equal(actual, expected, check_names=False)
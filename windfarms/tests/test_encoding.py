@@ -0,0 +1,49 @@
+import base64
+import json
+
+import numpy as np
+import pytest
+
+from windfarms import bitset
+from windfarms.encoding import decode_bits, decode_mask, encode_bits, encode_columns, encode_mask
+
+
+class TestEncoding:
+    @pytest.mark.parametrize("compress", [True, False])
+    @pytest.mark.parametrize("n_rows", [0, 5, 64, 1001])
+    def test_roundtrip(self, n_rows, compress):
+        mask = np.random.default_rng(n_rows).random(n_rows) < 0.5
+
+        payload = json.loads(json.dumps(encode_mask(mask, compress)))
+
+        assert payload["count"] == mask.sum()
+        np.testing.assert_array_equal(decode_mask(payload), mask)
+        np.testing.assert_array_equal(decode_bits(payload), bitset.from_mask(mask))
+
+    def test_clientside_payload(self):
+        # Output of encode_bits in assets/script.js for rows 0, 2, 3, 5, 6, 7 and 8 of 10
+        payload = {"rows": 10, "count": 7, "encoding": "raw", "bits": "7QE="}
+
+        assert np.flatnonzero(decode_mask(payload)).tolist() == [0, 2, 3, 5, 6, 7, 8]
+
+    def test_compact(self):
+        n_rows = 359947
+
+        payload = encode_bits(bitset.full(n_rows), n_rows)
+
+        assert len(payload["bits"]) < 200
+
+
+class TestEncodeColumns:
+    def test_typed_arrays(self, store):
+        table = encode_columns(store, ["Country", "Elevation", "lon"])
+
+        assert table["rows"] == store.rows
+        country = table["columns"]["Country"]
+        assert country["type"] == "Int8Array"
+        assert country["categories"] == store.categories("Country")
+        np.testing.assert_array_equal(np.frombuffer(base64.b64decode(country["data"]), "<i1"), store["Country"])
+        elevation = table["columns"]["Elevation"]
+        assert elevation["type"] == "Int32Array"
+        np.testing.assert_array_equal(np.frombuffer(base64.b64decode(elevation["data"]), "<i4"), store["Elevation"])
+        assert table["columns"]["lon"]["type"] == "Float64Array"
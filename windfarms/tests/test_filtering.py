@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from windfarms.filtering import FilterEngine
+
+FULL_RANGES = {"Number of turbines": [1, 4086], "Turbine Spacing": [10, 13155], "Elevation": [-46, 4684]}
+
+CASES = {
+    "defaults": ({}, FULL_RANGES),
+    "categories": (
+        {"Country": ["Germany", "Austria"], "Landform": ["Flat"], "Shape": ["Polygon", "Lines"]},
+        FULL_RANGES,
+    ),
+    "ranges": ({}, {"Number of turbines": [10, 200], "Turbine Spacing": [200, 800], "Elevation": [0, 500]}),
+    "nothing selected": ({"Continent": []}, FULL_RANGES),
+    "unknown label": ({"Country": ["Atlantis", "China"]}, FULL_RANGES),
+}
+
+
+def expected_mask(table, selections, ranges):
+    mask = np.ones(len(table), dtype=bool)
+    for name, selected in selections.items():
+        mask &= table[name].isin(selected).to_numpy()
+    for name, (low, high) in ranges.items():
+        mask &= ((table[name] >= low) & (table[name] <= high)).to_numpy()
+    return mask
+
+
+class TestFilterEngine:
+    @pytest.mark.parametrize("case", CASES.keys())
+    def test_mask_matches_pandas(self, store, table, case):
+        selections, ranges = CASES[case]
+
+        result = FilterEngine(store).mask(selections, ranges)
+
+        np.testing.assert_array_equal(result, expected_mask(table, selections, ranges))
+
+    def test_excluded_wfids(self, store, table):
+        result = FilterEngine(store, exclude_wfids=[-1]).mask({}, FULL_RANGES)
+
+        np.testing.assert_array_equal(result, table["WFid"].to_numpy() != -1)
+
+    def test_moving_one_slider(self, store, table):
+        engine = FilterEngine(store)
+        ranges = dict(FULL_RANGES, Elevation=[0, 500])
+        engine.mask({}, ranges)
+
+        ranges["Turbine Spacing"] = [200, 800]
+        result = engine.mask({}, ranges)
+
+        np.testing.assert_array_equal(result, expected_mask(table, {}, ranges))
+
+    @pytest.mark.parametrize("case", CASES.keys())
+    def test_state_bits(self, store, case):
+        selections, ranges = CASES[case]
+        engine = FilterEngine(store, exclude_wfids=[-1])
+        state = engine.state(selections, ranges)
+
+        np.testing.assert_array_equal(FilterEngine(store, exclude_wfids=[-1]).state_bits(state), engine.bits(selections, ranges))
+        assert engine.state_key(state) == engine.key(selections, ranges)
+
+    @pytest.mark.parametrize("state", [{"Country": [9999]}, {"Elevation": [5, 2]}, {"Elevation": 3}, {"WFid": [0, 1]}])
+    def test_invalid_state(self, store, state):
+        with pytest.raises(ValueError):
+            FilterEngine(store).state_bits(state)
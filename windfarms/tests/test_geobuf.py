@@ -0,0 +1,59 @@
+import base64
+
+import dash_leaflet.express as dlx
+import geobuf
+import numpy as np
+import pytest
+
+from windfarms.clustering import ClusterIndex
+from windfarms.geobuf import encode_points, points_to_geobuf
+
+
+def reference(frame, columns):
+    return geobuf.encode(dlx.dicts_to_geojson(frame[["lon", "lat"] + columns].to_dict("records"), lon="lon"))
+
+
+@pytest.mark.parametrize("columns", [[], ["WFid"], ["WFid", "Elevation", "Country"]])
+def test_same_bytes_as_geobuf(table, columns):
+    properties = {name: table[name].to_numpy() for name in columns}
+
+    assert encode_points(table["lon"], table["lat"], properties) == reference(table, columns)
+
+
+def test_float_and_bool_properties():
+    values = np.array([1.5, -2.0, 0.0, 1e300])
+    flags = np.array([True, False, True, False])
+    lon = lat = np.zeros(4)
+    features = [
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [0.0, 0.0]}, "properties": {"value": v, "flag": f}}
+        for v, f in zip(values.tolist(), flags.tolist())
+    ]
+
+    assert encode_points(lon, lat, {"value": values, "flag": flags}) == geobuf.encode({"type": "FeatureCollection", "features": features})
+
+
+def test_masked_properties_are_left_out():
+    wfid = np.ma.masked_array([3, -1, 7], [False, True, False])
+    label = np.ma.masked_array(["a", "b", "c"], [True, False, False])
+    decoded = geobuf.decode(encode_points([1, 2, 3], [4, 5, 6], {"WFid": wfid, "label": label}))
+
+    assert [f["properties"] for f in decoded["features"]] == [{"WFid": 3}, {"label": "b"}, {"WFid": 7, "label": "c"}]
+    assert [f["geometry"]["coordinates"] for f in decoded["features"]] == [[1, 4], [2, 5], [3, 6]]
+
+
+def test_cluster_columns_decode_to_clusters(table):
+    index = ClusterIndex(table["lon"], table["lat"], {"WFid": table["WFid"]})
+    for zoom in [2, 12]:
+        decoded = geobuf.decode(base64.b64decode(points_to_geobuf(*index.get_cluster_columns([-180, -90, 180, 90], zoom))))
+        expected = index.get_clusters([-180, -90, 180, 90], zoom)
+
+        assert [f["properties"] for f in decoded["features"]] == [f["properties"] for f in expected]
+        np.testing.assert_allclose(
+            [f["geometry"]["coordinates"] for f in decoded["features"]],
+            [f["geometry"]["coordinates"] for f in expected],
+            atol=1e-6,
+        )
+
+
+def test_empty():
+    assert geobuf.decode(encode_points([], [])) == {"type": "FeatureCollection", "features": []}
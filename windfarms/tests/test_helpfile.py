@@ -0,0 +1,233 @@
+import json
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+from plotly.subplots import make_subplots
+from plotly.utils import PlotlyJSONEncoder
+
+import helpfile
+from helpfile import histogram_bins, iter_wf_poster, plot_single_windfarm_mapbox, plot_wf_histograms, plot_wf_poster, subplot_domains, turbines_in_box, turbines_in_view, visible_bbox
+from windfarms.clustering import lat_to_y, lon_to_x
+from windfarms.cube import AggregationCube
+from windfarms.indexes import GridIndex
+
+
+def hover_texts(trace):
+    """
+    :returns: hover text per point of a trace, the shared template filled in with the customdata like plotly.js does
+    """
+    if trace.customdata is None:
+        return list(trace.hovertemplate)
+    return [re.sub(r"%\{customdata\[(\d+)\]\}", lambda match: str(row[int(match.group(1))]), trace.hovertemplate) for row in trace.customdata]
+
+
+@pytest.fixture
+def frame(farm_table):
+    return farm_table.astype({column: "category" for column in ["Country", "Continent", "Land Cover", "Landform", "Shape"]})
+
+
+@pytest.fixture
+def farms(frame):
+    farms = frame[frame["WFid"] != -1].groupby("WFid", as_index=False).first()
+    farms["Number of turbines"] = frame[frame["WFid"] != -1].groupby("WFid").size().to_numpy()
+    return farms
+
+
+class TestHover:
+    def test_single_windfarm(self, frame):
+        wfid = frame.loc[frame["WFid"] != -1, "WFid"].value_counts().index[0]
+        compact = plot_single_windfarm_mapbox(frame, wfid)
+        full = plot_single_windfarm_mapbox(frame, wfid, compact=False)
+
+        assert isinstance(compact.data[0].hovertemplate, str)
+        assert len(compact.data[0].customdata) > 1
+        assert hover_texts(compact.data[0]) == hover_texts(full.data[0])
+        assert len(compact.to_json()) < len(full.to_json())
+
+    def test_poster(self, frame, farms):
+        compact = plot_wf_poster(frame, farms, plot_rows=2, plot_col=2)
+        full = plot_wf_poster(frame, farms, plot_rows=2, plot_col=2, compact=False)
+
+        assert len(compact.data) == len(full.data) == 4
+        for compact_trace, full_trace in zip(compact.data, full.data):
+            assert hover_texts(compact_trace) == hover_texts(full_trace)
+
+
+class TestPoster:
+    def test_subplot_views(self, frame, farms):
+        fig = plot_wf_poster(frame, farms, plot_rows=2, plot_col=3)
+
+        assert [trace.subplot for trace in fig.data] == ["mapbox", "mapbox2", "mapbox3", "mapbox4", "mapbox5", "mapbox6"]
+        for trace in fig.data:
+            mapbox = fig.layout[trace.subplot]
+            assert mapbox.layers[0].source["geometry"]["type"] == "MultiLineString"
+            assert -1 <= mapbox.center.lon <= 1 and 45 <= mapbox.center.lat <= 47
+            assert 0 < mapbox.zoom <= 20
+
+    def test_rows(self, frame, farms):
+        expected = json.loads(plot_wf_poster(frame, farms, plot_rows=3, plot_col=2, seed=1).to_json())
+        figures = list(iter_wf_poster(frame, farms, plot_rows=3, plot_col=2, seed=1))
+
+        assert [len(fig["data"]) for fig in figures] == [2, 4, 6]
+        for fig in figures:
+            assert all(fig["layout"][trace["subplot"]]["layers"] for trace in fig["data"])
+        # the figures of the earlier rows are left as they were yielded
+        assert "layers" not in figures[0]["layout"]["mapbox3"]
+        assert json.loads(go.Figure(figures[-1]).to_json()) == expected
+
+    @pytest.mark.parametrize("pool", [ThreadPoolExecutor, ProcessPoolExecutor])
+    def test_executor(self, frame, farms, pool):
+        expected = [json.dumps(fig, cls=PlotlyJSONEncoder) for fig in iter_wf_poster(frame, farms, plot_rows=3, plot_col=2, seed=1)]
+        with pool(2) as executor:
+            figures = [json.dumps(fig, cls=PlotlyJSONEncoder) for fig in iter_wf_poster(frame, farms, plot_rows=3, plot_col=2, seed=1, executor=executor)]
+
+        assert figures == expected
+
+    def test_executor_cancelled(self, frame, farms, monkeypatch):
+        calls, release, draw = [], threading.Event(), helpfile.poster_farm
+
+        def poster_farm(*args, **kwargs):
+            # the farms after the first row wait until the poster is abandoned
+            calls.append(args[1])
+            if len(calls) > 2:
+                release.wait()
+            return draw(*args, **kwargs)
+
+        monkeypatch.setattr(helpfile, "poster_farm", poster_farm)
+        with ThreadPoolExecutor(1) as executor:
+            posters = iter_wf_poster(frame, farms, plot_rows=5, plot_col=2, seed=1, executor=executor)
+            next(posters)
+            posters.close()
+            release.set()
+
+        # the farm being drawn is finished, the others are dropped
+        assert len(calls) == 3
+
+    def test_subplot_domains(self):
+        for rows, cols in [(1, 1), (3, 2), (10, 10)]:
+            fig = make_subplots(rows=rows, cols=cols, horizontal_spacing=0.01, vertical_spacing=0.02, specs=[[{"type": "mapbox"}] * cols] * rows)
+            expected = {name: value for name, value in fig.to_plotly_json()["layout"].items() if name != "template"}
+            assert {name: dict(domain=domain) for name, domain in subplot_domains(rows, cols, 0.01, 0.02).items()} == expected
+
+
+class TestView:
+    def test_visible_bbox(self):
+        assert visible_bbox({"lon": 0, "lat": 0}, 0, 512, 512, margin=1) == pytest.approx([-180, -85.05112878, 180, 85.05112878])
+        west, south, east, north = visible_bbox({"lon": 10, "lat": 50}, 10, 800, 400, margin=1)
+        assert east - west == pytest.approx(800 * 360 / (512 * 2**10))
+        assert (west + east) / 2 == pytest.approx(10)
+        # Mercator stretches latitudes: fewer degrees north than east per pixel
+        assert (north - south) < (east - west) / 2
+        assert south < 50 < north
+
+    def test_turbines_in_view(self, frame):
+        wfid = frame.loc[frame["WFid"] != -1, "WFid"].value_counts().index[0]
+        farm = frame[frame["WFid"] == wfid]
+        center, zoom = {"lon": farm["lon"].mean(), "lat": farm["lat"].mean()}, 11
+        bbox = visible_bbox(center, zoom, 800, 450)
+        in_box = turbines_in_box(frame, center, bbox=bbox)
+        in_view = turbines_in_view(frame, wfid, center, zoom, (800, 450), cell_px=0.001)
+
+        assert in_view.equals(in_box)
+        assert set(farm.index) <= set(in_view.index)
+        assert len(in_view) < len(turbines_in_box(frame, center))
+        grid = GridIndex(frame["lon"], frame["lat"])
+        assert turbines_in_view(frame, wfid, center, zoom, (800, 450), grid, cell_px=0.001).equals(in_view)
+
+    def test_thinning_and_cap(self, frame):
+        wfid = frame.loc[frame["WFid"] != -1, "WFid"].value_counts().index[0]
+        farm = frame[frame["WFid"] == wfid]
+        center, zoom = {"lon": farm["lon"].mean(), "lat": farm["lat"].mean()}, 8
+        in_box = turbines_in_box(frame, center, bbox=visible_bbox(center, zoom, 800, 450))
+        thinned = turbines_in_view(frame, wfid, center, zoom, (800, 450), cell_px=8)
+
+        context = thinned[thinned["WFid"] != wfid]
+        cells = np.floor(np.column_stack([lon_to_x(context["lon"]), lat_to_y(context["lat"])]) * 2**zoom * 512 / 8)
+        assert set(farm.index) <= set(thinned.index)
+        assert len(context) < len(in_box[in_box["WFid"] != wfid])
+        assert len(np.unique(cells, axis=0)) == len(context)
+
+        capped = turbines_in_view(frame, wfid, center, zoom, (800, 450), max_turbines=len(farm) + 10)
+        assert len(capped) == len(farm) + 10 and set(farm.index) <= set(capped.index)
+        assert turbines_in_view(frame, wfid, center, zoom, (800, 450), max_turbines=1).equals(in_box[in_box["WFid"] == wfid])
+
+
+class TestHistograms:
+    def test_bins(self):
+        values = np.random.default_rng(0).normal(100, 30, 1000)
+        edges = histogram_bins(values, 200)
+        size = edges[1] - edges[0]
+
+        assert np.allclose(np.diff(edges), size)
+        assert edges[0] <= values.min() and values.max() < edges[-1]
+        assert 100 <= len(edges) - 1 <= 201
+        assert round(size / 10 ** np.floor(np.log10(size)), 9) in (1, 2, 5)
+
+        # integers are centered in their bins
+        edges = histogram_bins(np.arange(0, 3001, 7), 200)
+        assert edges[0] == -0.5 and (edges[1] - edges[0]) == 20
+        assert histogram_bins([5, 5]).tolist() == [4.5, 5.5]
+
+    def test_categorical(self, frame, farms):
+        _, _, fig = plot_wf_histograms(frame, farms, "Landform")
+        expected = pd.crosstab(frame["Landform"], frame["WFid"] == -1)
+
+        assert [trace.name for trace in fig.data] == ["contained in wind farm", "single turbine"]
+        for trace, single in zip(fig.data, [False, True]):
+            assert dict(zip(trace.y, trace.x)) == {landform: count for landform, count in expected[single].items() if landform in trace.y}
+            assert sum(trace.x) == expected[single].sum()
+        assert list(fig.layout.yaxis.categoryarray) == list(fig.data[0].y)
+
+    @pytest.mark.parametrize("y_axis", ["Elevation", "Turbine Spacing"])
+    def test_numeric(self, frame, farms, y_axis):
+        fig_wf, _, fig_wt = plot_wf_histograms(frame, farms, y_axis)
+        edges = histogram_bins(frame[y_axis], 200)
+
+        assert sum(fig_wf.data[0].x) == len(farms)
+        for trace, single in zip(fig_wt.data, [False, True]):
+            counts, _ = np.histogram(frame.loc[(frame["WFid"] == -1) == single, y_axis], edges)
+            assert trace.x.tolist() == counts[counts > 0].tolist()
+            assert trace.y.tolist() == ((edges[:-1] + edges[1:]) / 2)[counts > 0].tolist()
+        assert len(fig_wt.to_json()) < frame[y_axis].to_numpy().nbytes
+
+    @pytest.mark.parametrize("y_axis", ["Landform", "Elevation"])
+    def test_group_colors(self, frame, farms, y_axis):
+        colors = {"contained in wind farm": "#F46281", "single turbine": "#f4a261"}
+        _, _, fig = plot_wf_histograms(frame, farms, y_axis)
+        assert {trace.name: trace.marker.color for trace in fig.data} == colors
+        assert [trace.name for trace in fig.data] == list(colors)
+
+        # a group keeps its color when the other one has no turbines
+        _, _, fig = plot_wf_histograms(frame[frame["WFid"] == -1], farms, y_axis)
+        assert [(trace.name, trace.marker.color) for trace in fig.data] == [("single turbine", "#f4a261")]
+
+    @pytest.mark.parametrize("y_axis", ["Country", "Shape", "Number of turbines", "Elevation"])
+    def test_cells(self, farm_store, y_axis):
+        frame = farm_store.to_frame()
+        wt_cube, wf_cube = AggregationCube(farm_store), AggregationCube(farm_store, exclude_wfids=[-1])
+        rows = plot_wf_histograms(frame, frame[frame["WFid"] != -1], y_axis)
+        cells = plot_wf_histograms(wt_cube.frame(), wf_cube.frame(), y_axis, cells=True)
+
+        for i in (0, 2):
+            assert json.loads(cells[i].to_json()) == json.loads(rows[i].to_json())
+        assert cells[1][0].columns == rows[1][0].columns
+        pd.testing.assert_frame_equal(pd.DataFrame(cells[1][0].data), pd.DataFrame(rows[1][0].data))
+
+    @pytest.mark.parametrize("y_axis", ["Country", "Elevation"])
+    def test_value_histograms(self, farm_store, y_axis):
+        frame = farm_store.to_frame()
+        wt_cube, wf_cube = AggregationCube(farm_store), AggregationCube(farm_store, exclude_wfids=[-1])
+        rows = plot_wf_histograms(frame, frame[frame["WFid"] != -1], y_axis)
+        histograms = plot_wf_histograms(wt_cube.frame(), wf_cube.frame(), y_axis, cells=True, wf_cube=wf_cube)
+
+        expected, actual = pd.DataFrame(rows[1][0].data), pd.DataFrame(histograms[1][0].data)
+        assert histograms[1][0].columns == rows[1][0].columns
+        if "index" in expected:
+            # numeric axes: one statistic per row
+            expected, actual = expected.set_index("index").T, actual.set_index("index").T
+        pd.testing.assert_frame_equal(actual, expected)
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from windfarms.cube import AggregationCube
+from windfarms.histogram import ValueHistogram
+
+
+def assert_describe(actual: pd.DataFrame, values: pd.Series, groups: pd.Series):
+    """
+    Compares a merged describe with pandas', quartiles included.
+    """
+    expected = values.groupby(groups).describe()
+    pd.testing.assert_frame_equal(actual, expected, check_names=False, rtol=1e-9)
+
+
+class TestValueHistogram:
+    def test_describe(self):
+        rng = np.random.default_rng(1)
+        frame = pd.DataFrame({
+            "group": rng.integers(0, 6, 3000),
+            "value": np.round(rng.lognormal(4, 2, 3000)) * rng.choice([-1, 1, 1, 1], 3000),
+        })
+        frame.loc[::13, "value"] = np.nan
+        frame.loc[::17, "value"] = 0.0
+        cells = frame.groupby(["group", "value"], dropna=False).size().reset_index(name="count")
+
+        histogram = ValueHistogram(cells["value"], cells["count"])
+        actual = histogram.describe(np.arange(len(cells)), cells["group"])
+        assert_describe(actual, frame["value"], frame["group"])
+
+    def test_merge(self):
+        # one cell per row or one cell per value: the same summary
+        values = np.array([3.0, 1.0, 3.0, 7.0, 1.0, 3.0])
+        rows = ValueHistogram(values, np.ones(len(values), dtype=np.int64))
+        cells = ValueHistogram(np.array([1.0, 3.0, 7.0]), np.array([2, 3, 1]))
+        pd.testing.assert_frame_equal(rows.describe(np.arange(6)), cells.describe(np.arange(3)))
+
+    def test_quartiles(self):
+        # the quartiles of pandas, not estimates near them
+        histogram = ValueHistogram(np.array([1.0, 3.0, 5.0, 11.0, 354.0, 900.0]), np.array([2, 3, 4, 2, 1, 1]))
+        actual = histogram.describe(np.arange(6)).iloc[0]
+        expected = pd.Series(np.repeat([1.0, 3.0, 5.0, 11.0, 354.0, 900.0], [2, 3, 4, 2, 1, 1])).describe()
+        assert actual[["25%", "50%", "75%"]].tolist() == expected[["25%", "50%", "75%"]].tolist()
+
+    def test_single_value(self):
+        histogram = ValueHistogram(np.array([12.0, np.nan]), np.array([4, 2]))
+        actual = histogram.describe(np.array([0, 1])).iloc[0]
+        assert actual["count"] == 4
+        assert actual[["mean", "min", "25%", "50%", "75%", "max"]].tolist() == [12.0] * 6
+        assert actual["std"] == 0
+
+
+class TestCubeHistogram:
+    @pytest.mark.parametrize("name", ["Number of turbines", "Turbine Spacing", "Elevation"])
+    def test_describe(self, coarse_store, name):
+        cube = AggregationCube(coarse_store)
+        frame = cube.frame()
+        codes = frame["Country"].cat.codes.to_numpy()
+
+        actual = cube.histogram(name).describe(frame["cell"].to_numpy(), codes)
+        table = coarse_store.to_frame()
+        assert_describe(actual, table[name], table["Country"].cat.codes)
+        assert cube.histogram(name) is cube.histogram(name)
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from windfarms import bitset
+from windfarms.indexes import BitmapIndex, GridIndex, OffsetIndex, SortedIndex
+
+
+@pytest.fixture
+def codes():
+    codes = np.random.default_rng(1).integers(0, 6, 500).astype(np.int8)
+    codes[::50] = -1
+    return codes
+
+
+class TestBitmapIndex:
+    @pytest.mark.parametrize("selected", [[], [2], [0, 5], [0, 1, 2, 3], [0, 1, 2, 3, 4, 5]])
+    def test_select(self, codes, selected):
+        index = BitmapIndex(codes, 6)
+
+        result = bitset.to_mask(index.select(selected), len(codes))
+
+        np.testing.assert_array_equal(result, np.isin(codes, selected))
+
+    def test_all_selected_without_missing_values(self):
+        codes = np.arange(100) % 3
+
+        assert BitmapIndex(codes, 3).select([0, 1, 2]) is None
+
+
+class TestSortedIndex:
+    @pytest.fixture
+    def values(self):
+        return np.random.default_rng(2).integers(-50, 500, 1000)
+
+    @pytest.mark.parametrize("low, high", [(-50, 499), (0, 100), (100, 0), (10, 10), (-1000, 450), (600, 700)])
+    def test_select(self, values, low, high):
+        index = SortedIndex(values)
+        expected = (values >= low) & (values <= high)
+
+        result = index.select(low, high)
+
+        if expected.all():
+            assert result is None
+        else:
+            np.testing.assert_array_equal(bitset.to_mask(result, len(values)), expected)
+
+    def test_row_ids(self, values):
+        ids = SortedIndex(values).row_ids(0, 100)
+
+        assert sorted(ids.tolist()) == np.flatnonzero((values >= 0) & (values <= 100)).tolist()
+        assert np.all(np.diff(values[ids]) >= 0)
+
+    def test_select_after_moves(self, values):
+        index = SortedIndex(values)
+
+        for low, high in [(0, 400), (5, 400), (5, 390), (-10, 420), (450, 499), (460, 470)]:
+            expected = (values >= low) & (values <= high)
+            np.testing.assert_array_equal(bitset.to_mask(index.select(low, high), len(values)), expected)
+
+
+class TestOffsetIndex:
+    def test_slice(self, store):
+        wfid = np.sort(store["WFid"])
+        index = OffsetIndex(wfid)
+
+        for key in np.unique(wfid):
+            assert (wfid[index.slice(key)] == key).all()
+            assert index.slice(key).stop - index.slice(key).start == (wfid == key).sum()
+
+    def test_unknown_keys(self):
+        index = OffsetIndex(np.array([-1, -1, 2, 5, 5]))
+
+        assert index.slice(2) == slice(2, 3)
+        assert index.slice(3) == slice(0, 0)
+        assert index.slice(-2) == slice(0, 0)
+        assert index.slice(6) == slice(0, 0)
+
+    def test_requires_sorted_rows(self):
+        with pytest.raises(ValueError):
+            OffsetIndex(np.array([1, 0]))
+
+
+class TestGridIndex:
+    @pytest.mark.parametrize("box", [(0, 40, 2, 42), (-20.5, 29.5, -18.5, 31.5), (10, 45, 10.3, 45.2), (-180, -90, 180, 90), (100, 0, 102, 2)])
+    def test_query(self, store, box):
+        lon, lat = store["lon"], store["lat"]
+        west, south, east, north = box
+        expected = np.flatnonzero((lon >= west) & (lon <= east) & (lat >= south) & (lat <= north))
+
+        np.testing.assert_array_equal(GridIndex(lon, lat).query(*box), expected)
+
+    def test_points_on_cell_borders(self):
+        lon = np.array([-180.0, 0.0, 1.0, 180.0])
+        lat = np.array([-90.0, 0.0, 1.0, 90.0])
+        index = GridIndex(lon, lat)
+
+        assert index.query(0, 0, 1, 1).tolist() == [1, 2]
+        assert index.query(-180, -90, 180, 90).tolist() == [0, 1, 2, 3]
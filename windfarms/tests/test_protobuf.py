@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from windfarms.protobuf import field_bytes, field_packed, field_varint, read_fields, read_packed, unzigzag, varint, varints, zigzag
+
+
+@pytest.mark.parametrize("value, encoded", [(0, b"\x00"), (1, b"\x01"), (127, b"\x7f"), (128, b"\x80\x01"), (300, b"\xac\x02")])
+def test_varint(value, encoded):
+    assert varint(value) == encoded
+    assert varints(np.array([value])) == encoded
+
+
+def test_varints_match_scalar_encoding():
+    values = np.array([0, 5, 127, 128, 16383, 16384, 2**32, 2**63 - 1], dtype=np.uint64)
+
+    assert varints(values) == b"".join(varint(int(v)) for v in values)
+    assert varints(values.reshape(2, 4)) == varints(values)
+    assert varints(np.zeros(0)) == b""
+
+
+def test_zigzag():
+    values = np.array([0, -1, 1, -2, 2, -(2**40)])
+
+    np.testing.assert_array_equal(zigzag(values)[:5], [0, 1, 2, 3, 4])
+    assert [unzigzag(int(v)) for v in zigzag(values)] == values.tolist()
+
+
+def test_read_fields():
+    message = field_varint(1, 150) + field_bytes(2, "testing") + field_packed(4, np.array([3, 270, 86942]))
+
+    assert list(read_fields(message)) == [(1, 150), (2, b"testing"), (4, varints(np.array([3, 270, 86942])))]
+    assert read_packed(dict(read_fields(message))[4]) == [3, 270, 86942]
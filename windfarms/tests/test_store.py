@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from windfarms.store import IN_FARM, default_store_path, ingest_csv, is_stale, load_table
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    frame = pd.DataFrame(
+        {
+            "WFid": [-1, 0, 1, 2],
+            "lon": [8.95, -0.65, 0.72, 10.1],
+            "lat": [47.41, 52.36, 52.62, 53.0],
+            "Elevation": [203, 83, 12, -4],
+            "Country": ["United Kingdom", "Germany", "United Kingdom", "Austria"],
+            "Shape": ["Single turbine", "Polygon", None, "Lines"],
+        }
+    )
+    path = str(tmp_path / "table.csv")
+    frame.to_csv(path, index=False)
+    return path
+
+
+class TestColumnStore:
+    def test_roundtrip(self, csv_path):
+        store = load_table(csv_path)
+        expected = pd.read_csv(csv_path)
+
+        frame = store.to_frame()
+        assert list(frame.columns) == list(expected.columns) + [IN_FARM]
+        assert frame["Country"].dtype == "category"
+        pd.testing.assert_frame_equal(frame.drop(columns=IN_FARM).astype(object), expected.astype(object))
+
+    def test_downcast(self, csv_path):
+        frame = pd.read_csv(csv_path)
+        frame["Elevation"] = [203, 83, 40000, -4]
+        frame["Spacing"] = [250.0, 312.5, None, 4.0]
+        frame.to_csv(csv_path, index=False)
+
+        store = load_table(csv_path)
+
+        assert store["WFid"].dtype == np.int8
+        assert store["Elevation"].dtype == np.int32
+        assert store["Spacing"].dtype == np.float32
+        # coordinates are not exact in float32
+        assert store["lon"].dtype == np.float64
+        pd.testing.assert_frame_equal(store.to_frame(frame.columns).astype(object), pd.read_csv(csv_path).astype(object))
+
+    def test_in_farm(self, csv_path):
+        store = load_table(csv_path)
+
+        assert store[IN_FARM].tolist() == [False, True, True, True]
+        assert not store.is_categorical(IN_FARM)
+
+    def test_categorical_codes(self, csv_path):
+        store = load_table(csv_path)
+
+        assert store.categories("Country") == ["Austria", "Germany", "United Kingdom"]
+        assert store["Country"].tolist() == [2, 1, 2, 0]
+        assert store["Country"].dtype == np.int8
+        assert store["Shape"][2] == -1
+        assert not store.is_categorical("Elevation")
+
+    def test_memory_mapped(self, csv_path):
+        store = load_table(csv_path)
+
+        assert isinstance(store["lon"], np.memmap)
+
+    def test_rebuild_when_source_changes(self, csv_path):
+        store_path = default_store_path(csv_path)
+        load_table(csv_path)
+        assert not is_stale(store_path, csv_path)
+
+        frame = pd.read_csv(csv_path)
+        frame.loc[0, "Elevation"] = 999
+        frame.to_csv(csv_path, index=False)
+        os.utime(csv_path, (1, 1))
+        assert is_stale(store_path, csv_path)
+
+        assert load_table(csv_path)["Elevation"][0] == 999
+
+    def test_ingest_replaces_existing_store(self, csv_path):
+        store_path = ingest_csv(csv_path)
+        ingest_csv(csv_path)
+
+        assert sorted(os.listdir(os.path.dirname(store_path))) == ["table"]
+
+    def test_sort_by(self, csv_path):
+        frame = pd.read_csv(csv_path)
+        frame["WFid"] = [3, -1, 3, 0]
+        frame.to_csv(csv_path, index=False)
+
+        store = load_table(csv_path, sort_by="WFid")
+
+        assert store["WFid"].tolist() == [-1, 0, 3, 3]
+        assert store["Elevation"].tolist() == [83, -4, 203, 12]
+        assert is_stale(default_store_path(csv_path), csv_path)
+        assert not is_stale(default_store_path(csv_path), csv_path, sort_by="WFid")
@@ -0,0 +1,115 @@
+import gzip
+
+import numpy as np
+import pytest
+
+from windfarms.clustering import lat_to_y, lon_to_x
+from windfarms.protobuf import read_fields, read_packed, unzigzag
+from windfarms.tiles import EXTENT, TileSet, build_tiles, encode_tile, is_stale, load_tiles
+
+
+def decode(tile):
+    """
+    :returns: layer name and point features (x, y, properties) of a single-layer tile
+    """
+    [(_, layer)] = read_fields(tile)
+    keys, values, features, name = [], [], [], None
+    for field, value in read_fields(layer):
+        if field == 1:
+            name = value.decode()
+        elif field == 2:
+            features.append(value)
+        elif field == 3:
+            keys.append(value.decode())
+        elif field == 4:
+            [(kind, v)] = read_fields(value)
+            values.append(unzigzag(v) if kind == 6 else v)
+    points = []
+    for feature in features:
+        fields = dict(read_fields(feature))
+        tags = read_packed(fields[2])
+        command, x, y = read_packed(fields[4])
+        assert fields[3] == 1 and command == 9
+        properties = {keys[tags[i]]: values[tags[i + 1]] for i in range(0, len(tags), 2)}
+        points.append((unzigzag(x), unzigzag(y), properties))
+    return name, points
+
+
+def tile_of(lon, lat, zoom):
+    scale = 2**zoom
+    return zoom, int(lon_to_x(lon) * scale), int(lat_to_y(lat) * scale)
+
+
+@pytest.fixture
+def tiles(tmp_path, store):
+    return TileSet(build_tiles(store, str(tmp_path / "wt.mbtiles"), max_zoom=8), store)
+
+
+def test_encode_tile():
+    name, points = decode(encode_tile("points", np.array([0, 257]), np.array([3, 1]), np.array([-1, 12])))
+
+    assert name == "points"
+    step = EXTENT // 256
+    assert points == [
+        (step // 2, step // 2, {"point_count": 3, "WFid": -1}),
+        (step + step // 2, step + step // 2, {"point_count": 1, "WFid": 12}),
+    ]
+
+
+@pytest.mark.parametrize("zoom", [0, 4, 8])
+def test_every_point_in_one_tile(tiles, store, zoom):
+    scale = 2**zoom
+    total = 0
+    for x in range(scale):
+        for y in range(scale):
+            data = tiles.tile(zoom, x, y)
+            if data is not None:
+                total += sum(p["point_count"] for _, _, p in decode(gzip.decompress(data))[1])
+    assert total == store.rows
+
+
+def test_feature_position(tiles, store):
+    lon, lat, wfid = store["lon"][0], store["lat"][0], store["WFid"][0]
+    zoom, x, y = tile_of(lon, lat, 8)
+    _, points = decode(gzip.decompress(tiles.tile(zoom, x, y)))
+
+    px = (lon_to_x(lon) * 2**zoom - x) * EXTENT
+    py = (lat_to_y(lat) * 2**zoom - y) * EXTENT
+    nearest = min(points, key=lambda p: (p[0] - px) ** 2 + (p[1] - py) ** 2)
+    assert abs(nearest[0] - px) <= EXTENT / 256 and abs(nearest[1] - py) <= EXTENT / 256
+    # the only row in its cell at this zoom level
+    assert nearest[2] == {"point_count": 1, "WFid": wfid}
+
+
+def test_filtered_tile(tiles, store):
+    mask = np.asarray(store["Elevation"]) > 2000
+    zoom, x, y = tile_of(store["lon"][0], store["lat"][0], 2)
+    _, points = decode(gzip.decompress(tiles.tile(zoom, x, y, mask)))
+    _, unfiltered = decode(gzip.decompress(tiles.tile(zoom, x, y)))
+
+    in_tile = [tile_of(lon, lat, zoom) == (zoom, x, y) for lon, lat in zip(store["lon"], store["lat"])]
+    assert sum(p["point_count"] for _, _, p in points) == (mask & in_tile).sum()
+    assert sum(p["point_count"] for _, _, p in unfiltered) == sum(in_tile)
+    assert tiles.tile(zoom, x, y, np.zeros(store.rows, dtype=bool)) is None
+
+
+def test_filtered_tile_matches_unfiltered(tiles, store):
+    zoom, x, y = tile_of(store["lon"][0], store["lat"][0], 6)
+
+    assert tiles.tile(zoom, x, y, np.ones(store.rows, dtype=bool)) == tiles.tile(zoom, x, y)
+
+
+def test_missing_tiles(tiles):
+    assert tiles.tile(3, 0, 0) is None
+    assert tiles.tile(9, 0, 0) is None
+
+
+def test_load_tiles_rebuilds_when_stale(tmp_path, store):
+    path = str(tmp_path / "wt.mbtiles")
+    assert is_stale(path, store)
+
+    tiles = load_tiles(store, path)
+
+    assert not is_stale(path, store)
+    assert tiles.metadata["format"] == "pbf"
+    assert tiles.metadata["name"] == "points"
@@ -0,0 +1,85 @@
+import json
+
+import numpy as np
+import pytest
+
+from helpfile import farm_grid, farm_viewport, plot_single_windfarm_mapbox, plot_wf_poster, zoom_center
+from windfarms.views import FarmViews, build_views, compute_views, is_stale, load_views
+from windfarms.views import zoom_center as zoom_centers
+
+
+@pytest.fixture
+def views(tmp_path, farm_store):
+    return FarmViews(build_views(farm_store, str(tmp_path / "views")), cache_size=4)
+
+
+def farm_wfids(store):
+    return np.unique(store["WFid"][store["WFid"] >= 0]).tolist()
+
+
+def test_zoom_center():
+    bbox = np.array([[0, 45, 0.05, 45.02], [-1.234567, 44.1, -1.2, 44.3], [10, 50, 10.00001, 50.00001], [-20, 30, 40, 60]])
+    zooms, centers = zoom_centers(bbox)
+
+    for row, zoom, (lon, lat) in zip(bbox.tolist(), zooms, centers.tolist()):
+        expected_zoom, expected_center = zoom_center(row)
+        assert zoom == expected_zoom
+        assert {"lon": lon, "lat": lat} == expected_center
+
+
+def test_compute_views_unsorted():
+    with pytest.raises(ValueError):
+        compute_views(np.array([2, 1]), np.zeros(2), np.zeros(2))
+
+
+def test_compute_views_without_farms():
+    assert len(compute_views(np.array([-1, -1]), np.zeros(2), np.zeros(2))) == 0
+
+
+class TestFarmViews:
+    def test_matches_helpfile(self, farm_store, views):
+        frame = farm_store.to_frame()
+        assert len(views) == len(farm_wfids(farm_store))
+        for wfid in farm_wfids(farm_store):
+            farm = frame[frame["WFid"] == wfid]
+            bbox_buff, zoom, center = farm_viewport(farm["lon"].to_numpy(), farm["lat"].to_numpy())
+
+            assert views.viewport(wfid) == (bbox_buff, zoom, center)
+            assert views.grid(wfid) == farm_grid(bbox_buff)
+
+    def test_unknown_wfid(self, views):
+        assert -1 not in views and 10**6 not in views
+        with pytest.raises(KeyError):
+            views.viewport(-1)
+
+    def test_grid_cache(self, farm_store, views):
+        wfids = farm_wfids(farm_store)
+        first = views.grid(wfids[0])
+
+        assert views.grid(wfids[0]) is first
+        assert views.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+        for wfid in wfids[1:6]:
+            views.grid(wfid)
+        assert views.stats()["entries"] == 4
+        assert views.grid(wfids[0]) is not first
+
+    def test_load_views(self, tmp_path, farm_store):
+        path = str(tmp_path / "views")
+        assert is_stale(path, farm_store)
+        load_views(farm_store, path)
+        assert not is_stale(path, farm_store)
+        assert isinstance(load_views(farm_store, path).views, np.memmap)
+
+    def test_single_windfarm_plot(self, farm_store, views):
+        frame = farm_store.to_frame()
+        wfid = farm_wfids(farm_store)[3]
+
+        expected = json.loads(plot_single_windfarm_mapbox(frame, wfid).to_json())
+        assert json.loads(plot_single_windfarm_mapbox(frame, wfid, views=views).to_json()) == expected
+
+    def test_poster(self, farm_store, views):
+        frame = farm_store.to_frame()
+        farms = frame[frame["WFid"] != -1].groupby("WFid", as_index=False).first()
+
+        expected = json.loads(plot_wf_poster(frame, farms, plot_rows=2, plot_col=2).to_json())
+        assert json.loads(plot_wf_poster(frame, farms, plot_rows=2, plot_col=2, views=views).to_json()) == expected
@@ -0,0 +1,410 @@
+"""
+Vector tile pyramid of a point table, stored as MBTiles.
+
+Every tile is divided into a grid of ``GRID`` x ``GRID`` cells and holds one
+point feature per occupied cell, with the number of points in the cell
+(``point_count``) and the WFid of its first point. At the highest zoom level
+a cell is a few metres wide, so the features are the individual points.
+
+Besides the standard ``tiles`` table with the gzipped Mapbox Vector Tiles of
+all points, the file has a ``tile_rows`` table with the row positions of
+the points in each tile, ordered by cell. A filtered tile is encoded on
+request from the rows that pass a filter, without touching other tiles.
+
+Build ahead of time with ``python -m windfarms.tiles``.
+"""
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from windfarms.clustering import lat_to_y, lon_to_x
+from windfarms.protobuf import LENGTH_DELIMITED, VARINT, field_bytes, field_varint, tag, varint_lengths, varints, zigzag
+from windfarms.store import ColumnStore, load_table
+
+# Bump whenever the tile layout changes so that stale pyramids are rebuilt
+TILES_VERSION = 1
+
+MIN_ZOOM = 0
+MAX_ZOOM = 14
+EXTENT = 4096
+GRID = 256
+
+KEYS = ["point_count", "WFid"]
+
+_SCHEMA = """
+CREATE TABLE metadata (name TEXT, value TEXT);
+CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);
+CREATE TABLE tile_rows (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, rows BLOB, cells BLOB);
+CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);
+CREATE UNIQUE INDEX tile_rows_index ON tile_rows (zoom_level, tile_column, tile_row);
+"""
+
+
+def _encoded_rows(tokens: np.ndarray):
+    """
+    :param tokens: matrix with the varint tokens of one message per row
+    :returns: encoded messages and the byte offset of every row, plus the end
+    """
+    lengths = varint_lengths(tokens).sum(axis=1)
+    return varints(tokens), np.r_[0, np.cumsum(lengths)]
+
+
+def _ranks(groups: np.ndarray, values: np.ndarray):
+    """
+    :param groups: group number per element, ascending
+    :param values: value per element
+    :returns: index of every value among the distinct values of its group, and
+        the group and value of every distinct (group, value) pair in order
+    """
+    order = np.lexsort((values, groups))
+    sorted_groups, sorted_values = groups[order], values[order]
+    new_pair = np.r_[True, (sorted_groups[1:] != sorted_groups[:-1]) | (sorted_values[1:] != sorted_values[:-1])]
+    pair_groups, pair_values = sorted_groups[new_pair], sorted_values[new_pair]
+    positions = np.arange(len(pair_groups))
+    group_starts = np.r_[True, pair_groups[1:] != pair_groups[:-1]]
+    pair_ranks = positions - np.maximum.accumulate(np.where(group_starts, positions, 0))
+    ranks = np.empty(len(values), dtype=np.int64)
+    ranks[order] = pair_ranks[np.cumsum(new_pair) - 1]
+    return ranks, pair_groups, pair_values
+
+
+def encode_tiles(
+    layer: str,
+    tiles: np.ndarray,
+    n_tiles: int,
+    cells: np.ndarray,
+    counts: np.ndarray,
+    wfids: np.ndarray,
+    grid: int = GRID,
+) -> List[bytes]:
+    """
+    Encodes Mapbox Vector Tiles with a single layer of point features, all
+    tiles of a batch at once.
+
+    :param layer: layer name
+    :param tiles: tile number in ``range(n_tiles)`` per feature, ascending
+    :param n_tiles: number of tiles
+    :param cells: cell number (``x * grid + y``) per feature
+    :param counts: number of points per feature
+    :param wfids: WFid per feature
+    :param grid: number of cells per tile side
+    :returns: uncompressed tile per tile number
+    """
+    tiles = np.asarray(tiles, dtype=np.int64)
+    cells = np.asarray(cells, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64)
+    wfids = np.asarray(wfids, dtype=np.int64)
+
+    count_index, count_tiles, count_values = _ranks(tiles, counts)
+    wfid_index, wfid_tiles, wfid_values = _ranks(tiles, wfids)
+    # Values of a tile: its point counts followed by its WFids
+    wfid_index += np.bincount(count_tiles, minlength=n_tiles)[tiles]
+
+    # Feature: tags (packed key/value indexes), type POINT, geometry (MoveTo, x, y), all as varints
+    n = len(cells)
+    inner = np.empty((n, 13), dtype=np.uint64)
+    inner[:, 0] = tag(2, LENGTH_DELIMITED)
+    inner[:, 2] = 0
+    inner[:, 3] = count_index
+    inner[:, 4] = 1
+    inner[:, 5] = wfid_index
+    inner[:, 1] = varint_lengths(inner[:, 2:6]).sum(axis=1)
+    inner[:, 6] = tag(3, VARINT)
+    inner[:, 7] = 1
+    inner[:, 8] = tag(4, LENGTH_DELIMITED)
+    inner[:, 10] = 9
+    inner[:, 11] = zigzag((cells // grid * 2 + 1) * EXTENT // (2 * grid))
+    inner[:, 12] = zigzag((cells % grid * 2 + 1) * EXTENT // (2 * grid))
+    inner[:, 9] = varint_lengths(inner[:, 10:]).sum(axis=1)
+    features = np.empty((n, 15), dtype=np.uint64)
+    features[:, 0] = tag(2, LENGTH_DELIMITED)
+    features[:, 1] = varint_lengths(inner).sum(axis=1)
+    features[:, 2:] = inner
+
+    # Values: point counts as uint_value, WFids as sint_value
+    sections = [(features, tiles)]
+    for field, value_tiles, column in [(5, count_tiles, count_values.astype(np.uint64)), (6, wfid_tiles, zigzag(wfid_values))]:
+        tokens = np.empty((len(column), 4), dtype=np.uint64)
+        tokens[:, 0] = tag(4, LENGTH_DELIMITED)
+        tokens[:, 1] = 1 + varint_lengths(column)
+        tokens[:, 2] = tag(field, VARINT)
+        tokens[:, 3] = column
+        sections.append((tokens, value_tiles))
+
+    # Byte range of every tile within each section
+    encoded = []
+    for tokens, section_tiles in sections:
+        data, offsets = _encoded_rows(tokens)
+        bounds = offsets[np.searchsorted(section_tiles, np.arange(n_tiles + 1))].tolist()
+        encoded.append((data, bounds))
+
+    header = field_varint(15, 2) + field_bytes(1, layer)
+    keys = b"".join(field_bytes(3, key) for key in KEYS)
+    footer = field_varint(5, EXTENT)
+    (feature_data, feature_bounds), (count_data, count_bounds), (wfid_data, wfid_bounds) = encoded
+    return [
+        field_bytes(3, b"".join([
+            header,
+            feature_data[feature_bounds[i]:feature_bounds[i + 1]],
+            keys,
+            count_data[count_bounds[i]:count_bounds[i + 1]],
+            wfid_data[wfid_bounds[i]:wfid_bounds[i + 1]],
+            footer,
+        ]))
+        for i in range(n_tiles)
+    ]
+
+
+def encode_tile(layer: str, cells: np.ndarray, counts: np.ndarray, wfids: np.ndarray, grid: int = GRID) -> bytes:
+    """
+    Encodes one Mapbox Vector Tile with a single layer of point features.
+
+    :param layer: layer name
+    :param cells: cell number (``x * grid + y``) per feature
+    :param counts: number of points per feature
+    :param wfids: WFid per feature
+    :param grid: number of cells per tile side
+    :returns: uncompressed tile
+    """
+    return encode_tiles(layer, np.zeros(len(cells), dtype=np.int64), 1, cells, counts, wfids, grid)[0]
+
+
+def _cell_groups(cells: np.ndarray):
+    """
+    :param cells: cell numbers sorted in ascending order
+    :returns: start position of each run of equal cells, and the run lengths
+    """
+    if len(cells) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+    return starts, np.diff(np.r_[starts, len(cells)])
+
+
+def _compress(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def default_tiles_path(store: ColumnStore) -> str:
+    """
+    :returns: path of the MBTiles file that belongs to a column store, data/tiles/<name>.mbtiles
+    """
+    store_dir = os.path.dirname(os.path.abspath(store.path))
+    return os.path.join(os.path.dirname(store_dir), "tiles", os.path.basename(store.path) + ".mbtiles")
+
+
+def _source_id(store: ColumnStore, min_zoom: int, max_zoom: int, grid: int) -> str:
+    source = json.dumps(
+        [TILES_VERSION, store.meta["source"], store.meta.get("sort_by"), store.rows, min_zoom, max_zoom, grid], sort_keys=True
+    )
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+
+
+def build_tiles(
+    store: ColumnStore,
+    path: Optional[str] = None,
+    layer: str = "points",
+    min_zoom: int = MIN_ZOOM,
+    max_zoom: int = MAX_ZOOM,
+    grid: int = GRID,
+) -> str:
+    """
+    Cuts the points of a table into a tile pyramid.
+
+    The file is written under a temporary name and moved in place afterwards.
+
+    :param store: table with lon, lat and WFid columns
+    :param path: target MBTiles file, see ``default_tiles_path``
+    :param layer: name of the vector tile layer
+    :param min_zoom: lowest zoom level
+    :param max_zoom: highest zoom level
+    :param grid: number of cells per tile side, at most 256
+    :returns: path of the written file
+    """
+    if path is None:
+        path = default_tiles_path(store)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    x, y = lon_to_x(store["lon"]), lat_to_y(store["lat"])
+    wfids = np.asarray(store["WFid"])
+
+    db = sqlite3.connect(tmp_path)
+    db.executescript(_SCHEMA)
+    for zoom in range(min_zoom, max_zoom + 1):
+        scale = 1 << zoom
+        column = np.clip((x * scale).astype(np.int64), 0, scale - 1)
+        row = np.clip((y * scale).astype(np.int64), 0, scale - 1)
+        cell_x = np.clip(((x * scale - column) * grid).astype(np.int64), 0, grid - 1)
+        cell_y = np.clip(((y * scale - row) * grid).astype(np.int64), 0, grid - 1)
+        key = (column * scale + row) * grid * grid + cell_x * grid + cell_y
+        order = np.argsort(key, kind="stable")
+        key = key[order]
+
+        # One feature per occupied cell
+        starts, counts = _cell_groups(key)
+        tile_ids, tiles = np.unique(key[starts] // (grid * grid), return_inverse=True)
+        data = encode_tiles(layer, tiles.ravel(), len(tile_ids), key[starts] % (grid * grid), counts, wfids[order[starts]], grid)
+
+        rows = order.astype(np.int32)
+        cells = (key % (grid * grid)).astype(np.uint16)
+        row_bounds = np.searchsorted(key // (grid * grid), np.r_[tile_ids, np.iinfo(np.int64).max]).tolist()
+        for i, tile_id in enumerate(tile_ids.tolist()):
+            # MBTiles rows count from the bottom (TMS)
+            position = (zoom, tile_id // scale, scale - 1 - tile_id % scale)
+            start, stop = row_bounds[i], row_bounds[i + 1]
+            db.execute("INSERT INTO tiles VALUES (?, ?, ?, ?)", position + (_compress(data[i]),))
+            db.execute(
+                "INSERT INTO tile_rows VALUES (?, ?, ?, ?, ?)",
+                position + (rows[start:stop].tobytes(), cells[start:stop].tobytes()),
+            )
+
+    lon, lat = np.asarray(store["lon"]), np.asarray(store["lat"])
+    bounds = [lon.min(), lat.min(), lon.max(), lat.max()] if store.rows else [-180, -85, 180, 85]
+    metadata = {
+        "name": layer,
+        "format": "pbf",
+        "type": "overlay",
+        "minzoom": min_zoom,
+        "maxzoom": max_zoom,
+        "bounds": ",".join(f"{value:.6f}" for value in bounds),
+        "json": json.dumps({"vector_layers": [{
+            "id": layer, "minzoom": min_zoom, "maxzoom": max_zoom,
+            "fields": {"point_count": "Number", "WFid": "Number"},
+        }]}),
+        "grid": grid,
+        "rows": store.rows,
+        "source": _source_id(store, min_zoom, max_zoom, grid),
+    }
+    db.executemany("INSERT INTO metadata VALUES (?, ?)", [(k, str(v)) for k, v in metadata.items()])
+    db.commit()
+    db.close()
+
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_metadata(path: str) -> Optional[Dict[str, str]]:
+    try:
+        db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            return dict(db.execute("SELECT name, value FROM metadata"))
+        finally:
+            db.close()
+    except sqlite3.Error:
+        return None
+
+
+class TileSet:
+    """
+    Read access to a tile pyramid written by ``build_tiles``, safe to share
+    between the threads of a server.
+    """
+
+    def __init__(self, path: str, store: ColumnStore):
+        """
+        :param path: MBTiles file
+        :param store: table the pyramid was built from
+        """
+        self.path = path
+        self.store = store
+        self.metadata = read_metadata(path)
+        if self.metadata is None:
+            raise FileNotFoundError(f"No tile pyramid found at {path}")
+        self.layer = self.metadata["name"]
+        self.grid = int(self.metadata["grid"])
+        self.min_zoom = int(self.metadata["minzoom"])
+        self.max_zoom = int(self.metadata["maxzoom"])
+        self._local = threading.local()
+
+    @property
+    def version(self) -> str:
+        """
+        Identifies the content of the pyramid, e.g. for ETags.
+        """
+        return self.metadata["source"]
+
+    def _db(self) -> sqlite3.Connection:
+        if not hasattr(self._local, "db"):
+            self._local.db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        return self._local.db
+
+    def _position(self, z: int, x: int, y: int):
+        return z, x, (1 << z) - 1 - y
+
+    def tile(self, z: int, x: int, y: int, mask: Optional[np.ndarray] = None) -> Optional[bytes]:
+        """
+        :param z: zoom level
+        :param x: tile column
+        :param y: tile row, counted from the top (XYZ)
+        :param mask: boolean array with the rows to include, all rows by default
+        :returns: gzipped tile, None if the tile holds no points
+        """
+        if not self.min_zoom <= z <= self.max_zoom:
+            return None
+        if mask is None:
+            found = self._db().execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                self._position(z, x, y),
+            ).fetchone()
+            return None if found is None else found[0]
+
+        found = self._db().execute(
+            "SELECT rows, cells FROM tile_rows WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            self._position(z, x, y),
+        ).fetchone()
+        if found is None:
+            return None
+        rows = np.frombuffer(found[0], dtype=np.int32)
+        cells = np.frombuffer(found[1], dtype=np.uint16)
+        passes = mask[rows]
+        if not passes.any():
+            return None
+        rows, cells = rows[passes], cells[passes]
+        starts, counts = _cell_groups(cells)
+        data = encode_tile(self.layer, cells[starts], counts, self.store["WFid"][rows[starts]], self.grid)
+        return _compress(data)
+
+
+def is_stale(path: str, store: ColumnStore, min_zoom: int = MIN_ZOOM, max_zoom: int = MAX_ZOOM, grid: int = GRID) -> bool:
+    """
+    :returns: True if the pyramid is missing or was built from other data or settings
+    """
+    metadata = read_metadata(path)
+    return metadata is None or metadata.get("source") != _source_id(store, min_zoom, max_zoom, grid)
+
+
+def load_tiles(store: ColumnStore, path: Optional[str] = None, layer: str = "points") -> TileSet:
+    """
+    Opens the tile pyramid of a table, (re)building it first if it is missing
+    or out of date.
+
+    :param store: table with lon, lat and WFid columns
+    :param path: MBTiles file, see ``default_tiles_path``
+    :param layer: name of the vector tile layer
+    :returns: TileSet
+    """
+    if path is None:
+        path = default_tiles_path(store)
+    if is_stale(path, store):
+        build_tiles(store, path, layer)
+    return TileSet(path, store)
+
+
+if __name__ == "__main__":
+    # Usage: python -m windfarms.tiles [csv ...]
+    paths = sys.argv[1:] or ["data/wf_data_final.csv", "data/wt_data_final.csv"]
+    for csv_path in paths:
+        if os.path.exists(csv_path):
+            store = load_table(csv_path, sort_by="WFid")
+            print(f"{csv_path} -> {build_tiles(store)}")
+        else:
+            print(f"{csv_path} not found, skipped")
@@ -0,0 +1,270 @@
+"""
+Precomputed map views of the wind farms.
+
+The viewport of a wind farm plot (buffered bounding box, zoom level and
+center) and the 1 km grid put on the farm only depend on the positions of
+its turbines. They are computed once per turbine table, stored as one record
+per WFid in a ``.npy`` file and memory-mapped on load. A grid is stored by its
+layout (first cell, cell size, columns and rows); its lines are generated
+when the farm is drawn and kept in a least-recently-used cache.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import turf
+from windfarms.cache import LRUCache
+from windfarms.store import META_FILE, ColumnStore, load_table
+
+# Bump whenever the computation or the on-disk layout changes so that stale views are rebuilt
+VIEWS_VERSION = 1
+
+VIEWS_FILE = "views.npy"
+
+# Margin around the turbines of a wind farm in degrees
+BUFFER = 0.01
+
+# Side of the grid cells in meters
+GRID_CELL = 1000
+
+# Longitudinal degree range by zoom level (20 to 1) of a scattermapbox plot, see helpfile.zoom_center
+LON_ZOOM_RANGE = np.array([
+    0.0007, 0.0014, 0.003, 0.006, 0.012, 0.024, 0.048, 0.096,
+    0.192, 0.3712, 0.768, 1.536, 3.072, 6.144, 11.8784, 23.7568,
+    47.5136, 98.304, 190.0544, 360.0
+])
+
+VIEW_DTYPE = np.dtype([
+    ("wfid", np.int64),
+    ("bbox", np.float64, 4),
+    ("zoom", np.float64),
+    ("center", np.float64, 2),
+    ("grid_origin", np.float64, 2),
+    ("grid_cell", np.float64, 2),
+    ("grid_shape", np.int32, 2),
+])
+
+
+def zoom_center(bbox: np.ndarray, width_to_height: float = 2.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized ``helpfile.zoom_center``.
+
+    :param bbox: extents in [west, south, east, north] order, one row per view
+    :returns: zoom level per view and center [lon, lat] per view
+    """
+    west, south, east, north = np.asarray(bbox, dtype=np.float64).T
+    # Python's round for the centers, numpy's differs in the last digit for some values
+    center = np.array(
+        [[round(lon, 6), round(lat, 6)] for lon, lat in zip(((east + west) / 2).tolist(), ((north + south) / 2).tolist())]
+    ).reshape(-1, 2)
+
+    # calculate zoom with margin to outer points
+    margin = 4
+    height = (north - south) * margin * width_to_height
+    width = (east - west) * margin
+    lon_zoom = np.interp(width, LON_ZOOM_RANGE, range(20, 0, -1))
+    lat_zoom = np.interp(height, LON_ZOOM_RANGE, range(20, 0, -1))
+    return np.round(np.minimum(lon_zoom, lat_zoom), 2), center
+
+
+def compute_views(wfid: np.ndarray, lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+    """
+    :param wfid: WFid per turbine, sorted
+    :param lon: longitude per turbine
+    :param lat: latitude per turbine
+    :returns: one VIEW_DTYPE record per wind farm (WFid -1 excluded), sorted by WFid
+    """
+    wfid = np.asarray(wfid)
+    if np.any(wfid[1:] < wfid[:-1]):
+        raise ValueError("Turbines must be sorted by WFid")
+    in_farm = wfid >= 0
+    wfid = wfid[in_farm]
+    lon = np.asarray(lon, dtype=np.float64)[in_farm]
+    lat = np.asarray(lat, dtype=np.float64)[in_farm]
+    starts = np.flatnonzero(np.r_[True, wfid[1:] != wfid[:-1]]) if len(wfid) else np.array([], dtype=np.int64)
+
+    views = np.zeros(len(starts), dtype=VIEW_DTYPE)
+    if not len(starts):
+        return views
+    views["wfid"] = wfid[starts]
+    views["bbox"] = np.stack([
+        np.minimum.reduceat(lon, starts) - BUFFER,
+        np.minimum.reduceat(lat, starts) - BUFFER,
+        np.maximum.reduceat(lon, starts) + BUFFER,
+        np.maximum.reduceat(lat, starts) + BUFFER,
+    ], axis=1)
+    views["zoom"], views["center"] = zoom_center(views["bbox"])
+
+    for view in views:
+        layout = turf.rectangle_grid_layout(view["bbox"].tolist(), GRID_CELL, GRID_CELL, {"units": "meters"})
+        view["grid_origin"] = layout["x"], layout["y"]
+        view["grid_cell"] = layout["cell_width"], layout["cell_height"]
+        view["grid_shape"] = layout["columns"], layout["rows"]
+    return views
+
+
+def default_views_path(store: ColumnStore) -> str:
+    """
+    :returns: directory of the views that belong to a column store, data/views/<name>
+    """
+    store_dir = os.path.dirname(os.path.abspath(store.path))
+    return os.path.join(os.path.dirname(store_dir), "views", os.path.basename(store.path))
+
+
+def _source_id(store: ColumnStore) -> str:
+    source = json.dumps([VIEWS_VERSION, store.meta["source"], store.meta.get("sort_by"), store.rows], sort_keys=True)
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+
+
+def build_views(store: ColumnStore, path: Optional[str] = None) -> str:
+    """
+    Computes the views of all wind farms of a turbine table and writes them to disk.
+
+    :param store: turbine table sorted by WFid, with lon and lat columns
+    :param path: target directory, see ``default_views_path``
+    :returns: path of the written views
+    """
+    if path is None:
+        path = default_views_path(store)
+    views = compute_views(store["WFid"], store["lon"], store["lat"])
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, VIEWS_FILE), views)
+    with open(os.path.join(tmp_path, META_FILE), "w") as f:
+        json.dump({"version": VIEWS_VERSION, "source": _source_id(store), "farms": len(views)}, f, indent=1)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_meta(path: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(path, META_FILE), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_stale(path: str, store: ColumnStore) -> bool:
+    """
+    :returns: True if the views are missing or were computed from other data
+    """
+    meta = read_meta(path)
+    return meta is None or meta.get("source") != _source_id(store)
+
+
+class FarmViews:
+    """
+    Read access to the views written by ``build_views``, safe to share
+    between the threads of a server.
+    """
+
+    def __init__(self, path: str, cache_size: int = 256):
+        """
+        :param path: directory of the views
+        :param cache_size: number of grids kept
+        """
+        self.path = path
+        self.meta = read_meta(path)
+        if self.meta is None:
+            raise FileNotFoundError(f"No wind farm views found at {path}")
+        self.views = np.load(os.path.join(path, VIEWS_FILE), mmap_mode="r")
+        self._wfids = self.views["wfid"]
+        self._grids = LRUCache(threshold=cache_size)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.views)
+
+    def _position(self, wfid: int) -> Optional[int]:
+        position = int(np.searchsorted(self._wfids, wfid))
+        if position < len(self._wfids) and self._wfids[position] == wfid:
+            return position
+        return None
+
+    def __contains__(self, wfid: int) -> bool:
+        return self._position(wfid) is not None
+
+    def _view(self, wfid: int):
+        position = self._position(wfid)
+        if position is None:
+            raise KeyError(wfid)
+        return self.views[position]
+
+    def viewport(self, wfid: int) -> Tuple[List[float], float, Dict[str, float]]:
+        """
+        :returns: buffered bounding box, zoom level and center of the wind farm plot, see ``helpfile.farm_viewport``
+        """
+        view = self._view(wfid)
+        center = view["center"].tolist()
+        return view["bbox"].tolist(), float(view["zoom"]), {"lon": center[0], "lat": center[1]}
+
+    def grid(self, wfid: int) -> Dict:
+        """
+        :returns: 1 km grid to put on the wind farm as MultiLineString Feature, see ``helpfile.farm_grid``.
+            Shared between callers, must not be modified
+        """
+        grid = self._grids.get(wfid)
+        with self._lock:
+            if grid is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if grid is None:
+            view = self._view(wfid)
+            (x, y), (cell_width, cell_height), (columns, rows) = view["grid_origin"].tolist(), view["grid_cell"].tolist(), view["grid_shape"].tolist()
+            grid = turf.rectangle_grid_cells(
+                {"x": x, "y": y, "cell_width": cell_width, "cell_height": cell_height, "columns": columns, "rows": rows},
+                output="lines",
+            )
+            self._grids.set(wfid, grid)
+        return grid
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "entries": len(self._grids),
+        }
+
+
+def load_views(store: ColumnStore, path: Optional[str] = None, cache_size: int = 256) -> FarmViews:
+    """
+    Opens the views of the wind farms of a turbine table, (re)computing them
+    first if they are missing or out of date.
+
+    :param store: turbine table sorted by WFid, with lon and lat columns
+    :param path: directory of the views, see ``default_views_path``
+    :param cache_size: number of grids kept
+    :returns: FarmViews
+    """
+    if path is None:
+        path = default_views_path(store)
+    if is_stale(path, store):
+        build_views(store, path)
+    return FarmViews(path, cache_size)
+
+
+if __name__ == "__main__":
+    # Usage: python -m windfarms.views [csv ...]
+    paths = sys.argv[1:] or ["data/wt_data_final.csv"]
+    for csv_path in paths:
+        if os.path.exists(csv_path):
+            store = load_table(csv_path, sort_by="WFid")
+            print(f"{csv_path} -> {build_views(store)}")
+        else:
+            print(f"{csv_path} not found, skipped")